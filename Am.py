@@ -1,14 +1,10 @@
-import pyttsx3
-import PyPDF2
-from pydub import AudioSegment
-import os
+from audio_encoder import synthesize_to_file
+from tts_backends import create_backend
 
 #Bob Bob Bob jom tough guy Make a new definition ojoj last change
 def create_audio(file_path, output_name):
     # Initialize speaker
-    speaker = pyttsx3.init()
-    speaker.setProperty('rate', 150)  # Speed percent
-    speaker.setProperty('volume', 0.9)  # Volume
+    speaker = create_backend('auto', rate=150, volume=0.9)
 
     def process_text(file_path):
         with open(file_path, 'r', encoding='utf-8') as file:
@@ -18,18 +14,13 @@ def create_audio(file_path, output_name):
     # Process the text file
     text = process_text(file_path)
 
-    # Save speech to audio file (WAV format)
-    output_path = 'output.wav'
-    speaker.save_to_file(text, output_path)
-    speaker.runAndWait()
-
-    # Convert WAV to MP3 using pydub (requires ffmpeg)
-    sound = AudioSegment.from_wav(output_path)
+    # Speak straight into the MP3 encoder; no intermediate WAV is written,
+    # so concurrent runs don't share a scratch file
     mp3_path = f"{output_name}.mp3"
-    sound.export(mp3_path, format="mp3")
-
-    # Cleanup temporary WAV file
-    os.remove(output_path)
+    try:
+        synthesize_to_file(speaker, text, mp3_path)
+    finally:
+        speaker.close()
 
     print(f"Audiobook creation complete: {mp3_path}")
     return mp3_path
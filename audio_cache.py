@@ -0,0 +1,234 @@
+import hashlib
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from threading import Lock
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: eviction is only serialized within a process
+    fcntl = None
+
+DEFAULT_MAX_BYTES = 8 * 1024 ** 3
+# Lifetime of a pin, which is released long before this unless its process died
+PIN_SECONDS = 24 * 3600
+
+
+def file_digest(path):
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class AudioCache:
+    """Content-addressed store of rendered audio, evicted least recently used first under a byte budget.
+
+    The directory is the source of truth: every process using it rebuilds
+    its index whenever the directory has changed, recency is the files'
+    modification time, and eviction runs under a lock file, so worker
+    processes sharing a cache never evict blind. Entries that are leased,
+    such as a file a listener is playing or a job is reading, are never
+    evicted while the lease lasts.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = Lock()
+        # key -> (path, size), least recently used first
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        # Directory mtime when the index was last rebuilt
+        self.scanned_mtime = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Lease files are named <key>.<holder>, with the lease's expiry as their mtime
+        self.lease_dir = os.path.join(directory, '.leases')
+
+        if not os.path.exists(self.lease_dir):
+            os.makedirs(self.lease_dir)
+        with self.lock, self._directory_lock():
+            self._refresh()
+            self._evict()
+
+    @staticmethod
+    def make_key(text, voice_id, rate, volume, fmt='wav'):
+        """Hash the normalized text and voice settings into a cache key"""
+        normalized = ' '.join(text.split())
+        settings = json.dumps([voice_id, rate, volume, fmt])
+        digest = hashlib.sha256()
+        digest.update(settings.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(normalized.encode('utf-8'))
+        return digest.hexdigest()
+
+    @staticmethod
+    def derive_key(key, *params):
+        """Key for audio derived from a cached render, such as a time-stretched copy"""
+        return hashlib.sha256(json.dumps([key] + list(params)).encode('utf-8')).hexdigest()
+
+    def _refresh(self):
+        """Rebuild the index from disk if files were added or removed since the last scan; callers hold the lock"""
+        mtime = os.stat(self.directory).st_mtime_ns
+        if mtime == self.scanned_mtime:
+            return
+        # Files touched within one tick of the filesystem clock keep the order this process saw
+        position = {key: index for index, key in enumerate(self.entries)}
+        files = []
+        for name in os.listdir(self.directory):
+            key, ext = os.path.splitext(name)
+            path = os.path.join(self.directory, name)
+            # Scratch files have no extension, and the lock and lease files start with a dot
+            if not ext or name.startswith('.'):
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime_ns, position.get(key, -1), key, path, stat.st_size))
+        self.entries = OrderedDict((key, (path, size)) for _, _, key, path, size in sorted(files))
+        self.total_bytes = sum(size for _, _, _, _, size in files)
+        # Taken before listing, so a change made meanwhile triggers another scan
+        self.scanned_mtime = mtime
+
+    def __contains__(self, key):
+        """Whether key is cached, without counting a lookup or refreshing its recency"""
+        with self.lock:
+            self._refresh()
+            return key in self.entries
+
+    def get(self, key):
+        """Return the cached file path for key, or None on a miss"""
+        with self.lock:
+            self._refresh()
+            entry = self.entries.get(key)
+            if entry is None or not os.path.exists(entry[0]):
+                if entry is not None:
+                    del self.entries[key]
+                    self.total_bytes -= entry[1]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+        # Touch the file: its mtime is the recency every process evicts by
+        try:
+            os.utime(entry[0])
+        except OSError:
+            pass
+        return entry[0]
+
+    def put(self, key, path, fmt='wav'):
+        """Move a rendered file into the cache and return its new path"""
+        cached_path = os.path.join(self.directory, f'{key}.{fmt}')
+        with self.lock, self._directory_lock():
+            os.replace(path, cached_path)
+            # Newest by mtime too, however long the file took to write
+            os.utime(cached_path)
+            self._refresh()
+            self.entries.move_to_end(key)
+            self._evict()
+        return cached_path
+
+    @contextmanager
+    def _directory_lock(self):
+        """Exclusive lock on the directory shared by every process using it"""
+        with open(os.path.join(self.directory, '.lock'), 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def lease(self, holder, keys, seconds):
+        """Keep keys from eviction for seconds on behalf of holder, replacing the holder's earlier leases"""
+        expires = time.time() + seconds
+        suffix = f'.{holder}'
+        for name in os.listdir(self.lease_dir):
+            if name.endswith(suffix) and name[:-len(suffix)] not in keys:
+                self._remove_lease(name)
+        for key in keys:
+            lease_path = os.path.join(self.lease_dir, f'{key}{suffix}')
+            with open(lease_path, 'a'):
+                pass
+            os.utime(lease_path, (expires, expires))
+
+    def release(self, holder, keys):
+        """End a holder's leases on keys"""
+        for key in keys:
+            self._remove_lease(f'{key}.{holder}')
+
+    @contextmanager
+    def pinned(self, *keys):
+        """Keep keys from eviction while the block runs"""
+        holder = uuid.uuid4().hex
+        # The lease outlives any job, and lapses by itself if this process dies
+        self.lease(holder, keys, PIN_SECONDS)
+        try:
+            yield
+        finally:
+            self.release(holder, keys)
+
+    def _remove_lease(self, name):
+        try:
+            os.remove(os.path.join(self.lease_dir, name))
+        except OSError:
+            pass
+
+    def _leased_keys(self):
+        """Keys with an unexpired lease, deleting expired lease files along the way"""
+        now = time.time()
+        leased = set()
+        for name in os.listdir(self.lease_dir):
+            try:
+                expires = os.path.getmtime(os.path.join(self.lease_dir, name))
+            except OSError:
+                continue
+            if expires > now:
+                leased.add(name.split('.', 1)[0])
+            else:
+                self._remove_lease(name)
+        return leased
+
+    def _evict(self):
+        """Drop least recently used files until the cache fits its budget; callers hold the lock"""
+        if self.total_bytes <= self.max_bytes:
+            return
+        leased = self._leased_keys()
+        protect = next(reversed(self.entries))
+        # The newest entry and leased ones stay, even when that leaves the cache over budget
+        for key, (path, size) in list(self.entries.items()):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if key == protect or key in leased:
+                continue
+            del self.entries[key]
+            self.total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def get_stats(self):
+        """Get hit/miss/eviction counters and current usage"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self.entries),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes
+            }
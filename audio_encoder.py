@@ -0,0 +1,290 @@
+import os
+import subprocess
+import tempfile
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from mp3_frames import FrameHeader, build_info_frame, info_frame_size, split_frames
+from parallel_synthesis import iter_chunks
+
+# Speech needs far less than music; 64 kbps mono MP3 is transparent for TTS voices
+DEFAULT_BITRATE = '64k'
+# Length of the PCM chunks encoded in parallel
+CHUNK_SECONDS = 30
+# Frames of neighbouring audio encoded on each side of a chunk and then dropped, so the
+# encoder is warmed up at the chunk's first frame and not flushing at its last
+ROLL_FRAMES = 8
+# ffmpeg output options per format
+FORMATS = {
+    'mp3': ['-codec:a', 'libmp3lame', '-f', 'mp3'],
+    'opus': ['-codec:a', 'libopus', '-application', 'voip', '-f', 'ogg'],
+}
+
+
+class StreamEncoder:
+    """An ffmpeg process fed raw PCM on stdin that writes encoded frames to disk as they are produced.
+
+    PCM is never staged in a WAV file: callers write() frames as they are
+    synthesized and the encoder writes the compressed output alongside.
+    The output goes to a unique scratch file next to output_path that is
+    renamed into place by close(), so concurrent encodes never clobber each
+    other and nobody sees a half-written file.
+    """
+
+    def __init__(self, output_path, params, fmt='mp3', bitrate=DEFAULT_BITRATE):
+        channels, sample_width, frame_rate = params
+        if sample_width != 2:
+            raise ValueError("Only 16-bit PCM audio is supported")
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format {fmt}")
+        self.output_path = output_path
+        self.params = params
+        self.pcm_bytes = 0
+        handle, self.temp_path = tempfile.mkstemp(suffix=f'.{fmt}', dir=os.path.dirname(os.path.abspath(output_path)))
+        os.close(handle)
+        # Errors only, so stderr can't fill its pipe while stdin is being written
+        self.process = subprocess.Popen(
+            ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+             '-f', 's16le', '-ac', str(channels), '-ar', str(frame_rate), '-i', 'pipe:0',
+             '-b:a', bitrate] + FORMATS[fmt] + [self.temp_path],
+            stdin=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+
+    @property
+    def duration(self):
+        """Seconds of audio written so far"""
+        channels, sample_width, frame_rate = self.params
+        return self.pcm_bytes / (channels * sample_width * frame_rate)
+
+    def write(self, frames):
+        """Feed PCM frames to the encoder"""
+        try:
+            self.process.stdin.write(frames)
+        except BrokenPipeError:
+            raise RuntimeError(f"ffmpeg exited early: {self._finish()}")
+        self.pcm_bytes += len(frames)
+
+    def _finish(self):
+        """Close ffmpeg's input and wait for it, returning its error output"""
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+        errors = self.process.stderr.read().decode('utf-8', errors='replace').strip()
+        self.process.wait()
+        return errors
+
+    def close(self):
+        """Flush the encoder and move the finished file into place, returning its path"""
+        errors = self._finish()
+        if self.process.returncode != 0:
+            os.remove(self.temp_path)
+            raise RuntimeError(f"ffmpeg failed: {errors}")
+        os.replace(self.temp_path, self.output_path)
+        return self.output_path
+
+    def abort(self):
+        """Stop encoding and discard the partial output"""
+        self.process.kill()
+        self._finish()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+
+def _encode_mp3_chunk(pcm, params, bitrate, drop, keep):
+    """Encode a PCM chunk to MP3 in its own ffmpeg, returning (frames, frame count).
+
+    The first drop frames are discarded, and all but the first keep
+    frames after them unless keep is None. With the bit reservoir off every
+    frame decodes on its own, so the kept frames can be spliced anywhere.
+    """
+    channels, sample_width, frame_rate = params
+    result = subprocess.run(
+        ['ffmpeg', '-hide_banner', '-loglevel', 'error',
+         '-f', 's16le', '-ac', str(channels), '-ar', str(frame_rate), '-i', 'pipe:0',
+         '-codec:a', 'libmp3lame', '-b:a', bitrate, '-reservoir', '0',
+         '-write_xing', '0', '-id3v2_version', '0', '-f', 'mp3', 'pipe:1'],
+        input=pcm,
+        capture_output=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.decode('utf-8', errors='replace').strip()}")
+    frames = split_frames(result.stdout)
+    end = len(frames) if keep is None else drop + keep
+    if len(frames) < end:
+        raise RuntimeError(f"Encoder produced {len(frames)} frames, expected at least {end}")
+    kept = frames[drop:end]
+    if not kept:
+        return b'', 0
+    return result.stdout[kept[0][0]:kept[-1][0] + kept[-1][1]], len(kept)
+
+
+class ChunkedMp3Encoder(ABC):
+    """MP3 encoder that splits PCM into fixed-length chunks, encodes them concurrently and splices the frames.
+
+    Each chunk is encoded by its own ffmpeg with a few frames of the
+    surrounding audio on either side, which are dropped again, so the kept
+    frames line up exactly with those of a single continuous encode. Chunks
+    are encoded as soon as enough PCM has been written, so encoding overlaps
+    synthesis, and their frames are handed to _write_chunk in order.
+    Subclasses decide where the frames go. Encoders given a shared executor
+    run their chunks on it alongside each other's.
+    """
+
+    def __init__(self, params, bitrate=DEFAULT_BITRATE, workers=None, chunk_seconds=CHUNK_SECONDS, executor=None):
+        channels, sample_width, frame_rate = params
+        if sample_width != 2:
+            raise ValueError("Only 16-bit PCM audio is supported")
+        self.params = params
+        self.bitrate = bitrate
+        self.pcm_bytes = 0
+        frame_bytes = FrameHeader.for_stream(frame_rate, channels).samples * channels * sample_width
+        self.chunk_bytes = max(1, round(chunk_seconds * frame_rate * channels * sample_width / frame_bytes)) * frame_bytes
+        self.roll_bytes = ROLL_FRAMES * frame_bytes
+        self.frame_bytes = frame_bytes
+        # PCM not yet handed to a worker, and the audio just before it for the next chunk's lead-in
+        self.pending = bytearray()
+        self.lead_in = b''
+        self.workers = workers or os.cpu_count() or 1
+        self.owns_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(self.workers, thread_name_prefix='mp3-encode')
+        self.chunks = deque()
+        self.frame_count = 0
+        self.audio_bytes = 0
+
+    @property
+    def duration(self):
+        """Seconds of audio written so far"""
+        channels, sample_width, frame_rate = self.params
+        return self.pcm_bytes / (channels * sample_width * frame_rate)
+
+    def write(self, frames):
+        """Feed PCM frames, starting an encode for every chunk that is now complete"""
+        self.pending += frames
+        self.pcm_bytes += len(frames)
+        # A chunk needs its trailing frames of context before it can go
+        while len(self.pending) >= self.chunk_bytes + self.roll_bytes:
+            self._submit(self.chunk_bytes, last=False)
+            # Chunks waiting on a worker hold their PCM, so don't run too far ahead
+            while len(self.chunks) > self.workers * 2:
+                self._collect_one()
+        self._collect(wait=False)
+
+    def _submit(self, length, last):
+        """Hand the next length bytes of pending PCM, with their context, to a worker"""
+        context = 0 if last else self.roll_bytes
+        pcm = self.lead_in + bytes(self.pending[:length + context])
+        drop = len(self.lead_in) // self.frame_bytes
+        keep = None if last else length // self.frame_bytes
+        self.chunks.append(self.executor.submit(_encode_mp3_chunk, pcm, self.params, self.bitrate, drop, keep))
+        self.lead_in = (self.lead_in + bytes(self.pending[:length]))[-self.roll_bytes:]
+        del self.pending[:length]
+
+    def _collect(self, wait):
+        """Pass finished chunks on in order"""
+        while self.chunks and (wait or self.chunks[0].done()):
+            self._collect_one()
+
+    def _collect_one(self):
+        data, count = self.chunks.popleft().result()
+        self._write_chunk(data, count)
+        self.frame_count += count
+        self.audio_bytes += len(data)
+
+    @abstractmethod
+    def _write_chunk(self, data, count):
+        """Store the next count frames of the stream"""
+
+    @abstractmethod
+    def _finish(self):
+        """Complete the output once every frame has been written, returning its path"""
+
+    @abstractmethod
+    def _discard(self):
+        """Remove the partial output"""
+
+    def close(self):
+        """Encode what is left and complete the output, returning its path"""
+        try:
+            # Always sent, even empty: the final chunk carries the encoder's flush frames
+            self._submit(len(self.pending), last=True)
+            self._collect(wait=True)
+            path = self._finish()
+        except BaseException:
+            self.abort()
+            raise
+        if self.owns_executor:
+            self.executor.shutdown()
+        return path
+
+    def abort(self):
+        """Stop encoding and discard the partial output"""
+        for chunk in self.chunks:
+            chunk.cancel()
+        if self.owns_executor:
+            self.executor.shutdown()
+        self._discard()
+
+
+class ParallelMp3Encoder(ChunkedMp3Encoder):
+    """Chunked MP3 encoder writing a single file.
+
+    The spliced frames are written behind an Info tag giving the frame
+    count, byte length, encoder delay and padding, so the result is one
+    valid CBR file whose duration is exactly that of the PCM. Takes the same
+    calls as StreamEncoder.
+    """
+
+    def __init__(self, output_path, params, bitrate=DEFAULT_BITRATE, workers=None, chunk_seconds=CHUNK_SECONDS):
+        super().__init__(params, bitrate, workers, chunk_seconds)
+        self.output_path = output_path
+        channels, sample_width, frame_rate = params
+        handle, self.temp_path = tempfile.mkstemp(suffix='.mp3', dir=os.path.dirname(os.path.abspath(output_path)))
+        self.file = os.fdopen(handle, 'wb')
+        # Room for the Info tag, which is filled in once the frames are counted
+        self.file.write(bytes(info_frame_size(frame_rate, channels)))
+
+    def _write_chunk(self, data, count):
+        self.file.write(data)
+
+    def _finish(self):
+        """Write the Info tag and move the file into place"""
+        channels, sample_width, frame_rate = self.params
+        info = build_info_frame(frame_rate, channels, self.frame_count, self.audio_bytes,
+                                self.pcm_bytes // (channels * sample_width), int(self.bitrate.rstrip('k')) * 1000)
+        self.file.seek(0)
+        self.file.write(info)
+        self.file.close()
+        os.replace(self.temp_path, self.output_path)
+        return self.output_path
+
+    def _discard(self):
+        self.file.close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+
+def synthesize_to_file(backend, text, output_path, fmt='mp3', bitrate=DEFAULT_BITRATE, scratch_dir=None):
+    """Speak text with a backend straight into a compressed file, returning its duration in seconds.
+
+    Text is rendered chunk by chunk and the PCM goes to the encoder as the
+    backend streams it, so memory stays bounded by what the backend holds
+    back, at most a chunk.
+    """
+    encoder = None
+    try:
+        for chunk in iter_chunks([text]):
+            for params, frames in backend.stream(chunk, scratch_dir):
+                if encoder is None:
+                    encoder = StreamEncoder(output_path, params, fmt, bitrate)
+                encoder.write(frames)
+        if encoder is None:
+            raise ValueError("No text to synthesize")
+        encoder.close()
+        return encoder.duration
+    except BaseException:
+        if encoder:
+            encoder.abort()
+        raise
@@ -0,0 +1,125 @@
+import mimetypes
+import os
+import uuid
+
+from flask import Response, request
+
+# Renders in the cache never change once written, so clients may keep them for a year
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+BLOCK_SIZE = 256 * 1024
+
+
+def content_etag(path):
+    """ETag for a file: its name when that is a content hash, else its size and modification time.
+
+    Files outside the content-addressed cache, such as streams and HLS
+    playlists, can change while they are served, and hashing them on every
+    change would cost a full read each time.
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if len(stem) == 64 and all(c in '0123456789abcdef' for c in stem):
+        return stem
+    stat = os.stat(path)
+    return f'{stat.st_size:x}-{stat.st_mtime_ns:x}'
+
+
+def _resolve_ranges(range_header, size):
+    """Turn a parsed Range header into inclusive (start, end) byte pairs, or None if none are satisfiable"""
+    ranges = []
+    for start, stop in range_header.ranges:
+        if start < 0:
+            # Suffix range: the last -start bytes
+            start = max(0, size + start)
+            stop = size
+        elif stop is None or stop > size:
+            stop = size
+        if start < stop:
+            ranges.append((start, stop - 1))
+    return ranges or None
+
+
+def _read_range(audio_file, start, end, block_size=BLOCK_SIZE):
+    """Yield bytes start..end (inclusive) of an open file"""
+    audio_file.seek(start)
+    remaining = end - start + 1
+    while remaining > 0:
+        data = audio_file.read(min(block_size, remaining))
+        if not data:
+            break
+        remaining -= len(data)
+        yield data
+
+
+def _stream_range(path, start, end):
+    with open(path, 'rb') as audio_file:
+        yield from _read_range(audio_file, start, end)
+
+
+def _stream_multipart(path, ranges, boundary, part_headers):
+    with open(path, 'rb') as audio_file:
+        for (start, end), headers in zip(ranges, part_headers):
+            yield headers
+            yield from _read_range(audio_file, start, end)
+        yield f'\r\n--{boundary}--\r\n'.encode('ascii')
+
+
+def send_audio(path, immutable=False):
+    """Send an audio file with ETag, conditional GET and single or multiple byte range support.
+
+    Responses that run to the end of the file go through the server's
+    wsgi.file_wrapper when it has one, which servers such as gunicorn turn
+    into a zero-copy sendfile().
+    """
+    size = os.path.getsize(path)
+    mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    etag = content_etag(path)
+    headers = {
+        'ETag': f'"{etag}"',
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': IMMUTABLE_CACHE_CONTROL if immutable else 'no-cache'
+    }
+
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers=headers)
+
+    ranges = None
+    # A stale If-Range means the client's partial copy is out of date: send it all
+    if request.range and ('If-Range' not in request.headers or request.if_range.etag == etag):
+        ranges = _resolve_ranges(request.range, size)
+        if ranges is None:
+            headers['Content-Range'] = f'bytes */{size}'
+            return Response(status=416, headers=headers)
+
+    if ranges and len(ranges) > 1:
+        boundary = uuid.uuid4().hex
+        part_headers = [
+            (f'\r\n--{boundary}\r\nContent-Type: {mimetype}\r\n'
+             f'Content-Range: bytes {start}-{end}/{size}\r\n\r\n').encode('ascii')
+            for start, end in ranges
+        ]
+        length = sum(len(part) for part in part_headers)
+        length += sum(end - start + 1 for start, end in ranges)
+        length += len(f'\r\n--{boundary}--\r\n')
+        headers['Content-Length'] = str(length)
+        return Response(
+            _stream_multipart(path, ranges, boundary, part_headers),
+            status=206,
+            headers=headers,
+            mimetype=f'multipart/byteranges; boundary={boundary}',
+            direct_passthrough=True
+        )
+
+    start, end = ranges[0] if ranges else (0, size - 1)
+    status = 206 if ranges else 200
+    if ranges:
+        headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+    headers['Content-Length'] = str(end - start + 1)
+
+    file_wrapper = request.environ.get('wsgi.file_wrapper')
+    if file_wrapper and end == size - 1:
+        audio_file = open(path, 'rb')
+        audio_file.seek(start)
+        body = file_wrapper(audio_file, BLOCK_SIZE)
+    else:
+        body = _stream_range(path, start, end)
+    return Response(body, status=status, headers=headers, mimetype=mimetype, direct_passthrough=True)
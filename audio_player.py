@@ -1,132 +1,226 @@
-from pydub import AudioSegment
-from pydub.playback import play
 import threading
-import time
-import wave
 import pyaudio
-import io
 import numpy as np
-from threading import Lock
+from threading import Lock, Event
+from time_stretch import TimeStretcher
+from pcm_file import open_pcm
 
 class AudioPlayer:
-    def __init__(self):
-        self.audio_segment = None
+    def __init__(self, frames_per_buffer=1024, ring_blocks=32):
+        self.samples = None
+        self.sample_rate = 22050
+        self.channels = 1
+        self.duration = 0
         self.is_playing = False
         self.current_position = 0
-        self.playback_thread = None
         self.speed = 1.0
         self.lock = Lock()
+        # Guards the feeder's source state; taken before self.lock when both are needed
+        self.feed_lock = Lock()
         self.should_stop = False
         self.paused = False
         self.pyaudio = pyaudio.PyAudio()
         self.stream = None
         self._position_callback = None
-        
+
+        # Ring of preallocated blocks filled by the feeder thread and handed
+        # out by the real-time callback as read-only views, so the callback
+        # itself never allocates or copies audio
+        self.frames_per_buffer = frames_per_buffer
+        self.ring_blocks = ring_blocks
+        self.ring = None
+        self.ring_views = []
+        self.silence = None
+        # Source frame each block starts at, for position tracking
+        self.block_positions = [0] * ring_blocks
+        self.read_index = 0
+        self.write_index = 0
+        self.feed_position = 0
+        self.feed_complete = False
+        self.stretcher = None
+        self.pending = np.zeros(0, dtype=np.int16)
+        self.feeder_thread = None
+        self.feeder_wakeup = Event()
+
     def load_audio(self, wav_path):
         """Load audio from WAV file"""
-        self.audio_segment = AudioSegment.from_wav(wav_path)
-        self.duration = len(self.audio_segment) / 1000.0  # Duration in seconds
-        
-    def _get_audio_data(self, start_frame, num_frames, speed):
-        """Get audio data for streaming with speed adjustment"""
-        if not self.audio_segment:
+        # Memory-mapped rather than decoded, so only the pages being played are
+        # resident and opening a long audiobook costs the same as a short clip
+        self.samples, self.channels, self.sample_rate = open_pcm(wav_path)
+        self.duration = len(self.samples) / self.channels / self.sample_rate  # Duration in seconds
+
+        block_size = self.frames_per_buffer * self.channels
+        self.ring = np.zeros((self.ring_blocks, block_size), dtype=np.int16)
+        self.ring_views = [memoryview(block).toreadonly() for block in self.ring]
+        self.silence = memoryview(np.zeros(block_size, dtype=np.int16)).toreadonly()
+        with self.feed_lock, self.lock:
+            self._reset_feed(0)
+
+    def _reset_feed(self, position):
+        """Discard buffered audio and start feeding from a source frame; needs both locks"""
+        self.read_index = self.write_index
+        self.feed_position = position
+        self.feed_complete = False
+        self.pending = np.zeros(0, dtype=np.int16)
+        # Only mono audio is time-stretched; other layouts always play at 1x
+        if self.speed != 1.0 and self.channels == 1:
+            self.stretcher = TimeStretcher(self.speed, self.sample_rate)
+        else:
+            self.stretcher = None
+        self.feeder_wakeup.set()
+
+    def _next_block(self, block_size):
+        """Produce the next block of output samples from the source, or None at the end"""
+        while len(self.pending) < block_size:
+            if self.feed_position * self.channels >= len(self.samples):
+                if self.stretcher:
+                    self.pending = np.concatenate([self.pending, self.stretcher.flush()])
+                    self.stretcher = None
+                break
+            start = self.feed_position * self.channels
+            source = self.samples[start:start + block_size]
+            self.feed_position += len(source) // self.channels
+            if self.stretcher:
+                source = self.stretcher.process(source)
+            self.pending = np.concatenate([self.pending, source])
+
+        if not len(self.pending):
             return None
-            
-        # Calculate the actual frames to read based on speed
-        actual_frames = int(num_frames * speed)
-        start_ms = (start_frame / 44100) * 1000
-        end_ms = ((start_frame + actual_frames) / 44100) * 1000
-        
-        # Extract the segment
-        segment = self.audio_segment[start_ms:end_ms]
-        
-        # Resample for speed adjustment
-        if speed != 1.0:
-            segment = segment._spawn(segment.raw_data, overrides={
-                "frame_rate": int(segment.frame_rate * speed)
-            }).set_frame_rate(44100)
-        
-        return np.frombuffer(segment.raw_data, dtype=np.int16)
-        
+        block = self.pending[:block_size]
+        self.pending = self.pending[block_size:]
+        return block
+
+    def _fill(self):
+        """Fill every free ring block; runs on the feeder thread"""
+        block_size = self.frames_per_buffer * self.channels
+        while True:
+            with self.feed_lock:
+                # One block is always left free: it may be the one the callback just handed out
+                if self.feed_complete or self.write_index - self.read_index >= self.ring_blocks - 1:
+                    break
+                position = self.feed_position
+                block = self._next_block(block_size)
+                if block is None:
+                    self.feed_complete = True
+                    break
+                slot = self.write_index % self.ring_blocks
+                self.ring[slot, :len(block)] = block
+                self.ring[slot, len(block):] = 0
+                with self.lock:
+                    self.block_positions[slot] = position
+                    self.write_index += 1
+
+    def _feed(self):
+        """Feeder thread: keep the ring topped up until playback stops"""
+        # The ring holds many blocks, so polling every half block keeps it full
+        # without the callback having to signal anything
+        interval = self.frames_per_buffer / self.sample_rate / 2
+        while not self.should_stop:
+            self._fill()
+            self.feeder_wakeup.wait(interval)
+            self.feeder_wakeup.clear()
+
     def _audio_callback(self, in_data, frame_count, time_info, status):
         """Callback for PyAudio stream"""
         with self.lock:
-            if self.paused or self.should_stop:
-                return (None, pyaudio.paComplete)
-            
-            data = self._get_audio_data(self.current_position, frame_count, self.speed)
-            if data is None:
+            if self.should_stop:
                 return (None, pyaudio.paComplete)
-            
-            self.current_position += frame_count
-            
-            # Update position for UI
-            if self._position_callback:
-                current_time = (self.current_position / 44100)
-                self._position_callback(current_time, self.duration)
-            
-            return (data.tobytes(), pyaudio.paContinue)
-    
+            if self.paused:
+                return (self.silence, pyaudio.paContinue)
+
+            if self.read_index == self.write_index:
+                if self.feed_complete:
+                    return (None, pyaudio.paComplete)
+                # Underrun: keep the stream alive until the feeder catches up
+                return (self.silence, pyaudio.paContinue)
+
+            slot = self.read_index % self.ring_blocks
+            self.read_index += 1
+            self.current_position = self.block_positions[slot]
+
+        # Update position for UI
+        if self._position_callback:
+            self._position_callback(self.current_position / self.sample_rate, self.duration)
+
+        return (self.ring_views[slot], pyaudio.paContinue)
+
     def play(self):
         """Start or resume playback"""
         with self.lock:
-            if not self.audio_segment:
+            if self.samples is None:
                 return
-                
+
             if self.paused:
                 self.paused = False
                 return
-                
+
             if self.is_playing:
                 return
-                
+
             self.is_playing = True
             self.should_stop = False
-            
-            # Create and start audio stream
-            self.stream = self.pyaudio.open(
-                format=pyaudio.paInt16,
-                channels=1,
-                rate=44100,
-                output=True,
-                frames_per_buffer=1024,
-                stream_callback=self._audio_callback
-            )
-            self.stream.start_stream()
-    
+
+        # Prime the ring before the first callback asks for audio
+        self._fill()
+        self.feeder_thread = threading.Thread(target=self._feed, daemon=True)
+        self.feeder_thread.start()
+
+        # Create and start audio stream
+        stream = self.pyaudio.open(
+            format=pyaudio.paInt16,
+            channels=self.channels,
+            rate=self.sample_rate,
+            output=True,
+            frames_per_buffer=self.frames_per_buffer,
+            stream_callback=self._audio_callback
+        )
+        with self.lock:
+            self.stream = stream
+        stream.start_stream()
+
     def pause(self):
         """Pause playback"""
         with self.lock:
             self.paused = True
-            
+
     def stop(self):
         """Stop playback"""
         with self.lock:
             self.should_stop = True
             self.is_playing = False
+            self.paused = False
             self.current_position = 0
-            if self.stream:
-                self.stream.stop_stream()
-                self.stream.close()
-                self.stream = None
-    
+            stream = self.stream
+            self.stream = None
+        self.feeder_wakeup.set()
+        if self.feeder_thread:
+            self.feeder_thread.join()
+            self.feeder_thread = None
+        if stream:
+            stream.stop_stream()
+            stream.close()
+        if self.samples is not None:
+            with self.feed_lock, self.lock:
+                self._reset_feed(0)
+
     def set_speed(self, speed):
         """Set playback speed (0.5 to 4.0)"""
-        with self.lock:
+        with self.feed_lock, self.lock:
             self.speed = max(0.5, min(4.0, speed))
-    
+            # Restart feeding from the block that is playing now
+            self._reset_feed(self.current_position)
+
     def seek(self, position):
         """Seek to position in seconds"""
-        with self.lock:
-            self.current_position = int(position * 44100)
-    
+        with self.feed_lock, self.lock:
+            self.current_position = int(position * self.sample_rate)
+            self._reset_feed(self.current_position)
+
     def set_position_callback(self, callback):
         """Set callback for position updates"""
         self._position_callback = callback
-    
+
     def cleanup(self):
         """Clean up resources"""
         self.stop()
-        if self.stream:
-            self.stream.close()
-        self.pyaudio.terminate() 
\ No newline at end of file
+        self.pyaudio.terminate()
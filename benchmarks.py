@@ -0,0 +1,630 @@
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import wave
+from contextlib import contextmanager
+
+import numpy as np
+
+
+def tone_blocks(seconds, sample_rate=22050, block_seconds=10):
+    """Yield a speech-like mono 16-bit test tone as PCM blocks"""
+    block = sample_rate * block_seconds
+    for start in range(0, seconds * sample_rate, block):
+        t = np.arange(start, min(start + block, seconds * sample_rate)) / sample_rate
+        samples = 8000 * np.sin(2 * np.pi * 180 * t) * (1 + 0.5 * np.sin(2 * np.pi * 4 * t))
+        yield samples.astype(np.int16).tobytes()
+
+
+def make_test_wav(path, seconds, sample_rate=22050):
+    """Write a speech-like mono test tone of the given length"""
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        for frames in tone_blocks(seconds, sample_rate):
+            wav.writeframes(frames)
+
+
+def bench_callback(seconds=600, calls=2000):
+    """Cost and allocations of AudioPlayer._audio_callback at the start, middle and end of a file"""
+    from audio_player import AudioPlayer
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        wav_path = os.path.join(temp_dir, 'bench.wav')
+        make_test_wav(wav_path, seconds)
+        player = AudioPlayer()
+        player.load_audio(wav_path)
+
+    for speed in [1.0, 2.0]:
+        player.set_speed(speed)
+        for label, fraction in [('start', 0.0), ('middle', 0.5), ('end', 0.95)]:
+            player.seek(player.duration * fraction)
+            rounds = calls // player.ring_blocks
+            # Preallocated so recording a timing doesn't show up as an allocation
+            timings = [0.0] * (rounds * player.ring_blocks)
+            count = 0
+            peak_bytes = 0
+            tracemalloc.start()
+            for _ in range(rounds):
+                # Refill outside the measurement, as the feeder thread would
+                player._fill()
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+                while player.read_index < player.write_index:
+                    start = time.perf_counter()
+                    player._audio_callback(None, player.frames_per_buffer, None, 0)
+                    timings[count] = time.perf_counter() - start
+                    count += 1
+                peak_bytes = max(peak_bytes, tracemalloc.get_traced_memory()[1] - baseline)
+            tracemalloc.stop()
+            timings = sorted(timings[:count])
+            print(f"speed {speed}x, {label:6}: median {statistics.median(timings) * 1e6:.2f}us, "
+                  f"p99 {timings[int(len(timings) * 0.99)] * 1e6:.2f}us, "
+                  f"peak transient allocation {peak_bytes} bytes over {len(timings)} calls")
+    player.cleanup()
+
+
+def resident_bytes():
+    """Current resident set size of this process (Linux only)"""
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def bench_open(seconds=3600, play_seconds=60):
+    """Time and resident memory to open a long render and play a minute of it"""
+    from pcm_file import open_pcm
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        wav_path = os.path.join(temp_dir, 'bench.wav')
+        make_test_wav(wav_path, seconds)
+        print(f"{os.path.getsize(wav_path) / 1e6:.0f} MB file, {seconds / 3600:g} hours")
+
+        before = resident_bytes()
+        start = time.perf_counter()
+        samples, channels, sample_rate = open_pcm(wav_path)
+        opened = time.perf_counter() - start
+        # Touch a minute of audio from the middle, as playback would
+        middle = len(samples) // 2
+        checksum = int(samples[middle:middle + play_seconds * sample_rate].sum())
+        print(f"memmap: open {opened * 1e3:.2f}ms, resident +{(resident_bytes() - before) / 1e6:.1f} MB "
+              f"after playing {play_seconds}s (checksum {checksum})")
+        del samples
+
+        before = resident_bytes()
+        start = time.perf_counter()
+        with wave.open(wav_path, 'rb') as wav:
+            decoded = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+        opened = time.perf_counter() - start
+        print(f"decode: open {opened * 1e3:.2f}ms, resident +{(resident_bytes() - before) / 1e6:.1f} MB")
+        del decoded
+
+
+@contextmanager
+def scratch_app(temp_dir):
+    """The Flask app serving from a TextToSpeech kept in temp_dir, so a benchmark never touches temp_audio"""
+    import text_to_speech
+
+    live = text_to_speech.tts
+    text_to_speech.tts = text_to_speech.TextToSpeech(workers=1, temp_dir=temp_dir)
+    try:
+        yield text_to_speech.app, text_to_speech.tts
+    finally:
+        text_to_speech.tts.cleanup()
+        text_to_speech.tts = live
+
+
+def bench_serve(seconds=3600, seeks=200):
+    """Throughput and seek latency of /audio on a long render over a local HTTP server"""
+    import http.client
+    import logging
+    import random
+    import threading
+    from werkzeug.serving import make_server
+
+    with tempfile.TemporaryDirectory() as temp_dir, scratch_app(temp_dir) as (app, tts):
+        wav_path = os.path.join(temp_dir, 'bench.wav')
+        make_test_wav(wav_path, seconds)
+        size = os.path.getsize(wav_path)
+        # Serve it as a cached render, as the app would
+        key = tts.audio_cache.make_key(wav_path, None, 0, 0)
+        cached_path = tts.audio_cache.put(key, wav_path)
+        url = tts.audio_url(cached_path)
+
+        # The dev server has no wsgi.file_wrapper, so this measures the chunked path;
+        # under gunicorn full-file responses go out through sendfile()
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        connection = http.client.HTTPConnection('127.0.0.1', server.server_port)
+        try:
+            start = time.perf_counter()
+            connection.request('GET', url)
+            response = connection.getresponse()
+            etag = response.getheader('ETag')
+            received = 0
+            while True:
+                data = response.read(1024 * 1024)
+                if not data:
+                    break
+                received += len(data)
+            elapsed = time.perf_counter() - start
+            print(f"full file: {received / 1e6:.0f} MB in {elapsed:.2f}s, {received / elapsed / 1e6:.0f} MB/s")
+
+            # Seek the way an <audio> element does: an open-ended range, reading the first 64 KB
+            latencies = []
+            for _ in range(seeks):
+                offset = random.randrange(size)
+                start = time.perf_counter()
+                connection.request('GET', url, headers={'Range': f'bytes={offset}-'})
+                response = connection.getresponse()
+                response.read(64 * 1024)
+                latencies.append(time.perf_counter() - start)
+                # Drop the rest of the body by reconnecting
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', server.server_port)
+            latencies.sort()
+            print(f"seek: median {statistics.median(latencies) * 1e3:.2f}ms, "
+                  f"p99 {latencies[int(len(latencies) * 0.99)] * 1e3:.2f}ms to first 64 KB")
+
+            start = time.perf_counter()
+            for _ in range(seeks):
+                connection.request('GET', url, headers={'If-None-Match': etag})
+                response = connection.getresponse()
+                response.read()
+            elapsed = time.perf_counter() - start
+            print(f"revalidation: {response.status} in {elapsed / seeks * 1e3:.2f}ms per request")
+        finally:
+            connection.close()
+            server.shutdown()
+
+
+def make_test_pdf(path, page_count, sentences=40):
+    """Write a plain text PDF with the given number of pages"""
+    font_id = 3 + 2 * page_count
+    objects = [
+        '<< /Type /Catalog /Pages 2 0 R >>',
+        '<< /Type /Pages /Kids [{}] /Count {} >>'.format(
+            ' '.join(f'{3 + 2 * page} 0 R' for page in range(page_count)), page_count)
+    ]
+    for page in range(page_count):
+        lines = ' '.join(f'(Page {page + 1}, sentence {line + 1} of the benchmark document.) Tj T*'
+                         for line in range(sentences))
+        content = f'BT /F1 10 Tf 14 TL 50 760 Td {lines} ET'
+        objects.append(f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+                       f'/Contents {4 + 2 * page} 0 R /Resources << /Font << /F1 {font_id} 0 R >> >> >>')
+        objects.append(f'<< /Length {len(content)} >>\nstream\n{content}\nendstream')
+    objects.append('<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>')
+
+    with open(path, 'wb') as pdf:
+        pdf.write(b'%PDF-1.4\n')
+        offsets = []
+        for number, body in enumerate(objects, 1):
+            offsets.append(pdf.tell())
+            pdf.write(f'{number} 0 obj\n{body}\nendobj\n'.encode('latin-1'))
+        xref = pdf.tell()
+        pdf.write(f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode('latin-1'))
+        for offset in offsets:
+            pdf.write(f'{offset:010d} 00000 n \n'.encode('latin-1'))
+        pdf.write(f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode('latin-1'))
+
+
+def bench_pdf(page_count=1000):
+    """PDF extraction pages/sec in-process and over a worker pool, then a cached re-upload"""
+    from pdf_extractor import PdfExtractor
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = os.path.join(temp_dir, 'bench.pdf')
+        make_test_pdf(pdf_path, page_count)
+        for workers in sorted({1, os.cpu_count() or 1}):
+            extractor = PdfExtractor(os.path.join(temp_dir, f'text_cache_{workers}'), workers)
+            start = time.perf_counter()
+            pages, title = extractor.open(pdf_path)
+            characters = sum(len(text) for _, _, text in pages)
+            elapsed = time.perf_counter() - start
+            print(f"{workers} worker(s): {page_count} pages, {characters} characters in {elapsed:.2f}s, "
+                  f"{page_count / elapsed:.0f} pages/sec")
+
+            start = time.perf_counter()
+            pages, title = extractor.open(pdf_path)
+            characters = sum(len(text) for _, _, text in pages)
+            elapsed = time.perf_counter() - start
+            stats = extractor.get_stats()
+            print(f"  re-upload: {elapsed * 1e3:.1f}ms from cache, hit rate {stats['cache_hit_rate']:.0%}")
+            extractor.close()
+
+
+def make_test_pages(directory, count=30, paragraphs=40):
+    """Save article pages in the generic, fee.org and mises.org layouts, with typical site boilerplate"""
+    boilerplate = (
+        '<script>' + 'var tracking = {};' * 200 + '</script>'
+        '<nav><ul>' + ''.join(f'<li><a href="/section/{i}">Section {i}</a></li>' for i in range(80)) + '</ul></nav>'
+    )
+    footer = '<footer>' + ''.join(f'<p><a href="/link/{i}">Related article {i}</a></p>' for i in range(120)) + '</footer>'
+    layouts = {
+        'generic': ('https://example.com/articles/{}',
+                    '<h1 class="entry-title">Generic article {}</h1><article>{}</article>'),
+        'fee': ('https://fee.org/articles/{}',
+                '<h1>Fee article {}</h1><h2>A subtitle</h2><div class="article-content-wrapper">{}</div>'),
+        'mises': ('https://mises.org/wire/{}',
+                  '<h1>Mises article {}</h1><div class="prose max-w-none"><div>{}</div></div>')
+    }
+    pages = []
+    for number in range(count):
+        name = list(layouts)[number % len(layouts)]
+        url, body = layouts[name]
+        text = ''.join(f'<p>Paragraph {i} of article {number} makes a point. <em>It</em> goes on.</p>'
+                       for i in range(paragraphs))
+        html = (f'<html><head><title>Article {number}</title><meta property="og:title" content="Article {number}">'
+                f'<style>{"body { margin: 0 } " * 100}</style></head><body>{boilerplate}'
+                f'{body.format(number, text)}<aside>{boilerplate}</aside>{footer}</body></html>')
+        path = os.path.join(directory, f'{name}_{number}.html')
+        with open(path, 'w', encoding='utf-8') as page:
+            page.write(html)
+        pages.append((url.format(number), path))
+    return pages
+
+
+def bench_extract(rounds=3):
+    """Per-page article extraction time and peak memory: whole-page parsing versus the fast path"""
+    from bs4 import BeautifulSoup
+    from extractors import find_extractor
+    from html_parsing import PARSER, ElementStrainer
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pages = []
+        for url, path in make_test_pages(temp_dir):
+            with open(path, encoding='utf-8') as page:
+                pages.append((find_extractor(url), page.read()))
+
+    modes = {
+        'html.parser, whole page': lambda extractor, html: extractor.extract(
+            BeautifulSoup(html, 'html.parser')),
+        'html.parser, content only': lambda extractor, html: extractor.extract(
+            BeautifulSoup(html, 'html.parser', parse_only=ElementStrainer(extractor.parse_only))),
+        f'{PARSER}, content only (fast path)': lambda extractor, html: extractor.extract_html(html)
+    }
+
+    # Silence the extractors' progress prints while timing them
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        expected = [extractor.extract(BeautifulSoup(html, 'html.parser')) for extractor, html in pages]
+        results = {}
+        for label, extract in modes.items():
+            timings = []
+            for _ in range(rounds):
+                for extractor, html in pages:
+                    start = time.perf_counter()
+                    extract(extractor, html)
+                    timings.append(time.perf_counter() - start)
+            # Traced separately, since tracemalloc slows everything down
+            peak = 0
+            tracemalloc.start()
+            for (extractor, html), wanted in zip(pages, expected):
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+                if extract(extractor, html) != wanted:
+                    raise AssertionError(f"{label} extracts different text")
+                peak = max(peak, tracemalloc.get_traced_memory()[1] - baseline)
+            tracemalloc.stop()
+            results[label] = (statistics.median(timings), peak)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    page_kb = statistics.median(len(html) for _, html in pages) / 1024
+    print(f"{len(pages)} pages, median {page_kb:.0f} KB")
+    for label, (median, peak) in results.items():
+        print(f"{label:38}: {median * 1e3:6.2f}ms per page, peak {peak / 1e6:5.1f} MB")
+
+    start = time.perf_counter()
+    for _ in range(100000):
+        find_extractor('https://www.mises.org/wire/article')
+    print(f"registry lookup: {(time.perf_counter() - start) / 100000 * 1e6:.2f}us per URL")
+
+
+def bench_fetch(page_mb=50):
+    """Time and peak memory to fetch a normal page and to give up on an oversized one"""
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from http_fetch import ContentRejected, Fetcher
+
+    chunk = b'<p>' + b'x' * (64 * 1024 - 3)
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.end_headers()
+            # No Content-Length, so the size is only known by reading
+            count = page_mb * 16 if self.path == '/huge' else 4
+            try:
+                for _ in range(count):
+                    self.wfile.write(chunk)
+            except OSError:
+                pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        fetcher = Fetcher(temp_dir)
+        for path in ('/page', '/huge'):
+            tracemalloc.start()
+            start = time.perf_counter()
+            try:
+                outcome = f"{len(fetcher.get(f'http://127.0.0.1:{server.server_port}{path}').content) / 1024:.0f} KB"
+            except ContentRejected:
+                outcome = 'rejected'
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{path:6}: {outcome:9} in {elapsed * 1e3:7.1f}ms, peak {peak / 1e6:5.1f} MB "
+                  f"(limit {fetcher.max_bytes / 1e6:.1f} MB)")
+        fetcher.close()
+    server.shutdown()
+
+
+def bench_backends(utterances=50):
+    """Per-utterance synthesis time, and time to the first streamed block, of each speech backend on this machine"""
+    from tts_backends import BACKENDS, BackendUnavailable
+
+    sentence = "The quick brown fox jumps over the lazy dog, then naps in the afternoon sun."
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for name, backend_class in BACKENDS.items():
+            start = time.perf_counter()
+            try:
+                backend = backend_class()
+            except BackendUnavailable as e:
+                print(f"{name:8}: unavailable ({e})")
+                continue
+            startup = time.perf_counter() - start
+            timings = []
+            first_blocks = []
+            audio_seconds = 0.0
+            for _ in range(utterances):
+                start = time.perf_counter()
+                first_block = None
+                for params, frames in backend.stream(sentence, temp_dir):
+                    if first_block is None:
+                        first_block = time.perf_counter() - start
+                    audio_seconds += len(frames) / (params[0] * params[1] * params[2])
+                timings.append(time.perf_counter() - start)
+                first_blocks.append(first_block)
+            backend.close()
+            print(f"{name:8}: startup {startup * 1e3:7.1f}ms, {statistics.median(timings) * 1e3:7.2f}ms per utterance, "
+                  f"first audio after {statistics.median(first_blocks) * 1e3:7.2f}ms, "
+                  f"{audio_seconds / sum(timings):6.1f}x realtime")
+
+
+def disk_bytes_written():
+    """Bytes this process and its finished children have written to disk (Linux only)"""
+    import resource
+    with open('/proc/self/io') as io:
+        own = int(next(line for line in io if line.startswith('write_bytes')).split()[1])
+    # Reaped children's write_bytes, in 512 byte blocks
+    return own + resource.getrusage(resource.RUSAGE_CHILDREN).ru_oublock * 512
+
+
+def bench_encode(seconds=600, sample_rate=22050):
+    """Wall time and disk bytes written per hour of audio: WAV then pydub export versus piping PCM to the encoder"""
+    from pydub import AudioSegment
+    from audio_encoder import StreamEncoder
+
+    def via_wav(temp_dir):
+        wav_path = os.path.join(temp_dir, 'audio.wav')
+        with wave.open(wav_path, 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(sample_rate)
+            for frames in tone_blocks(seconds, sample_rate, 1):
+                wav.writeframes(frames)
+        AudioSegment.from_wav(wav_path).export(os.path.join(temp_dir, 'audio.mp3'), format='mp3', bitrate='64k')
+        os.remove(wav_path)
+
+    def piped(temp_dir):
+        encoder = StreamEncoder(os.path.join(temp_dir, 'audio.mp3'), (1, 2, sample_rate))
+        for frames in tone_blocks(seconds, sample_rate, 1):
+            encoder.write(frames)
+        encoder.close()
+
+    per_hour = 3600 / seconds
+    for label, encode in [('WAV file, then pydub export', via_wav), ('PCM piped to ffmpeg', piped)]:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            written = disk_bytes_written()
+            start = time.perf_counter()
+            encode(temp_dir)
+            elapsed = time.perf_counter() - start
+            written = disk_bytes_written() - written
+            mp3_bytes = os.path.getsize(os.path.join(temp_dir, 'audio.mp3'))
+        print(f"{label:28}: {elapsed * per_hour:6.1f}s and {written * per_hour / 1e6:7.1f} MB written "
+              f"per hour of audio ({mp3_bytes * per_hour / 1e6:.1f} MB of MP3)")
+
+
+def bench_export(seconds=1800, sample_rate=22050):
+    """MP3 export time of a long render: one ffmpeg versus chunks encoded across every core"""
+    from audio_encoder import ParallelMp3Encoder, StreamEncoder
+
+    workers = os.cpu_count() or 1
+    encoders = [
+        ('single ffmpeg', lambda path: StreamEncoder(path, (1, 2, sample_rate))),
+        (f'{workers} parallel chunks', lambda path: ParallelMp3Encoder(path, (1, 2, sample_rate), workers=workers))
+    ]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for label, make_encoder in encoders:
+            path = os.path.join(temp_dir, 'export.mp3')
+            start = time.perf_counter()
+            encoder = make_encoder(path)
+            for frames in tone_blocks(seconds, sample_rate):
+                encoder.write(frames)
+            encoder.close()
+            elapsed = time.perf_counter() - start
+            print(f"{label:20}: {elapsed:6.2f}s for {seconds / 60:.0f} minutes of audio "
+                  f"({seconds / elapsed:5.0f}x realtime), {os.path.getsize(path) / 1e6:.1f} MB")
+
+
+def bench_hls(seconds=1800, sample_rate=22050):
+    """Time until a segmented render can start playing versus a single MP3, and bytes fetched per seek"""
+    from audio_encoder import ParallelMp3Encoder
+    from hls import HlsSegmenter
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        start = time.perf_counter()
+        encoder = ParallelMp3Encoder(os.path.join(temp_dir, 'book.mp3'), (1, 2, sample_rate))
+        for frames in tone_blocks(seconds, sample_rate):
+            encoder.write(frames)
+        encoder.close()
+        print(f"single MP3    : playable after {time.perf_counter() - start:6.2f}s")
+
+        start = time.perf_counter()
+        first_segment = None
+        segmenter = HlsSegmenter(os.path.join(temp_dir, 'hls'), (1, 2, sample_rate))
+        for frames in tone_blocks(seconds, sample_rate, block_seconds=1):
+            segmenter.write(frames)
+            if first_segment is None and segmenter.segments:
+                first_segment = time.perf_counter() - start
+        segmenter.close()
+        print(f"HLS segments  : playable after {first_segment:6.2f}s, "
+              f"all {len(segmenter.segments)} written after {time.perf_counter() - start:6.2f}s")
+
+        segment_bytes = os.path.getsize(os.path.join(temp_dir, 'hls', 'seg_00001.mp3'))
+        wav_bytes = segmenter.segments[1] * sample_rate * 2
+        print(f"seek          : {segment_bytes / 1e3:.0f} KB segment versus {wav_bytes / 1e3:.0f} KB of WAV "
+              f"for the same {segmenter.segments[1]:.1f}s")
+
+
+def bench_ladder(seconds=600, sample_rate=22050):
+    """Time to segment one rendition versus the whole ladder, and bytes shipped per listening hour of each"""
+    from audio_encoder import DEFAULT_BITRATE
+    from hls import LADDER, HlsLadder
+
+    wav_bytes = 3600 * sample_rate * 2
+    print(f"{'WAV':14}: {wav_bytes / 1e6:7.1f} MB per listening hour")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for bitrates in ([DEFAULT_BITRATE], LADDER):
+            directory = os.path.join(temp_dir, '-'.join(bitrates))
+            start = time.perf_counter()
+            ladder = HlsLadder(directory, (1, 2, sample_rate), bitrates)
+            for frames in tone_blocks(seconds, sample_rate):
+                ladder.write(frames)
+            ladder.close()
+            print(f"{len(bitrates)} rendition(s): segmented in {time.perf_counter() - start:6.2f}s")
+        for rendition in ladder.renditions:
+            rendition_bytes = sum(os.path.getsize(os.path.join(rendition.directory, name))
+                                  for name in os.listdir(rendition.directory) if name.endswith('.mp3'))
+            print(f"{rendition.bitrate:14}: {rendition_bytes * 3600 / seconds / 1e6:7.1f} MB per listening hour")
+
+
+def _serve_app(conn):
+    """Run the app on a local server for bench_events, reporting its CPU seconds whenever asked"""
+    import logging
+    import threading
+    from werkzeug.serving import make_server
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    # The benchmark's sessions go in a scratch store, not the live one
+    with tempfile.TemporaryDirectory() as temp_dir, scratch_app(temp_dir) as (app, tts):
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        conn.send(server.server_port)
+        while conn.recv() != 'stop':
+            times = os.times()
+            conn.send(times.user + times.system)
+        server.shutdown()
+
+
+def bench_events(listeners=200, seconds=20):
+    """Requests/sec and server CPU for idle players polling /player_state every second versus listening on /events"""
+    import http.client
+    import multiprocessing
+    import random
+    import threading
+
+    def session_cookie(port):
+        connection = http.client.HTTPConnection('127.0.0.1', port)
+        connection.request('GET', '/player_state')
+        response = connection.getresponse()
+        response.read()
+        connection.close()
+        return response.getheader('Set-Cookie').split(';')[0]
+
+    def poll(port, cookie, stop, counts):
+        # Spread the listeners over the second, as real page loads would be
+        time.sleep(random.random())
+        while not stop.is_set():
+            started = time.perf_counter()
+            connection = http.client.HTTPConnection('127.0.0.1', port)
+            connection.request('GET', '/player_state', headers={'Cookie': cookie})
+            received = len(connection.getresponse().read())
+            connection.close()
+            with lock:
+                counts['requests'] += 1
+                counts['bytes'] += received
+            time.sleep(max(0, 1 - (time.perf_counter() - started)))
+
+    def listen(port, cookie, stop, counts):
+        connection = http.client.HTTPConnection('127.0.0.1', port)
+        connection.request('GET', '/events', headers={'Cookie': cookie})
+        response = connection.getresponse()
+        with lock:
+            counts['requests'] += 1
+        while not stop.is_set():
+            line = response.fp.readline()
+            if not line:
+                break
+            with lock:
+                counts['bytes'] += len(line)
+
+    lock = threading.Lock()
+    context = multiprocessing.get_context('spawn')
+    for label, client in (('polling', poll), ('events', listen)):
+        conn, child_conn = context.Pipe()
+        server = context.Process(target=_serve_app, args=(child_conn,), daemon=True)
+        server.start()
+        port = conn.recv()
+        stop = threading.Event()
+        counts = {'requests': 0, 'bytes': 0}
+        for cookie in [session_cookie(port) for _ in range(listeners)]:
+            threading.Thread(target=client, args=(port, cookie, stop, counts), daemon=True).start()
+        # Let every listener connect before measuring
+        time.sleep(2)
+        conn.send('cpu')
+        cpu_start = conn.recv()
+        requests_start, bytes_start = counts['requests'], counts['bytes']
+        time.sleep(seconds)
+        conn.send('cpu')
+        cpu = conn.recv() - cpu_start
+        requests, received = counts['requests'] - requests_start, counts['bytes'] - bytes_start
+        stop.set()
+        conn.send('stop')
+        server.join(5)
+        print(f"{label:8}: {listeners} idle listeners, {requests / seconds:7.1f} requests/s, "
+              f"server CPU {cpu / seconds * 100:5.1f}%, {received / seconds / 1e3:6.1f} KB/s sent")
+
+
+BENCHMARKS = {
+    'callback': bench_callback,
+    'open': bench_open,
+    'serve': bench_serve,
+    'pdf': bench_pdf,
+    'extract': bench_extract,
+    'fetch': bench_fetch,
+    'backends': bench_backends,
+    'encode': bench_encode,
+    'export': bench_export,
+    'hls': bench_hls,
+    'ladder': bench_ladder,
+    'events': bench_events,
+}
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        print(f"\n== {name} ==")
+        BENCHMARKS[name]()
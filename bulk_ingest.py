@@ -0,0 +1,161 @@
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from threading import Lock
+from urllib.parse import urlparse
+
+from http_fetch import fetch
+from extraction_cache import content_hash, get_extraction_cache
+from job_queue import FINISHED_STATES, QueueFullError
+from extractors import extract_html, find_extractor
+
+# Fetches in flight across the whole batch, and to any one site
+MAX_CONCURRENCY = 16
+MAX_PER_DOMAIN = 4
+
+_parse_pool = None
+_parse_pool_lock = Lock()
+
+
+def get_parse_pool():
+    """Process pool that runs the HTML extractors, created on first use"""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            _parse_pool = ProcessPoolExecutor(
+                os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _parse_pool
+
+
+class BulkIngest:
+    """A batch of article URLs, fetched concurrently, extracted in a process pool and queued for synthesis"""
+
+    def __init__(self, urls, submit, max_concurrency=MAX_CONCURRENCY, max_per_domain=MAX_PER_DOMAIN):
+        self.id = uuid.uuid4().hex
+        # submit(text, title) queues synthesis and returns the job
+        self.submit = submit
+        self.max_concurrency = max_concurrency
+        self.max_per_domain = max_per_domain
+        self.lock = Lock()
+        self.results = {}
+        for url in urls:
+            url = url.strip()
+            if url and url not in self.results:
+                self.results[url] = {'url': url, 'status': 'pending', 'title': '', 'job_id': None,
+                                     'error': None, 'bytes': 0, 'fetch_seconds': None}
+        self.started_at = None
+        self.finished_at = None
+
+    def _update(self, url, **changes):
+        with self.lock:
+            self.results[url].update(changes)
+
+    async def run(self):
+        """Ingest every URL, returning once each has been queued or has failed"""
+        self.started_at = time.time()
+        loop = asyncio.get_running_loop()
+        everywhere = asyncio.Semaphore(self.max_concurrency)
+        domains = {}
+        # Blocking fetches run on their own threads, one per allowed concurrent fetch
+        with ThreadPoolExecutor(self.max_concurrency, thread_name_prefix='bulk-fetch') as fetch_pool:
+            await asyncio.gather(*[
+                self._ingest(loop, url, everywhere, domains, fetch_pool)
+                for url in self.results
+            ])
+        self.finished_at = time.time()
+
+    async def _ingest(self, loop, url, everywhere, domains, fetch_pool):
+        """Fetch, extract and queue one URL, recording how far it got"""
+        host = (urlparse(url).hostname or '').lower()
+        domain = domains.setdefault(host, asyncio.Semaphore(self.max_per_domain))
+        try:
+            extractor = find_extractor(url)
+            cache = get_extraction_cache()
+            # Articles extracted within the TTL skip the fetch and the parse. Cache files are read,
+            # hashed and written off the event loop, and outside the fetch limits
+            cached = await loop.run_in_executor(None, cache.get, url, extractor)
+            if not cached:
+                # Queue behind the site first, so a URL waiting on a busy host holds no global slot
+                async with domain:
+                    async with everywhere:
+                        self._update(url, status='fetching')
+                        started = time.time()
+                        response = await loop.run_in_executor(fetch_pool, fetch, url, extractor.headers)
+                self._update(url, bytes=len(response.content), fetch_seconds=time.time() - started)
+                digest = await loop.run_in_executor(None, content_hash, response.content)
+                cached = await loop.run_in_executor(None, cache.get_unchanged, url, extractor, digest)
+
+            if cached:
+                text, title = cached
+            else:
+                self._update(url, status='extracting')
+                async with everywhere:
+                    text, title = await loop.run_in_executor(get_parse_pool(), extract_html, url, response.text)
+                if not text:
+                    raise ValueError("No article text found")
+                await loop.run_in_executor(None, cache.put, url, response.url, digest, extractor, text, title)
+
+            # Wait for room rather than dropping articles when the job queue is full
+            while True:
+                try:
+                    job = self.submit(text, title or url)
+                    break
+                except QueueFullError:
+                    self._update(url, status='waiting')
+                    await asyncio.sleep(1)
+            self._update(url, status='queued', title=title, job_id=job.id)
+        except Exception as e:
+            print(f"Error ingesting {url}: {str(e)}")
+            self._update(url, status='error', error=str(e))
+
+    def to_dict(self):
+        """Per-URL status and aggregate throughput"""
+        with self.lock:
+            results = [dict(result) for result in self.results.values()]
+        counts = {}
+        for result in results:
+            counts[result['status']] = counts.get(result['status'], 0) + 1
+        finished = sum(1 for result in results if result['status'] in ('queued', 'error'))
+        elapsed = ((self.finished_at or time.time()) - self.started_at) if self.started_at else 0
+        fetched = [result for result in results if result['fetch_seconds'] is not None]
+        return {
+            'batch_id': self.id,
+            'complete': self.finished_at is not None,
+            'counts': counts,
+            'elapsed': elapsed,
+            'urls_per_second': finished / elapsed if elapsed else 0.0,
+            'bytes_per_second': sum(result['bytes'] for result in fetched) / elapsed if elapsed else 0.0,
+            'avg_fetch_seconds': sum(result['fetch_seconds'] for result in fetched) / len(fetched) if fetched else None,
+            'results': results
+        }
+
+
+if __name__ == "__main__":
+    # Ingest a file of URLs (one per line, or stdin) into the audio cache
+    from text_to_speech import tts
+
+    source = open(sys.argv[1]) if len(sys.argv) > 1 else sys.stdin
+    with source:
+        batch = BulkIngest(source.read().split(), tts.submit_article)
+    print(f"Ingesting {len(batch.results)} URLs")
+    asyncio.run(batch.run())
+    summary = batch.to_dict()
+    print(f"Extracted and queued in {summary['elapsed']:.1f}s "
+          f"({summary['urls_per_second']:.1f} URLs/sec): {summary['counts']}")
+
+    # Wait for synthesis so the audio is in the cache before exiting
+    for result in summary['results']:
+        if result['job_id']:
+            job = tts.jobs.get(result['job_id'])
+            while job.state not in FINISHED_STATES:
+                time.sleep(0.5)
+            print(f"{job.state:5} {result['url']} {job.result or job.error}")
+        else:
+            print(f"error {result['url']} {result['error']}")
+    tts.cleanup()
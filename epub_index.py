@@ -0,0 +1,138 @@
+import posixpath
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote
+from xml.etree import ElementTree
+
+from bs4 import BeautifulSoup
+
+HTML_TYPES = ('application/xhtml+xml', 'text/html')
+# Elements whose text ends a paragraph when spoken
+BLOCK_TAGS = ['p', 'div', 'li', 'blockquote', 'pre', 'tr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+# Rough share of a chapter file that is readable text rather than markup
+TEXT_PER_BYTE = 0.6
+CHARS_PER_WORD = 6
+
+
+def _local(tag):
+    """Tag name without its XML namespace"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _resolve(base_dir, href):
+    """Archive path of an href relative to base_dir, without any fragment"""
+    return posixpath.normpath(posixpath.join(base_dir, unquote(href.split('#', 1)[0])))
+
+
+class EpubIndex:
+    """Chapter list of an EPUB read from its package document alone.
+
+    Only container.xml, the OPF and the table of contents are parsed when
+    the index is built; chapter text is read from the archive on demand.
+    Iterating the index yields (chapter number, chapter count, text) in
+    reading order while the next chapter is extracted in the background.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.title = None
+        self.chapters = []
+        with zipfile.ZipFile(path) as archive:
+            container = ElementTree.fromstring(archive.read('META-INF/container.xml'))
+            rootfile = next(el for el in container.iter() if _local(el.tag) == 'rootfile')
+            opf_path = rootfile.get('full-path')
+            self._read_package(archive, opf_path)
+
+    def _read_package(self, archive, opf_path):
+        """Build the chapter list from the OPF's manifest, spine and table of contents"""
+        opf_dir = posixpath.dirname(opf_path)
+        package = ElementTree.fromstring(archive.read(opf_path))
+        manifest = {}
+        spine = []
+        toc_id = None
+        for element in package.iter():
+            tag = _local(element.tag)
+            if tag == 'title' and self.title is None and element.text:
+                self.title = element.text.strip()
+            elif tag == 'item':
+                manifest[element.get('id')] = element
+            elif tag == 'spine':
+                toc_id = element.get('toc')
+            elif tag == 'itemref' and element.get('linear', 'yes') != 'no':
+                spine.append(element.get('idref'))
+
+        titles = {}
+        nav_path = None
+        for item in manifest.values():
+            if 'nav' in (item.get('properties') or '').split():
+                nav_path = _resolve(opf_dir, item.get('href'))
+                titles = self._read_nav(archive, nav_path)
+                break
+        if not titles and toc_id in manifest:
+            titles = self._read_ncx(archive, _resolve(opf_dir, manifest[toc_id].get('href')))
+
+        sizes = {info.filename: info.file_size for info in archive.infolist()}
+        for idref in spine:
+            item = manifest.get(idref)
+            if item is None or item.get('media-type') not in HTML_TYPES:
+                continue
+            href = _resolve(opf_dir, item.get('href'))
+            # The table of contents is often in the spine, but isn't worth reading aloud
+            if href not in sizes or href == nav_path:
+                continue
+            self.chapters.append({
+                'index': len(self.chapters),
+                'title': titles.get(href) or f'Section {len(self.chapters) + 1}',
+                'href': href,
+                'size': sizes[href]
+            })
+
+    def _read_nav(self, archive, nav_path):
+        """Map chapter paths to titles from an EPUB 3 navigation document"""
+        soup = BeautifulSoup(archive.read(nav_path), 'html.parser')
+        nav = soup.find('nav', attrs={'epub:type': 'toc'}) or soup.find('nav')
+        titles = {}
+        if nav:
+            for link in nav.find_all('a', href=True):
+                titles.setdefault(_resolve(posixpath.dirname(nav_path), link['href']), link.get_text(' ', strip=True))
+        return titles
+
+    def _read_ncx(self, archive, ncx_path):
+        """Map chapter paths to titles from an EPUB 2 NCX table of contents"""
+        titles = {}
+        for point in ElementTree.fromstring(archive.read(ncx_path)).iter():
+            if _local(point.tag) != 'navPoint':
+                continue
+            label = next((el.text for el in point.iter() if _local(el.tag) == 'text'), None)
+            content = next((el for el in point if _local(el.tag) == 'content'), None)
+            if label and content is not None:
+                titles.setdefault(_resolve(posixpath.dirname(ncx_path), content.get('src')), label.strip())
+        return titles
+
+    def estimate_seconds(self, words_per_minute):
+        """Estimated spoken length of each chapter, from the size of its file"""
+        return [
+            chapter['size'] * TEXT_PER_BYTE / CHARS_PER_WORD / words_per_minute * 60
+            for chapter in self.chapters
+        ]
+
+    def read_chapter(self, index):
+        """Extract the text of one chapter"""
+        with zipfile.ZipFile(self.path) as archive:
+            html = archive.read(self.chapters[index]['href'])
+        soup = BeautifulSoup(html, 'html.parser')
+        body = soup.body or soup
+        # Blank lines after block elements become paragraph breaks for the chunker
+        for block in body.find_all(BLOCK_TAGS):
+            block.append('\n\n')
+        return body.get_text()
+
+    def __iter__(self):
+        # One chapter ahead: the next is extracted while this one is synthesized
+        with ThreadPoolExecutor(1) as executor:
+            upcoming = executor.submit(self.read_chapter, 0) if self.chapters else None
+            for index in range(len(self.chapters)):
+                text = upcoming.result()
+                if index + 1 < len(self.chapters):
+                    upcoming = executor.submit(self.read_chapter, index + 1)
+                yield index + 1, len(self.chapters), text
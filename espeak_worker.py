@@ -0,0 +1,104 @@
+"""Long-lived espeak-ng synthesis process driven over stdin/stdout.
+
+Started as `python espeak_worker.py RATE VOLUME VOICE`. On startup it writes
+the engine's sample rate as a little-endian uint32, or 0 if libespeak-ng
+could not be loaded. Each request is a uint32 byte length followed by that
+much UTF-8 text; the reply is the text's 16-bit mono PCM as a series of
+length-prefixed blocks, written as the engine produces them and ended by a
+zero-length block.
+"""
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+
+AUDIO_OUTPUT_SYNCHRONOUS = 2
+POS_CHARACTER = 1
+ESPEAK_CHARS_UTF8 = 1
+ESPEAK_RATE = 1
+ESPEAK_VOLUME = 2
+
+SYNTH_CALLBACK = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.POINTER(ctypes.c_short), ctypes.c_int, ctypes.c_void_p)
+
+
+def load_library():
+    """Load libespeak-ng, or return None if it isn't installed"""
+    names = [ctypes.util.find_library('espeak-ng'), 'libespeak-ng.so.1', 'libespeak-ng.dylib', 'libespeak-ng.dll']
+    for name in names:
+        if not name:
+            continue
+        try:
+            return ctypes.CDLL(name)
+        except OSError:
+            continue
+    return None
+
+
+def read_exact(stream, size):
+    data = b''
+    while len(data) < size:
+        block = stream.read(size - len(data))
+        if not block:
+            return None
+        data += block
+    return data
+
+
+def main():
+    rate, volume = int(sys.argv[1]), float(sys.argv[2])
+    voice = sys.argv[3] if len(sys.argv) > 3 else 'en'
+    # The protocol owns stdout; anything the library prints goes to stderr instead
+    out = os.fdopen(os.dup(1), 'wb')
+    os.dup2(2, 1)
+    requests = sys.stdin.buffer
+
+    library = load_library()
+    sample_rate = library.espeak_Initialize(AUDIO_OUTPUT_SYNCHRONOUS, 0, None, 0) if library else -1
+    if sample_rate <= 0:
+        print("Error loading libespeak-ng", file=sys.stderr)
+        out.write(struct.pack('<I', 0))
+        out.flush()
+        return 1
+
+    library.espeak_Synth.argtypes = [ctypes.c_char_p, ctypes.c_size_t, ctypes.c_uint, ctypes.c_int, ctypes.c_uint,
+                                     ctypes.c_uint, ctypes.c_void_p, ctypes.c_void_p]
+    library.espeak_SetVoiceByName.argtypes = [ctypes.c_char_p]
+    if library.espeak_SetVoiceByName(voice.encode('utf-8')) != 0:
+        print(f"Error selecting voice {voice}, using en", file=sys.stderr)
+        library.espeak_SetVoiceByName(b'en')
+    library.espeak_SetParameter(ESPEAK_RATE, rate, 0)
+    # espeak's volume runs 0-200 with 100 as normal
+    library.espeak_SetParameter(ESPEAK_VOLUME, int(volume * 100), 0)
+
+    def on_audio(wav, sample_count, events):
+        if sample_count > 0 and wav:
+            out.write(struct.pack('<I', sample_count * 2))
+            out.write(ctypes.string_at(wav, sample_count * 2))
+        return 0
+
+    # Kept referenced for as long as the library may call it
+    callback = SYNTH_CALLBACK(on_audio)
+    library.espeak_SetSynthCallback(callback)
+
+    out.write(struct.pack('<I', sample_rate))
+    out.flush()
+    while True:
+        header = read_exact(requests, 4)
+        if header is None:
+            break
+        text = read_exact(requests, struct.unpack('<I', header)[0])
+        if text is None:
+            break
+        if text.strip():
+            data = text + b'\0'
+            library.espeak_Synth(data, len(data), 0, POS_CHARACTER, 0, ESPEAK_CHARS_UTF8, None, None)
+            library.espeak_Synchronize()
+        out.write(struct.pack('<I', 0))
+        out.flush()
+    library.espeak_Terminate()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from threading import Lock
+
+from audio_cache import AudioCache
+
+# Seconds an extraction is reused without contacting the site again
+EXTRACTION_TTL = 6 * 3600
+
+
+def content_hash(content):
+    """SHA-256 of a fetched page's body"""
+    return hashlib.sha256(content).hexdigest()
+
+
+class ExtractionCache:
+    """Extracted article text keyed by URL, reused until its TTL runs out.
+
+    Each entry records the URL the page was finally fetched from, the hash
+    of its body, the extractor name and version, and the extracted title and
+    text. Within the TTL an entry is returned without any network access;
+    after it, the page is fetched again (usually a cheap revalidation) and
+    the entry is still reused if the body hash and extractor version match,
+    so only pages that really changed are parsed again.
+    """
+
+    def __init__(self, cache_dir=None, ttl=EXTRACTION_TTL, cache_bytes=64 * 1024 ** 2):
+        self.ttl = ttl
+        cache_dir = cache_dir or os.path.join(os.getcwd(), 'temp_audio', 'extraction_cache')
+        self.cache = AudioCache(cache_dir, cache_bytes)
+        self.lock = Lock()
+        self.hits = 0
+        self.unchanged = 0
+        self.misses = 0
+
+    @staticmethod
+    def cache_key(url):
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _load(self, url):
+        cached_path = self.cache.get(self.cache_key(url))
+        if not cached_path:
+            return None
+        try:
+            with open(cached_path, encoding='utf-8') as cached:
+                return json.load(cached)
+        except (OSError, ValueError):
+            return None
+
+    def get(self, url, extractor):
+        """Get (text, title) for a URL extracted within the TTL by this extractor version, or None"""
+        entry = self._load(url)
+        if entry and entry['extractor'] == extractor.version_tag and time.time() - entry['extracted_at'] < self.ttl:
+            with self.lock:
+                self.hits += 1
+            return entry['text'], entry['title']
+        return None
+
+    def get_unchanged(self, url, extractor, digest):
+        """Get (text, title) for a refetched page whose body hashes to digest, or None if it must be parsed"""
+        entry = self._load(url)
+        if entry and entry['extractor'] == extractor.version_tag and entry['content_hash'] == digest:
+            with self.lock:
+                self.unchanged += 1
+            # Restart the TTL, since the page was just confirmed current
+            self.put(url, entry['final_url'], digest, extractor, entry['text'], entry['title'])
+            return entry['text'], entry['title']
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, url, final_url, digest, extractor, text, title):
+        """Save an extraction"""
+        entry = {
+            'url': url,
+            'final_url': final_url,
+            'content_hash': digest,
+            'extractor': extractor.version_tag,
+            'title': title,
+            'text': text,
+            'extracted_at': time.time()
+        }
+        # No extension, so a file left by a crash is never indexed as a cache entry
+        handle, temp_path = tempfile.mkstemp(dir=self.cache.directory)
+        with os.fdopen(handle, 'w', encoding='utf-8') as out:
+            json.dump(entry, out)
+        self.cache.put(self.cache_key(url), temp_path, 'json')
+
+    def get_stats(self):
+        """Get fresh hit, unchanged-page and parse counters"""
+        with self.lock:
+            lookups = self.hits + self.unchanged + self.misses
+            return {
+                'hits': self.hits,
+                'unchanged': self.unchanged,
+                'misses': self.misses,
+                'hit_rate': (self.hits + self.unchanged) / lookups if lookups else 0.0,
+                'ttl': self.ttl,
+                'cache': self.cache.get_stats()
+            }
+
+
+_extraction_cache = None
+_extraction_cache_lock = Lock()
+
+
+def get_extraction_cache():
+    """The process-wide ExtractionCache, created on first use"""
+    global _extraction_cache
+    with _extraction_cache_lock:
+        if _extraction_cache is None:
+            _extraction_cache = ExtractionCache()
+        return _extraction_cache
@@ -0,0 +1,95 @@
+from urllib.parse import urlparse
+
+from http_fetch import fetch
+from html_parsing import parse_html
+from extraction_cache import content_hash, get_extraction_cache
+import url_extractor
+import fee_extractor
+import mises_extractor
+
+
+class Extractor:
+    """A site's article extractor and the elements it reads"""
+
+    def __init__(self, name, extract, parse_only=None, headers=None, version=1):
+        self.name = name
+        # Bumped whenever extraction changes, so text cached by an older version is parsed again
+        self.version = version
+        # extract(soup) returns (text, title)
+        self.extract = extract
+        # parse_only(name, attrs) picks the elements to parse; the rest of the page is skipped
+        self.parse_only = parse_only
+        # Extra request headers the site needs
+        self.headers = headers
+
+    @property
+    def version_tag(self):
+        return f'{self.name}/{self.version}'
+
+    def extract_html(self, html):
+        """Parse a page and extract its (text, title)"""
+        return self.extract(parse_html(html, self.parse_only))
+
+
+# Hostname -> extractor; '*.example.org' matches any subdomain of example.org
+EXTRACTORS = {}
+GENERIC = Extractor('generic', url_extractor.extract_from_soup, url_extractor.parse_only)
+
+
+def register(extractor, *hostnames):
+    """Use an extractor for the given hostnames"""
+    for hostname in hostnames:
+        EXTRACTORS[hostname.lower()] = extractor
+
+
+def find_extractor(url):
+    """Extractor for a URL: an exact hostname match, then the closest wildcard, then the generic one"""
+    host = (urlparse(url).hostname or '').lower()
+    extractor = EXTRACTORS.get(host)
+    if extractor:
+        return extractor
+    # One lookup per label: a.b.mises.org tries *.b.mises.org, *.mises.org, *.org
+    labels = host.split('.')
+    for start in range(1, len(labels)):
+        extractor = EXTRACTORS.get('*.' + '.'.join(labels[start:]))
+        if extractor:
+            return extractor
+    return GENERIC
+
+
+def extract_html(url, html):
+    """Extract (text, title) from a page already fetched from url"""
+    return find_extractor(url).extract_html(html)
+
+
+def extract_article(url):
+    """Fetch a URL and extract its (text, title) with the extractor for its site.
+
+    Extractions are cached: a URL seen within the TTL is not fetched at
+    all, and a refetched page whose body hasn't changed is not parsed again.
+    """
+    extractor = find_extractor(url)
+    cache = get_extraction_cache()
+    cached = cache.get(url, extractor)
+    if cached:
+        return cached
+    page = fetch(url, headers=extractor.headers)
+    digest = content_hash(page.content)
+    cached = cache.get_unchanged(url, extractor, digest)
+    if cached:
+        return cached
+    text, title = extractor.extract_html(page.text)
+    if text:
+        cache.put(url, page.url, digest, extractor, text, title)
+    return text, title
+
+
+register(
+    Extractor('mises', mises_extractor.extract_from_soup_mises, mises_extractor.parse_only),
+    'mises.org', '*.mises.org'
+)
+register(
+    Extractor('fee', fee_extractor.extract_from_soup_fee, fee_extractor.parse_only,
+              headers={'Upgrade-Insecure-Requests': '1'}),
+    'fee.org', '*.fee.org'
+)
@@ -1,19 +1,24 @@
-from bs4 import BeautifulSoup
-import requests
+from http_fetch import fetch
+from html_parsing import class_names, parse_html
+
+def parse_only(name, attrs):
+    """Whether to parse an element: only headings and the article body are read"""
+    if name in ('h1', 'h2'):
+        return True
+    return name == 'div' and 'article-content-wrapper' in class_names(attrs)
 
 def extract_from_url_fee(url):
     """Extract article title, subtitle, and main content from a Fee.org webpage"""
-    # Add headers to mimic a regular browser
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.5',
-        'Connection': 'keep-alive',
-        'Upgrade-Insecure-Requests': '1',
-    }
-    
-    response = requests.get(url, headers=headers)
-    soup = BeautifulSoup(response.text, 'html.parser')
+    # The shared client already sends browser-like headers
+    response = fetch(url, headers={'Upgrade-Insecure-Requests': '1'})
+    return extract_from_html_fee(response.text)
+
+def extract_from_html_fee(html):
+    """Extract article title, subtitle, and main content from a fetched Fee.org page's HTML"""
+    return extract_from_soup_fee(parse_html(html, parse_only))
+
+def extract_from_soup_fee(soup):
+    """Extract article title, subtitle, and main content from a parsed Fee.org page"""
     
     # Extract title (H1)
     title = ""
@@ -33,8 +38,8 @@ def extract_from_url_fee(url):
     article_content = ""
     content_wrapper = soup.find('div', {'class': 'article-content-wrapper'})
     if content_wrapper:
-        paragraphs = content_wrapper.find_all('p')
-        article_content = ' '.join(p.get_text().strip() for p in paragraphs if p.get_text().strip())
+        texts = (p.get_text().strip() for p in content_wrapper.find_all('p'))
+        article_content = ' '.join(text for text in texts if text)
         print("Found article content (first 100 chars):", article_content[:100])
     else:
         print("Could not find article-content-wrapper div")
@@ -0,0 +1,198 @@
+import math
+import os
+import shutil
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+from audio_encoder import DEFAULT_BITRATE, ChunkedMp3Encoder
+from mp3_frames import FrameHeader
+
+# Short enough that playback starts, and a seek lands, after one small fetch
+SEGMENT_SECONDS = 6
+PLAYLIST_NAME = 'index.m3u8'
+MASTER_NAME = 'master.m3u8'
+# Renditions for listeners on poor connections up to comfortable broadband
+LADDER = ['24k', '48k', '96k']
+# Packed audio segments say where they start on the 90 kHz MPEG-TS clock in this ID3 frame
+TIMESTAMP_OWNER = b'com.apple.streaming.transportStreamTimestamp\0'
+
+
+def _syncsafe(value):
+    """ID3v2 28-bit integer with the top bit of every byte clear"""
+    return bytes((value >> shift) & 0x7F for shift in (21, 14, 7, 0))
+
+
+def timestamp_tag(seconds):
+    """ID3v2.4 tag giving a segment's start time, which HLS requires at the front of packed audio"""
+    payload = TIMESTAMP_OWNER + struct.pack('>Q', round(seconds * 90000) & (2 ** 33 - 1))
+    frame = b'PRIV' + _syncsafe(len(payload)) + b'\0\0' + payload
+    return b'ID3\x04\0\0' + _syncsafe(len(frame)) + frame
+
+
+def _kbps(bitrate):
+    return int(bitrate.rstrip('k'))
+
+
+def is_complete(directory, bitrates=None):
+    """Whether a segmented render finished, so its playlist lists every segment.
+
+    With bitrates, directory holds a ladder and every one of those
+    renditions must be complete.
+    """
+    if bitrates is not None:
+        return all(is_complete(os.path.join(directory, bitrate)) for bitrate in bitrates)
+    try:
+        with open(os.path.join(directory, PLAYLIST_NAME), 'rb') as playlist:
+            playlist.seek(0, os.SEEK_END)
+            playlist.seek(max(0, playlist.tell() - 64))
+            return b'#EXT-X-ENDLIST' in playlist.read()
+    except OSError:
+        return False
+
+
+def last_written(directory):
+    """Latest modification time of a segment directory or the renditions inside it"""
+    times = [os.path.getmtime(directory)]
+    for name in os.listdir(directory):
+        times.append(os.path.getmtime(os.path.join(directory, name)))
+    return max(times)
+
+
+class HlsSegmenter(ChunkedMp3Encoder):
+    """Chunked MP3 encoder writing each chunk as an HLS segment behind a growing playlist.
+
+    Segments are numbered MP3 files in one directory, listed in an EVENT
+    playlist that is rewritten as each one lands and closed off with
+    ENDLIST by close(), so players can start on the first segment while
+    synthesis continues and seek anywhere by fetching a single segment.
+    The frames are cut from one continuous encode, so the segments play
+    back to back without gaps. The directory must not exist yet; it
+    belongs to this segmenter alone.
+    """
+
+    def __init__(self, directory, params, bitrate=DEFAULT_BITRATE, workers=None, segment_seconds=SEGMENT_SECONDS,
+                 executor=None):
+        super().__init__(params, bitrate, workers, segment_seconds, executor)
+        self.directory = directory
+        channels, sample_width, frame_rate = params
+        self.frame_seconds = FrameHeader.for_stream(frame_rate, channels).samples / frame_rate
+        # The last segment also carries the trailing context and the encoder's flush frames
+        self.target_duration = math.ceil((self.chunk_bytes + self.roll_bytes) / (channels * sample_width * frame_rate)) + 1
+        # Seconds of each segment written so far
+        self.segments = []
+        os.makedirs(directory)
+        self._write_playlist(False)
+
+    @property
+    def playlist_path(self):
+        return os.path.join(self.directory, PLAYLIST_NAME)
+
+    def _write_chunk(self, data, count):
+        if not count:
+            return
+        name = f'seg_{len(self.segments):05d}.mp3'
+        temp_path = os.path.join(self.directory, f'.{name}')
+        with open(temp_path, 'wb') as segment:
+            segment.write(timestamp_tag(self.frame_count * self.frame_seconds))
+            segment.write(data)
+        os.replace(temp_path, os.path.join(self.directory, name))
+        self.segments.append(count * self.frame_seconds)
+        self._write_playlist(False)
+
+    def _write_playlist(self, ended):
+        """Replace the playlist with one listing every segment so far"""
+        lines = [
+            '#EXTM3U',
+            '#EXT-X-VERSION:3',
+            f'#EXT-X-TARGETDURATION:{self.target_duration}',
+            '#EXT-X-MEDIA-SEQUENCE:0',
+            '#EXT-X-PLAYLIST-TYPE:EVENT',
+        ]
+        for number, seconds in enumerate(self.segments):
+            lines.append(f'#EXTINF:{seconds:.5f},')
+            lines.append(f'seg_{number:05d}.mp3')
+        if ended:
+            lines.append('#EXT-X-ENDLIST')
+        temp_path = os.path.join(self.directory, f'.{PLAYLIST_NAME}')
+        with open(temp_path, 'w') as playlist:
+            playlist.write('\n'.join(lines) + '\n')
+        # Readers polling the playlist only ever see a whole one
+        os.replace(temp_path, self.playlist_path)
+
+    def _finish(self):
+        self._write_playlist(True)
+        return self.playlist_path
+
+    def _discard(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class HlsLadder:
+    """HLS renditions of one render at several bitrates, behind a master playlist.
+
+    Every rendition is segmented from the same PCM as it is written, with
+    all of their chunks encoded on one shared pool, and the segments line
+    up across renditions. Players measure their throughput and switch
+    between renditions at segment boundaries, so a slow connection gets the
+    low bitrate instead of stalling. Takes the same calls as HlsSegmenter,
+    and like it needs a directory of its own that doesn't exist yet.
+    """
+
+    def __init__(self, directory, params, bitrates=LADDER, workers=None, segment_seconds=SEGMENT_SECONDS):
+        if not bitrates:
+            raise ValueError("A ladder needs at least one bitrate")
+        self.directory = directory
+        workers = workers or os.cpu_count() or 1
+        os.makedirs(directory)
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix='hls-encode')
+        # Lowest first, which players start on before they have measured anything
+        self.renditions = [
+            HlsSegmenter(os.path.join(directory, bitrate), params, bitrate, workers, segment_seconds, self.executor)
+            for bitrate in sorted(set(bitrates), key=_kbps)
+        ]
+        self._write_master(segment_seconds)
+
+    @property
+    def playlist_path(self):
+        return os.path.join(self.directory, MASTER_NAME)
+
+    @property
+    def duration(self):
+        """Seconds of audio written so far"""
+        return self.renditions[0].duration
+
+    def _write_master(self, segment_seconds):
+        lines = ['#EXTM3U', '#EXT-X-VERSION:3']
+        tag_bits = len(timestamp_tag(0)) * 8
+        for rendition in self.renditions:
+            # Peak rate of a segment, its timestamp tag included
+            bandwidth = _kbps(rendition.bitrate) * 1000 + math.ceil(tag_bits / segment_seconds)
+            lines.append(f'#EXT-X-STREAM-INF:BANDWIDTH={bandwidth},CODECS="mp4a.40.34"')
+            lines.append(f'{rendition.bitrate}/{PLAYLIST_NAME}')
+        temp_path = os.path.join(self.directory, f'.{MASTER_NAME}')
+        with open(temp_path, 'w') as playlist:
+            playlist.write('\n'.join(lines) + '\n')
+        os.replace(temp_path, self.playlist_path)
+
+    def write(self, frames):
+        """Feed PCM frames to every rendition"""
+        for rendition in self.renditions:
+            rendition.write(frames)
+
+    def close(self):
+        """Finish every rendition, returning the master playlist's path"""
+        try:
+            for rendition in self.renditions:
+                rendition.close()
+        except BaseException:
+            self.abort()
+            raise
+        self.executor.shutdown()
+        return self.playlist_path
+
+    def abort(self):
+        """Stop encoding and discard every rendition"""
+        for rendition in self.renditions:
+            rendition.abort()
+        self.executor.shutdown()
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,44 @@
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml  # noqa: F401
+    # lxml's C tree builder parses several times faster than the pure Python one
+    PARSER = 'lxml'
+except ImportError:
+    PARSER = 'html.parser'
+
+
+class ElementStrainer(SoupStrainer):
+    """Parse-time filter that keeps only the elements a predicate accepts.
+
+    predicate(name, attrs) sees each element's raw name and attributes;
+    accepted elements are kept with everything inside them and the rest of
+    the page is never built into the tree. Both strainer interfaces are
+    implemented: search_tag() for Beautiful Soup before 4.13 and
+    allow_tag_creation() from 4.13 on.
+    """
+
+    def __init__(self, predicate):
+        super().__init__()
+        self.predicate = predicate
+
+    def search_tag(self, markup_name=None, markup_attrs={}):
+        return markup_name if self.predicate(markup_name, markup_attrs or {}) else None
+
+    def allow_tag_creation(self, nsprefix, name, attrs):
+        return bool(self.predicate(name, attrs or {}))
+
+    def allow_string_creation(self, string):
+        # Text outside the kept elements is never read
+        return False
+
+
+def class_names(attrs):
+    """An element's classes as a list, whether or not the tree builder has split them yet"""
+    classes = attrs.get('class') or []
+    return classes.split() if isinstance(classes, str) else list(classes)
+
+
+def parse_html(html, parse_only=None):
+    """Parse a page with the fastest available tree builder, keeping only elements parse_only accepts"""
+    return BeautifulSoup(html, PARSER, parse_only=ElementStrainer(parse_only) if parse_only else None)
@@ -0,0 +1,259 @@
+import codecs
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from threading import Lock
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+
+from audio_cache import AudioCache
+
+# (connect, read) timeouts in seconds, so one slow origin can't hold a worker forever
+DEFAULT_TIMEOUT = (5, 20)
+# Connections kept per host; further requests to that host wait for one to free up
+MAX_CONNECTIONS_PER_HOST = 4
+# Number of hosts whose connection pools are kept open
+MAX_HOSTS = 32
+# Pages over this many bytes are abandoned mid-download
+MAX_BYTES = 5 * 1024 ** 2
+CHUNK_SIZE = 64 * 1024
+HTML_TYPES = ('text/html', 'application/xhtml+xml', 'text/plain')
+CHARSET = re.compile(rb'''<meta[^>]+charset\s*=\s*["']?\s*([\w.:-]+)''', re.IGNORECASE)
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+}
+
+
+class ContentRejected(requests.RequestException):
+    """Raised when a response is too large or not of an allowed content type"""
+
+
+class Page:
+    """A fetched document with its body already decoded"""
+
+    def __init__(self, url, status_code, headers, content, text, encoding, from_cache=False):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.text = text
+        self.encoding = encoding
+        self.from_cache = from_cache
+
+
+def _valid_codec(name):
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return None
+
+
+def _header_charset(content_type):
+    """Charset named in a Content-Type header, if it is one Python knows"""
+    for param in content_type.split(';')[1:]:
+        key, _, value = param.partition('=')
+        if key.strip().lower() == 'charset':
+            return _valid_codec(value.strip().strip('"\''))
+    return None
+
+
+def _sniff_charset(head):
+    """Charset from a byte order mark or a <meta> tag near the start of a page"""
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    match = CHARSET.search(head[:4096])
+    return _valid_codec(match.group(1).decode('ascii')) if match else None
+
+
+class Fetcher:
+    """Shared HTTP client: pooled keep-alive connections, retries with backoff and an on-disk conditional GET cache"""
+
+    def __init__(self, cache_dir=None, cache_bytes=256 * 1024 ** 2, timeout=DEFAULT_TIMEOUT, retries=3,
+                 max_bytes=MAX_BYTES, allowed_types=HTML_TYPES):
+        self.timeout = timeout
+        # Largest body read before giving up, after decompression
+        self.max_bytes = max_bytes
+        # Content types that are read at all; None allows any
+        self.allowed_types = allowed_types
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        retry = Retry(
+            total=retries,
+            # A read timeout already cost a full timeout, so retry it only once
+            read=1,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=['GET', 'HEAD'],
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=MAX_HOSTS,
+            pool_maxsize=MAX_CONNECTIONS_PER_HOST,
+            pool_block=True,
+            max_retries=retry
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        cache_dir = cache_dir or os.path.join(os.getcwd(), 'temp_audio', 'http_cache')
+        self.cache = AudioCache(cache_dir, cache_bytes)
+        self.lock = Lock()
+        self.requests = 0
+        self.not_modified = 0
+        self.errors = 0
+        self.rejected = 0
+
+    @staticmethod
+    def cache_key(url):
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _load(self, cached_path):
+        """Read a cached response, returning (metadata, body) or None if it is unreadable"""
+        try:
+            with open(cached_path, 'rb') as cached:
+                meta = json.loads(cached.readline())
+                return meta, cached.read()
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, key, page):
+        """Save a page that can be revalidated later"""
+        meta = {
+            'url': page.url,
+            'etag': page.headers.get('ETag'),
+            'last_modified': page.headers.get('Last-Modified'),
+            # The body is stored decoded, so its transfer headers no longer apply
+            'headers': {name: value for name, value in page.headers.items()
+                        if name.lower() not in ('content-encoding', 'content-length', 'transfer-encoding')},
+            'encoding': page.encoding,
+            'fetched_at': time.time()
+        }
+        handle, temp_path = tempfile.mkstemp(dir=self.cache.directory)
+        with os.fdopen(handle, 'wb') as cached:
+            cached.write(json.dumps(meta).encode('utf-8') + b'\n')
+            cached.write(page.content)
+        self.cache.put(key, temp_path, 'http')
+
+    def _from_cache(self, meta, body):
+        """Build a page from a cached copy"""
+        text = body.decode(meta['encoding'] or 'utf-8', errors='replace')
+        return Page(meta['url'], 200, CaseInsensitiveDict(meta['headers']), body, text, meta['encoding'], True)
+
+    def _read(self, response):
+        """Read a streamed response into a page, decoding as it arrives and giving up early on oversized or unwanted content"""
+        content_type = response.headers.get('Content-Type', '')
+        mimetype = content_type.split(';', 1)[0].strip().lower()
+        if mimetype and self.allowed_types and mimetype not in self.allowed_types:
+            raise ContentRejected(f"Refusing {mimetype} content from {response.url}")
+        length = response.headers.get('Content-Length', '')
+        if length.isdigit() and int(length) > self.max_bytes:
+            raise ContentRejected(f"{response.url} is {int(length)} bytes, over the {self.max_bytes} byte limit")
+
+        chunks = []
+        parts = []
+        size = 0
+        encoding = None
+        decoder = None
+        # Sizes are counted after decompression, so a compressed bomb is cut off too
+        for chunk in response.iter_content(CHUNK_SIZE):
+            size += len(chunk)
+            if size > self.max_bytes:
+                raise ContentRejected(f"{response.url} is over the {self.max_bytes} byte limit")
+            if decoder is None:
+                # The first chunk holds the head of the page, where any meta charset is
+                encoding = _header_charset(content_type) or _sniff_charset(chunk) or 'utf-8'
+                decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+            chunks.append(chunk)
+            parts.append(decoder.decode(chunk))
+        if decoder:
+            parts.append(decoder.decode(b'', final=True))
+        return Page(response.url, response.status_code, response.headers, b''.join(chunks), ''.join(parts), encoding)
+
+    def get(self, url, headers=None, timeout=None):
+        """GET a URL as a Page, revalidating any cached copy with If-None-Match/If-Modified-Since.
+
+        Raises requests.HTTPError for error statuses once retries are used
+        up, and ContentRejected for bodies that are too large or of a type
+        outside the allowlist.
+        """
+        key = self.cache_key(url)
+        cached = None
+        cached_path = self.cache.get(key)
+        if cached_path:
+            cached = self._load(cached_path)
+
+        request_headers = dict(headers or {})
+        if cached:
+            meta = cached[0]
+            if meta.get('etag'):
+                request_headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                request_headers['If-Modified-Since'] = meta['last_modified']
+
+        with self.lock:
+            self.requests += 1
+        try:
+            # Streamed, so the body is only read once its type and size check out
+            with self.session.get(url, headers=request_headers, timeout=timeout or self.timeout, stream=True) as response:
+                if response.status_code == 304 and cached:
+                    with self.lock:
+                        self.not_modified += 1
+                    return self._from_cache(*cached)
+                response.raise_for_status()
+                page = self._read(response)
+        except ContentRejected:
+            with self.lock:
+                self.rejected += 1
+            raise
+        except requests.RequestException:
+            with self.lock:
+                self.errors += 1
+            raise
+
+        if page.headers.get('ETag') or page.headers.get('Last-Modified'):
+            self._store(key, page)
+        return page
+
+    def get_stats(self):
+        """Get request, revalidation and error counters"""
+        with self.lock:
+            return {
+                'requests': self.requests,
+                'not_modified': self.not_modified,
+                'not_modified_rate': self.not_modified / self.requests if self.requests else 0.0,
+                'errors': self.errors,
+                'rejected': self.rejected,
+                'cache': self.cache.get_stats()
+            }
+
+    def close(self):
+        self.session.close()
+
+
+_fetcher = None
+_fetcher_lock = Lock()
+
+
+def get_fetcher():
+    """The process-wide Fetcher, created on first use"""
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None:
+            _fetcher = Fetcher()
+        return _fetcher
+
+
+def fetch(url, headers=None, timeout=None):
+    """GET a URL through the shared pooled, cached client, returning a Page"""
+    return get_fetcher().get(url, headers, timeout)
@@ -0,0 +1,207 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+FINISHED_STATES = ['done', 'error']
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity"""
+
+
+class Job:
+    """A document conversion tracked through its stages"""
+
+    def __init__(self, kind, queue):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.queue = queue
+        self.state = 'queued'
+        self.progress = 0.0
+        self.title = ""
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.stage_started_at = self.created_at
+        self.stage_times = {}
+        # Identical requests that were attached to this job instead of starting their own
+        self.coalesced = 0
+        # Sessions following the job, and the player state published to them so far
+        self.followers = set()
+        self.shared_state = {}
+
+    def set_stage(self, state, progress=None):
+        """Move the job to a new stage, recording how long the previous one took"""
+        now = time.time()
+        duration = now - self.stage_started_at
+        self.stage_times[self.state] = self.stage_times.get(self.state, 0) + duration
+        self.queue.record_stage(self.state, duration)
+        if self.started_at is None and state != 'queued':
+            self.started_at = now
+        if state in FINISHED_STATES:
+            self.finished_at = now
+        self.state = state
+        self.stage_started_at = now
+        if progress is not None:
+            self.progress = progress
+        self.queue.changed(self)
+
+    def set_progress(self, progress):
+        """Set overall completion as a percentage"""
+        previous = round(self.progress, 1)
+        self.progress = max(self.progress, min(100.0, progress))
+        # Only changes that show up in to_dict are worth telling anyone about
+        if round(self.progress, 1) != previous:
+            self.queue.changed(self)
+
+    @property
+    def eta(self):
+        """Estimated seconds until the job finishes, from its progress so far"""
+        if self.state in FINISHED_STATES:
+            return 0
+        if not self.started_at or self.progress <= 0:
+            return None
+        elapsed = time.time() - self.started_at
+        return elapsed * (100 - self.progress) / self.progress
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'kind': self.kind,
+            'state': self.state,
+            'title': self.title,
+            'progress': round(self.progress, 1),
+            'eta': self.eta,
+            'result': self.result,
+            'error': self.error,
+            'coalesced': self.coalesced,
+            'stage_times': self.stage_times
+        }
+
+
+class JobQueue:
+    """Bounded pool of worker threads running conversion jobs"""
+
+    def __init__(self, workers=2, max_queued=100, keep_finished=3600):
+        self.workers = workers
+        self.max_queued = max_queued
+        # Seconds to keep finished jobs around for status lookups
+        self.keep_finished = keep_finished
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix='job')
+        self.jobs = {}
+        self.lock = Lock()
+        self.completed = 0
+        self.failed = 0
+        # Unfinished jobs by key, so identical submissions can share them
+        self.in_flight = {}
+        self.coalesced = 0
+        # Run time of coalesced jobs, counted once per request that shared them
+        self.saved_seconds = 0.0
+        # stage -> [count, total seconds, max seconds]
+        self.stage_latency = {}
+        # Called with a job whenever its stage or progress changes
+        self.on_change = None
+
+    def submit(self, kind, fn, *args, max_queued=None):
+        """Queue fn(job, *args) and return the job; fn returns the job's result.
+
+        max_queued sets a lower limit for this submission, so background work
+        can leave room in the queue for interactive requests.
+        """
+        return self.submit_once(None, kind, fn, *args, max_queued=max_queued)[0]
+
+    def submit_once(self, key, kind, fn, *args, max_queued=None):
+        """Queue fn(job, *args) unless a job with the same key is still unfinished.
+
+        Returns (job, created): a new job, or the one already in flight with
+        the result every request sharing it will get. A key of None always
+        queues a new job.
+        """
+        limit = min(self.max_queued, max_queued or self.max_queued)
+        with self.lock:
+            self._prune()
+            running = self.in_flight.get(key) if key is not None else None
+            if running:
+                running.coalesced += 1
+                self.coalesced += 1
+                return running, False
+            if self._count('queued') >= limit:
+                raise QueueFullError("Too many conversions queued, try again later")
+            job = Job(kind, self)
+            self.jobs[job.id] = job
+            if key is not None:
+                self.in_flight[key] = job
+        self.executor.submit(self._run, job, fn, args, key)
+        return job, True
+
+    def _run(self, job, fn, args, key=None):
+        job.set_stage('extracting', 0)
+        try:
+            job.result = fn(job, *args)
+            with self.lock:
+                self._finish(job, key)
+                self.completed += 1
+                self.saved_seconds += job.coalesced * (time.time() - job.started_at)
+            job.set_stage('done', 100)
+        except Exception as e:
+            print(f"Error in {job.kind} job {job.id}: {str(e)}")
+            job.error = str(e)
+            with self.lock:
+                self._finish(job, key)
+                self.failed += 1
+            job.set_stage('error')
+
+    def _finish(self, job, key):
+        """Stop offering a job to new submissions; callers hold the lock"""
+        if key is not None and self.in_flight.get(key) is job:
+            del self.in_flight[key]
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def changed(self, job):
+        if self.on_change:
+            self.on_change(job)
+
+    def record_stage(self, stage, duration):
+        with self.lock:
+            stats = self.stage_latency.setdefault(stage, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += duration
+            stats[2] = max(stats[2], duration)
+
+    def _count(self, state):
+        return sum(1 for job in self.jobs.values() if job.state == state)
+
+    def _prune(self):
+        """Forget finished jobs older than keep_finished"""
+        cutoff = time.time() - self.keep_finished
+        for job_id in [job.id for job in self.jobs.values()
+                       if job.finished_at and job.finished_at < cutoff]:
+            del self.jobs[job_id]
+
+    def get_stats(self):
+        """Get queue depth, throughput counters and per-stage latency"""
+        with self.lock:
+            return {
+                'workers': self.workers,
+                'queued': self._count('queued'),
+                'running': sum(1 for job in self.jobs.values()
+                               if job.state not in FINISHED_STATES and job.state != 'queued'),
+                'completed': self.completed,
+                'failed': self.failed,
+                'coalesced': self.coalesced,
+                'saved_seconds': self.saved_seconds,
+                'stages': {
+                    stage: {
+                        'count': count,
+                        'avg': total / count,
+                        'max': longest
+                    }
+                    for stage, (count, total, longest) in self.stage_latency.items()
+                }
+            }
@@ -1,10 +1,23 @@
-from bs4 import BeautifulSoup
-import requests
+from http_fetch import fetch
+from html_parsing import class_names, parse_html
+
+def parse_only(name, attrs):
+    """Whether to parse an element: only headings and the article body are read"""
+    if name == 'h1':
+        return True
+    classes = class_names(attrs)
+    return name == 'div' and 'prose' in classes and 'max-w-none' in classes
 
 def extract_from_mises(url):
     """Extract article title and content from a mises.org webpage"""
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, 'html.parser')
+    return extract_from_html_mises(fetch(url).text)
+
+def extract_from_html_mises(html):
+    """Extract article title and content from a fetched mises.org page's HTML"""
+    return extract_from_soup_mises(parse_html(html, parse_only))
+
+def extract_from_soup_mises(soup):
+    """Extract article title and content from a parsed mises.org page"""
     
     # Extract title from the specific h1 class
     title = ""
@@ -22,14 +35,16 @@ def extract_from_mises(url):
         # Look for the inner div that contains the actual content
         inner_div = content_wrapper.find('div')
         if inner_div:
-            # Get all paragraphs from the inner div
-            paragraphs = inner_div.find_all('p')
-            # Filter out empty paragraphs and those that only contain links
+            # Filter out empty paragraphs and those that only contain links,
+            # looking at each paragraph's text and links once
             valid_paragraphs = []
-            for p in paragraphs:
+            for p in inner_div.find_all('p'):
                 text = p.get_text().strip()
+                if not text:
+                    continue
                 # Only include paragraphs that have more than just a link
-                if text and not (len(p.find_all('a')) == 1 and len(text) == len(p.find('a').get_text().strip())):
+                links = p.find_all('a', limit=2)
+                if not (len(links) == 1 and len(text) == len(links[0].get_text().strip())):
                     valid_paragraphs.append(text)
             
             article_content = ' '.join(valid_paragraphs)
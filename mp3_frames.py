@@ -0,0 +1,168 @@
+import struct
+
+# Layer III bitrates in kbps by bitrate index, for MPEG-1 and for MPEG-2/2.5
+BITRATES = {
+    'mpeg1': [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    'mpeg2': [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+# Version bits -> sample rates by sample rate index
+SAMPLE_RATES = {
+    3: [44100, 48000, 32000],  # MPEG-1
+    2: [22050, 24000, 16000],  # MPEG-2
+    0: [11025, 12000, 8000],   # MPEG-2.5
+}
+# LAME's encoder delay in samples, recorded in the Info tag so players can trim it
+ENCODER_DELAY = 576
+INFO_TAG_SIZE = 120
+LAME_TAG_SIZE = 36
+
+
+class FrameHeader:
+    """A decoded MPEG audio Layer III frame header"""
+
+    def __init__(self, version, bitrate_index, sample_rate_index, padding, channel_mode):
+        self.version = version
+        self.bitrate_index = bitrate_index
+        self.sample_rate_index = sample_rate_index
+        self.padding = padding
+        self.channel_mode = channel_mode
+
+    @classmethod
+    def parse(cls, data, offset=0):
+        """Header at offset, or None if there isn't a valid Layer III one there"""
+        if offset + 4 > len(data):
+            return None
+        value = struct.unpack_from('>I', data, offset)[0]
+        version = (value >> 19) & 3
+        layer = (value >> 17) & 3
+        bitrate_index = (value >> 12) & 15
+        sample_rate_index = (value >> 10) & 3
+        if (value >> 21) != 0x7FF or version == 1 or layer != 1 or bitrate_index in (0, 15) or sample_rate_index == 3:
+            return None
+        return cls(version, bitrate_index, sample_rate_index, (value >> 9) & 1, (value >> 6) & 3)
+
+    @classmethod
+    def for_stream(cls, sample_rate, channels, bitrate_index=1):
+        """Header matching what an encoder produces for this sample rate and channel count"""
+        for version, rates in SAMPLE_RATES.items():
+            if sample_rate in rates:
+                # Mono, or joint stereo as LAME uses by default
+                return cls(version, bitrate_index, rates.index(sample_rate), 0, 3 if channels == 1 else 1)
+        raise ValueError(f"MP3 doesn't support a {sample_rate} Hz sample rate")
+
+    @property
+    def mpeg1(self):
+        return self.version == 3
+
+    @property
+    def bitrate(self):
+        return BITRATES['mpeg1' if self.mpeg1 else 'mpeg2'][self.bitrate_index] * 1000
+
+    @property
+    def sample_rate(self):
+        return SAMPLE_RATES[self.version][self.sample_rate_index]
+
+    @property
+    def samples(self):
+        """PCM samples per channel in one frame"""
+        return 1152 if self.mpeg1 else 576
+
+    @property
+    def size(self):
+        return self.samples // 8 * self.bitrate // self.sample_rate + self.padding
+
+    @property
+    def side_info_size(self):
+        mono = self.channel_mode == 3
+        if self.mpeg1:
+            return 17 if mono else 32
+        return 9 if mono else 17
+
+    def to_bytes(self):
+        # No CRC, not private, copyright/original/emphasis clear
+        value = (0x7FF << 21) | (self.version << 19) | (1 << 17) | (1 << 16) | (self.bitrate_index << 12) \
+            | (self.sample_rate_index << 10) | (self.padding << 9) | (self.channel_mode << 6)
+        return struct.pack('>I', value)
+
+
+def skip_id3(data):
+    """Offset of the first byte after an ID3v2 tag at the start of data"""
+    if len(data) >= 10 and data[:3] == b'ID3':
+        size = 0
+        for byte in data[6:10]:
+            size = (size << 7) | (byte & 0x7F)
+        return 10 + size + (10 if data[5] & 0x10 else 0)
+    return 0
+
+
+def is_info_frame(data, offset, header):
+    """Whether the frame at offset is a Xing/Info tag rather than audio"""
+    tag = offset + 4 + header.side_info_size
+    return data[tag:tag + 4] in (b'Xing', b'Info')
+
+
+def split_frames(data):
+    """Audio frames in an MP3 byte string as a list of (offset, size), skipping ID3 and Info tags"""
+    frames = []
+    offset = skip_id3(data)
+    while True:
+        header = FrameHeader.parse(data, offset)
+        if header is None or offset + header.size > len(data):
+            break
+        if not (not frames and is_info_frame(data, offset, header)):
+            frames.append((offset, header.size))
+        offset += header.size
+    return frames
+
+
+def crc16(data):
+    """CRC-16/ARC, which the LAME tag is checksummed with"""
+    crc = 0
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+    return crc
+
+
+def info_frame_size(sample_rate, channels):
+    """Size of the frame build_info_frame returns for this stream"""
+    return _info_header(sample_rate, channels).size
+
+
+def _info_header(sample_rate, channels):
+    """Header of the smallest frame that holds the Info and LAME tags"""
+    header = FrameHeader.for_stream(sample_rate, channels)
+    while header.size < 4 + header.side_info_size + INFO_TAG_SIZE + LAME_TAG_SIZE:
+        header.bitrate_index += 1
+    return header
+
+
+def build_info_frame(sample_rate, channels, frame_count, audio_bytes, pcm_samples, bitrate):
+    """A CBR Info tag frame giving players the frame count, byte length and exact sample count of a stream.
+
+    The LAME extension carries the encoder delay and end padding, so
+    gapless decoders trim the stream back to exactly pcm_samples. The
+    optional music CRC is left at zero rather than checksumming every frame.
+    """
+    header = _info_header(sample_rate, channels)
+    frame = bytearray(header.size)
+    frame[:4] = header.to_bytes()
+    tag = 4 + header.side_info_size
+    padding = frame_count * header.samples - ENCODER_DELAY - pcm_samples
+    if not 0 <= padding < 4096:
+        raise ValueError(f"{frame_count} frames can't hold {pcm_samples} samples")
+    # Frames, bytes, TOC and quality fields, the layout the LAME tag's position assumes
+    struct.pack_into('>4sIII', frame, tag, b'Info', 0xF, frame_count, header.size + audio_bytes)
+    # A CBR stream seeks linearly
+    frame[tag + 16:tag + 116] = bytes(i * 256 // 100 for i in range(100))
+    lame = tag + INFO_TAG_SIZE
+    frame[lame:lame + 9] = b'LAME3.100'
+    # Tag revision 0, CBR
+    frame[lame + 9] = 0x01
+    frame[lame + 20] = min(bitrate // 1000, 255)
+    delays = (ENCODER_DELAY << 12) | padding
+    frame[lame + 21:lame + 24] = delays.to_bytes(3, 'big')
+    struct.pack_into('>I', frame, lame + 28, header.size + audio_bytes)
+    struct.pack_into('>H', frame, lame + 34, crc16(frame[:lame + 34]))
+    return bytes(frame)
@@ -0,0 +1,214 @@
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import threading
+import wave
+
+from tts_backends import create_backend
+
+# Sentence boundaries: terminal punctuation (optionally followed by a closing
+# quote or bracket) and then whitespace
+SENTENCE_END = re.compile(r'(?:(?<=[.!?])|(?<=[.!?][\'")\]]))\s+')
+PARAGRAPH_END = re.compile(r'\n\s*\n')
+
+# Per-process speech backend, created once by the pool initializer
+_engine = None
+
+
+def _split_long(sentence, max_chars):
+    """Split a sentence that is longer than max_chars on whitespace"""
+    words = sentence.split()
+    part = ''
+    for word in words:
+        if part and len(part) + len(word) + 1 > max_chars:
+            yield part
+            part = word
+        else:
+            part = f"{part} {word}" if part else word
+    if part:
+        yield part
+
+
+def iter_chunks(pieces, max_chars=1000, lead_chars=None):
+    """Yield sentence/paragraph chunks of at most max_chars from an iterable of text pieces.
+
+    When lead_chars is given the first chunk is capped at lead_chars instead,
+    so the start of the document can be rendered quickly.
+    """
+    limit = lead_chars or max_chars
+    chunk = ''
+    for piece in pieces:
+        for paragraph in PARAGRAPH_END.split(piece):
+            paragraph = ' '.join(paragraph.split())
+            if not paragraph:
+                continue
+            # Paragraphs are natural pauses, so never glue them onto a full chunk
+            if chunk and len(chunk) + len(paragraph) + 1 > limit:
+                yield chunk
+                chunk = ''
+                limit = max_chars
+            for sentence in SENTENCE_END.split(paragraph):
+                sentence = sentence.strip()
+                if not sentence:
+                    continue
+                if chunk and len(chunk) + len(sentence) + 1 > limit:
+                    yield chunk
+                    chunk = ''
+                    limit = max_chars
+                if len(sentence) > limit and limit < max_chars:
+                    # Only the lead chunk is short; the rest of the sentence splits at the normal size
+                    lead = next(_split_long(sentence, limit))
+                    yield lead
+                    sentence = sentence[len(lead):].strip()
+                    limit = max_chars
+                if len(sentence) > limit:
+                    yield from _split_long(sentence, limit)
+                    limit = max_chars
+                elif sentence:
+                    chunk = f"{chunk} {sentence}" if chunk else sentence
+    if chunk:
+        yield chunk
+
+
+def split_into_chunks(text, max_chars=1000):
+    """Split text into sentence/paragraph chunks of at most max_chars"""
+    return list(iter_chunks([text], max_chars))
+
+
+def render_serially(backend, pieces, scratch_dir=None, lead_chars=None, max_chars=1000):
+    """Render text pieces chunk by chunk with a backend in this process, yielding (characters, params, frames).
+
+    Audio is passed on block by block as the backend streams it, so the
+    first block can be played and encoded while the rest of its chunk is
+    still being spoken. A chunk's characters come with its first block;
+    later blocks of the same chunk have 0.
+    """
+    for chunk in iter_chunks(pieces, max_chars, lead_chars):
+        characters = len(chunk)
+        for params, frames in backend.stream(chunk, scratch_dir):
+            yield characters, params, frames
+            characters = 0
+
+
+def _init_worker(backend, rate, volume, voice_id):
+    """Start the speech backend owned by this worker process"""
+    global _engine
+    _engine = create_backend(backend, rate, volume, voice_id)
+
+
+def _render_chunk(job):
+    """Render one chunk to PCM, returning (index, characters, (channels, sample width, frame rate), frames)"""
+    index, text, scratch_dir = job
+    # The chunk goes back to the parent as one pickled result, so there is nothing to gain from streaming it here
+    params, frames = _engine.synthesize(text, scratch_dir)
+    return index, len(text), params, frames
+
+
+class ChunkWriter:
+    """Append rendered chunks to a WAV file, recording where each one starts and ends"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'wb')
+        # The WAV writer is created on the first chunk, once the format is known
+        self.wav = None
+        self.params = None
+        self.frames_written = 0
+        self.boundaries = []
+
+    def write(self, params, frames, new_chunk=True):
+        """Append one chunk of PCM frames, or with new_chunk False, more of the last one"""
+        if self.params is None:
+            self.params = params
+            self.wav = wave.open(self.file, 'wb')
+            self.wav.setnchannels(params[0])
+            self.wav.setsampwidth(params[1])
+            self.wav.setframerate(params[2])
+        elif params != self.params:
+            raise ValueError(f"Chunk {len(self.boundaries)} has mismatched audio format {params}")
+
+        self.wav.writeframes(frames)
+        self.file.flush()
+        frame_count = len(frames) // (params[0] * params[1])
+        if not new_chunk and self.boundaries:
+            self.boundaries[-1]['end'] = (self.frames_written + frame_count) / params[2]
+            self.frames_written += frame_count
+            return
+        self.boundaries.append({
+            'index': len(self.boundaries),
+            'start': self.frames_written / params[2],
+            'end': (self.frames_written + frame_count) / params[2]
+        })
+        self.frames_written += frame_count
+
+    def close(self):
+        """Finalize the WAV header and close the file"""
+        if self.wav:
+            self.wav.close()
+        self.file.close()
+
+
+class SynthesisPool:
+    """Pool of worker processes, each owning its own speech backend"""
+
+    def __init__(self, workers=None, rate=150, volume=0.9, voice_id=None, max_chars=1000, backend='pyttsx3'):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_chars = max_chars
+        # Spawn rather than fork so workers never inherit the parent's engine state
+        context = multiprocessing.get_context('spawn')
+        self.pool = context.Pool(
+            self.workers,
+            initializer=_init_worker,
+            initargs=(backend, rate, volume, voice_id)
+        )
+
+    def render(self, pieces, scratch_dir=None, lead_chars=None):
+        """Render an iterable of text pieces in parallel, yielding (characters, params, frames) per chunk in order"""
+        scratch_dir = tempfile.mkdtemp(dir=scratch_dir)
+        # The pool's task thread pulls jobs as fast as it can, so cap how far it
+        # runs ahead of the renders; pieces from a generator are then read as
+        # synthesis goes instead of all at once
+        slots = threading.Semaphore(self.workers * 2)
+        finished = threading.Event()
+
+        def jobs():
+            for index, chunk in enumerate(iter_chunks(pieces, self.max_chars, lead_chars)):
+                slots.acquire()
+                if finished.is_set():
+                    return
+                yield index, chunk, scratch_dir
+
+        try:
+            # imap yields in submission order, so each chunk is available as soon
+            # as every earlier chunk has finished
+            for index, characters, params, frames in self.pool.imap(_render_chunk, jobs()):
+                slots.release()
+                yield characters, params, frames
+        finally:
+            # Wake the task thread if it is waiting for a slot nobody will free
+            finished.set()
+            slots.release()
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    def synthesize(self, text, output_path, scratch_dir=None):
+        """Render text in parallel and stitch the chunks in order into output_path.
+
+        Returns the chunk boundaries as a list of dicts with the chunk index
+        and its start and end time in seconds.
+        """
+        writer = ChunkWriter(output_path)
+        try:
+            for characters, params, frames in self.render([text], scratch_dir):
+                writer.write(params, frames)
+        finally:
+            writer.close()
+        if writer.params is None:
+            raise ValueError("No text to synthesize")
+        return writer.boundaries
+
+    def close(self):
+        """Shut down the worker processes"""
+        self.pool.close()
+        self.pool.join()
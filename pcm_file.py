@@ -0,0 +1,57 @@
+import os
+import struct
+
+import numpy as np
+
+
+def read_wav_header(path):
+    """Find the format and PCM data location of a WAV file by walking its chunks.
+
+    Returns (channels, sample_rate, sample_width, data_offset, data_size).
+    Only the header is read, so this is O(1) regardless of file length.
+    """
+    file_size = os.path.getsize(path)
+    with open(path, 'rb') as wav_file:
+        riff, _, wave_id = struct.unpack('<4sI4s', wav_file.read(12))
+        if riff != b'RIFF' or wave_id != b'WAVE':
+            raise ValueError(f"{path} is not a WAV file")
+
+        fmt = None
+        while True:
+            header = wav_file.read(8)
+            if len(header) < 8:
+                raise ValueError(f"{path} has no data chunk")
+            chunk_id, chunk_size = struct.unpack('<4sI', header)
+            if chunk_id == b'fmt ':
+                fmt = struct.unpack('<HHIIHH', wav_file.read(16))
+                wav_file.seek(chunk_size - 16 + (chunk_size & 1), os.SEEK_CUR)
+            elif chunk_id == b'data':
+                if fmt is None:
+                    raise ValueError(f"{path} has no fmt chunk before its data")
+                format_tag, channels, sample_rate, _, _, bits = fmt
+                # 0xFFFE is WAVE_FORMAT_EXTENSIBLE, which wraps plain PCM here
+                if format_tag not in (1, 0xFFFE) or bits != 16:
+                    raise ValueError("Only 16-bit PCM audio is supported")
+                data_offset = wav_file.tell()
+                # Streamed files carry a placeholder size; trust the file length instead
+                data_size = min(chunk_size, file_size - data_offset)
+                return channels, sample_rate, bits // 8, data_offset, data_size
+            else:
+                wav_file.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+
+
+def open_pcm(path):
+    """Memory-map the samples of a 16-bit WAV file.
+
+    Returns (samples, channels, sample_rate) where samples is a read-only
+    int16 array backed by the file, so only the pages that are touched are
+    ever read into memory.
+    """
+    channels, sample_rate, sample_width, data_offset, data_size = read_wav_header(path)
+    # Whole frames only, in case the file is still being written
+    frame_size = channels * sample_width
+    count = data_size // frame_size * channels
+    if count == 0:
+        return np.zeros(0, dtype=np.int16), channels, sample_rate
+    samples = np.memmap(path, dtype='<i2', mode='r', offset=data_offset, shape=(count,))
+    return samples, channels, sample_rate
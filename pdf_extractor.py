@@ -0,0 +1,201 @@
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from collections import deque
+from threading import Lock
+
+import PyPDF2
+
+from audio_cache import AudioCache, file_digest
+
+# Per-process reader, opened by path on the first page a worker is given
+_reader = None
+_reader_file = None
+_reader_path = None
+
+
+def read_pdf_info(pdf_path):
+    """Get a PDF's title (None when it has none) and page count without extracting any text"""
+    with open(pdf_path, 'rb') as pdf_file:
+        reader = PyPDF2.PdfReader(pdf_file)
+        title = None
+        try:
+            if reader.metadata and reader.metadata.title:
+                title = reader.metadata.title.strip()
+        except Exception:
+            # Broken metadata shouldn't stop the conversion
+            pass
+        return title, len(reader.pages)
+
+
+def _page_text(reader, number):
+    """Text of one page (numbered from 0), or an empty string if it can't be extracted"""
+    try:
+        return reader.pages[number].extract_text() or ''
+    except Exception as e:
+        print(f"Error extracting PDF page {number + 1}: {str(e)}")
+        return ''
+
+
+def iter_pdf_pages(pdf_path):
+    """Yield (page number, page count, text) for each page of a PDF, numbered from 1.
+
+    Pages are parsed one at a time as the generator is consumed, so the
+    first page can be synthesized while the rest of the document is still
+    unread. The file stays open until the generator finishes or is closed.
+    """
+    with open(pdf_path, 'rb') as pdf_file:
+        reader = PyPDF2.PdfReader(pdf_file)
+        page_count = len(reader.pages)
+        for number in range(page_count):
+            yield number + 1, page_count, _page_text(reader, number)
+
+
+def _extract_page(job):
+    """Extract one page in a worker process, returning (text, started, finished).
+
+    Workers open the file themselves and keep the reader for the next page,
+    so nothing but the path and page number crosses the process boundary.
+    """
+    global _reader, _reader_file, _reader_path
+    pdf_path, number = job
+    started = time.time()
+    if _reader_path != pdf_path:
+        if _reader_file:
+            _reader_file.close()
+        _reader_file = open(pdf_path, 'rb')
+        _reader = PyPDF2.PdfReader(_reader_file)
+        _reader_path = pdf_path
+    return _page_text(_reader, number), started, time.time()
+
+
+class PdfExtractor:
+    """Extracts PDF text across worker processes, caching it by the SHA-256 of the file"""
+
+    def __init__(self, cache_dir, workers=None, cache_bytes=256 * 1024 ** 2):
+        # One worker extracts in-process
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = None
+        self.pool_lock = Lock()
+        self.cache = AudioCache(cache_dir, cache_bytes)
+        self.lock = Lock()
+        self.pages_extracted = 0
+        self.extract_seconds = 0.0
+
+    def get_pool(self):
+        """Start the extraction worker pool on first use"""
+        with self.pool_lock:
+            if self.pool is None:
+                # Spawn, like the synthesis pool, so workers start from a clean interpreter
+                self.pool = multiprocessing.get_context('spawn').Pool(self.workers)
+            return self.pool
+
+    def open(self, pdf_path):
+        """Get a PDF's title and a generator of (page number, page count, text) in page order.
+
+        Cached text is replayed from disk; otherwise pages are extracted in
+        parallel as the generator is consumed and saved once all are read.
+        """
+        digest = file_digest(pdf_path)
+        cached_path = self.cache.get(digest)
+        if cached_path:
+            with open(cached_path, encoding='utf-8') as cached_file:
+                header = json.loads(cached_file.readline())
+            return self._replay(cached_path, pdf_path, digest, header), header['title']
+
+        title, page_count = read_pdf_info(pdf_path)
+        if page_count == 0:
+            raise ValueError("PDF has no pages")
+        return self._extract(pdf_path, digest, title, page_count), title
+
+    def _replay(self, cached_path, pdf_path, digest, header):
+        """Yield pages from a cached extraction, or extract them again if it was evicted in the meantime.
+
+        The file is only opened once the first page is asked for, so a
+        generator that is never consumed holds nothing open.
+        """
+        try:
+            cached_file = open(cached_path, encoding='utf-8')
+        except FileNotFoundError:
+            yield from self._extract(pdf_path, digest, header['title'], header['page_count'])
+            return
+        with cached_file:
+            cached_file.readline()
+            for number, line in enumerate(cached_file, 1):
+                yield number, header['page_count'], json.loads(line)
+
+    def _iter_text(self, pdf_path, page_count):
+        """Yield (text, started, finished) for each page in order"""
+        if self.workers == 1:
+            with open(pdf_path, 'rb') as pdf_file:
+                reader = PyPDF2.PdfReader(pdf_file)
+                for number in range(page_count):
+                    started = time.time()
+                    yield _page_text(reader, number), started, time.time()
+            return
+        pool = self.get_pool()
+        # Enough pages in flight to keep every worker busy, but no more, so text
+        # doesn't pile up ahead of synthesis; handed back in page order
+        pending = deque()
+        next_number = 0
+        while next_number < page_count or pending:
+            while next_number < page_count and len(pending) < self.workers * 2:
+                pending.append(pool.apply_async(_extract_page, ((pdf_path, next_number),)))
+                next_number += 1
+            yield pending.popleft().get()
+
+    def _extract(self, pdf_path, digest, title, page_count):
+        """Extract pages, saving them to the cache once the whole document has been read"""
+        # No extension, so a file left by a crash is never indexed as a cache entry
+        handle, temp_path = tempfile.mkstemp(dir=self.cache.directory)
+        first_started = None
+        last_finished = None
+        busy_seconds = 0.0
+        complete = False
+        try:
+            with os.fdopen(handle, 'w', encoding='utf-8') as out:
+                out.write(json.dumps({'title': title, 'page_count': page_count}) + '\n')
+                for number, (text, started, finished) in enumerate(self._iter_text(pdf_path, page_count), 1):
+                    first_started = min(started, first_started or started)
+                    last_finished = max(finished, last_finished or finished)
+                    busy_seconds += finished - started
+                    out.write(json.dumps(text) + '\n')
+                    yield number, page_count, text
+            complete = True
+        finally:
+            if complete:
+                # Workers run ahead of synthesis, so their own timestamps give the
+                # extraction time; in-process pages wait on synthesis between them
+                seconds = last_finished - first_started if self.workers > 1 else busy_seconds
+                with self.lock:
+                    self.pages_extracted += page_count
+                    self.extract_seconds += seconds
+                print(f"Extracted {page_count} PDF pages in {seconds:.2f}s "
+                      f"({page_count / max(seconds, 1e-6):.1f} pages/sec)")
+                self.cache.put(digest, temp_path, 'jsonl')
+            elif os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def get_stats(self):
+        """Get extraction throughput and text cache counters"""
+        with self.lock:
+            stats = {
+                'pages_extracted': self.pages_extracted,
+                'extract_seconds': self.extract_seconds,
+                'pages_per_second': self.pages_extracted / self.extract_seconds if self.extract_seconds else 0.0
+            }
+        cache_stats = self.cache.get_stats()
+        stats['cache_hits'] = cache_stats['hits']
+        stats['cache_misses'] = cache_stats['misses']
+        stats['cache_hit_rate'] = cache_stats['hit_rate']
+        return stats
+
+    def close(self):
+        """Shut down the worker processes"""
+        with self.pool_lock:
+            if self.pool:
+                self.pool.close()
+                self.pool.join()
+                self.pool = None
@@ -0,0 +1,86 @@
+import json
+import sqlite3
+import time
+from threading import Lock
+
+
+class SessionStore:
+    """Per-listener player state in SQLite, so every worker process sees the same sessions"""
+
+    def __init__(self, path, ttl=3600):
+        self.path = path
+        # Sessions idle for longer than this many seconds are dropped
+        self.ttl = ttl
+        self.lock = Lock()
+        self.last_expired = 0
+        self.conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        # WAL lets readers in other processes proceed while one process writes
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS sessions ('
+            'sid TEXT PRIMARY KEY, state TEXT NOT NULL, updated_at REAL NOT NULL)'
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)')
+
+    def get(self, sid):
+        """Get a session's state, or an empty dict for unknown or expired sessions"""
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT state, updated_at FROM sessions WHERE sid = ?', (sid,)
+            ).fetchone()
+            if not row or row[1] < now - self.ttl:
+                return {}
+            # Reading keeps the session alive, but only write that down once a minute
+            self.conn.execute(
+                'UPDATE sessions SET updated_at = ? WHERE sid = ? AND updated_at < ?',
+                (now, sid, now - 60)
+            )
+        return json.loads(row[0])
+
+    def update(self, sid, expect=None, **changes):
+        """Merge changes into a session's state and return the new state.
+
+        With expect, a dict of fields, the changes are only made if the
+        stored state has those values, and None is returned otherwise.
+        """
+        now = time.time()
+        with self.lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self.conn.execute(
+                    'SELECT state, updated_at FROM sessions WHERE sid = ?', (sid,)
+                ).fetchone()
+                state = json.loads(row[0]) if row and row[1] >= now - self.ttl else {}
+                if expect and any(state.get(field) != value for field, value in expect.items()):
+                    self.conn.execute('ROLLBACK')
+                    return None
+                state.update(changes)
+                self.conn.execute(
+                    'INSERT OR REPLACE INTO sessions (sid, state, updated_at) VALUES (?, ?, ?)',
+                    (sid, json.dumps(state, separators=(',', ':')), now)
+                )
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+            if now - self.last_expired > 60:
+                self._expire(now)
+        return state
+
+    def _expire(self, now):
+        """Delete sessions that have been idle for longer than the TTL"""
+        self.conn.execute('DELETE FROM sessions WHERE updated_at < ?', (now - self.ttl,))
+        self.last_expired = now
+
+    def count(self):
+        """Number of live sessions"""
+        with self.lock:
+            return self.conn.execute(
+                'SELECT COUNT(*) FROM sessions WHERE updated_at >= ?', (time.time() - self.ttl,)
+            ).fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
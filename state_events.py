@@ -0,0 +1,83 @@
+import json
+import time
+from threading import Condition, Lock
+
+# Seconds between comments sent on an idle event stream, so proxies keep it open and dead clients are noticed
+HEARTBEAT_SECONDS = 15
+# How long a browser waits before reconnecting a dropped stream
+RETRY_MS = 3000
+
+
+class StateEvents:
+    """Pushes a session's player state to its listeners when it changes, as Server-Sent Events.
+
+    Whatever changes a session's state calls notify() with its id, which
+    wakes only that session's listeners. They send the new state if it
+    differs from what they last sent, and a heartbeat comment when nothing
+    has happened for a while. Each heartbeat also rechecks the state, so
+    changes made by another worker process still arrive, just later.
+    """
+
+    def __init__(self, heartbeat=HEARTBEAT_SECONDS, min_interval=0.25):
+        self.heartbeat = heartbeat
+        # Progress can tick many times a second; bursts closer together than this go out as one event
+        self.min_interval = min_interval
+        self.lock = Lock()
+        # sid -> {'version', 'listeners', 'condition'} for sessions with someone listening
+        self.sessions = {}
+        self.listeners = 0
+        self.events = 0
+        self.heartbeats = 0
+
+    def notify(self, sids):
+        """Wake the listeners of sessions whose state just changed"""
+        with self.lock:
+            for sid in sids:
+                entry = self.sessions.get(sid)
+                if entry:
+                    entry['version'] += 1
+                    entry['condition'].notify_all()
+
+    def iter_events(self, sid, get_state):
+        """Yield a session's state as an event now and whenever it changes, with heartbeats in between"""
+        with self.lock:
+            entry = self.sessions.get(sid)
+            if entry is None:
+                entry = self.sessions[sid] = {'version': 0, 'listeners': 0, 'condition': Condition(self.lock)}
+            entry['listeners'] += 1
+            self.listeners += 1
+        try:
+            yield f'retry: {RETRY_MS}\n\n'
+            last = None
+            while True:
+                with self.lock:
+                    version = entry['version']
+                payload = json.dumps(get_state(sid))
+                if payload != last:
+                    last = payload
+                    with self.lock:
+                        self.events += 1
+                    yield f'data: {payload}\n\n'
+                    time.sleep(self.min_interval)
+                with self.lock:
+                    changed = entry['condition'].wait_for(lambda: entry['version'] != version, self.heartbeat)
+                    if not changed:
+                        self.heartbeats += 1
+                if not changed:
+                    yield ': heartbeat\n\n'
+        finally:
+            with self.lock:
+                entry['listeners'] -= 1
+                self.listeners -= 1
+                if not entry['listeners']:
+                    del self.sessions[sid]
+
+    def get_stats(self):
+        """Get open listeners and how many events and heartbeats they have been sent"""
+        with self.lock:
+            return {
+                'listeners': self.listeners,
+                'sessions': len(self.sessions),
+                'events': self.events,
+                'heartbeats': self.heartbeats
+            }
@@ -0,0 +1,102 @@
+import os
+import struct
+import time
+from threading import Condition
+
+from parallel_synthesis import ChunkWriter
+
+# The wave module always writes a 44 byte header for PCM data
+WAV_HEADER_SIZE = 44
+# Placeholder size for a stream whose final length is not known yet
+UNKNOWN_SIZE = 0xFFFFFFFF
+
+
+def streaming_wav_header(channels, sample_width, frame_rate):
+    """Build a WAV header for a PCM stream of unknown length"""
+    block_align = channels * sample_width
+    return b''.join([
+        b'RIFF', struct.pack('<I', UNKNOWN_SIZE), b'WAVE',
+        b'fmt ', struct.pack('<IHHIIHH', 16, 1, channels, frame_rate,
+                             frame_rate * block_align, block_align, sample_width * 8),
+        b'data', struct.pack('<I', UNKNOWN_SIZE - 36)
+    ])
+
+
+class AudioStream(ChunkWriter):
+    """A WAV file that can be played back while it is still being synthesized"""
+
+    def __init__(self, stream_id, path):
+        super().__init__(path)
+        self.stream_id = stream_id
+        self.condition = Condition()
+        self.started_at = time.time()
+        self.first_audio_at = None
+        self.finished_at = None
+        self.complete = False
+        self.error = None
+
+    @property
+    def time_to_first_audio(self):
+        """Seconds between starting synthesis and the first playable audio"""
+        if self.first_audio_at is None:
+            return None
+        return self.first_audio_at - self.started_at
+
+    def write(self, params, frames, new_chunk=True):
+        """Append a rendered chunk, or more of the last one, and wake up any waiting readers"""
+        with self.condition:
+            super().write(params, frames, new_chunk)
+            if self.first_audio_at is None:
+                self.first_audio_at = time.time()
+                print(f"Stream {self.stream_id}: first audio after {self.time_to_first_audio:.2f}s")
+            self.condition.notify_all()
+
+    def close(self, error=None):
+        """Mark the stream complete, recording the error that ended it if any"""
+        with self.condition:
+            super().close()
+            self.complete = True
+            self.error = error
+            self.finished_at = time.time()
+            self.condition.notify_all()
+
+    def iter_wav(self, block_size=64 * 1024, timeout=30):
+        """Yield the stream as WAV bytes, blocking until more audio is rendered"""
+        with self.condition:
+            while self.params is None and not self.complete:
+                if not self.condition.wait(timeout):
+                    return
+            if self.params is None:
+                return
+            header = streaming_wav_header(*self.params)
+            # Opened under the lock so the file can't be moved between lookup and open
+            audio_file = open(self.path, 'rb')
+
+        position = WAV_HEADER_SIZE
+        with audio_file:
+            yield header
+            while True:
+                with self.condition:
+                    end = WAV_HEADER_SIZE + self.frames_written * self.params[0] * self.params[1]
+                    while position >= end and not self.complete:
+                        if not self.condition.wait(timeout):
+                            return
+                        end = WAV_HEADER_SIZE + self.frames_written * self.params[0] * self.params[1]
+                    if position >= end:
+                        return
+                audio_file.seek(position)
+                data = audio_file.read(min(block_size, end - position))
+                position += len(data)
+                yield data
+
+    def get_state(self):
+        """Get the stream's progress and timing"""
+        return {
+            'stream_id': self.stream_id,
+            'complete': self.complete,
+            'error': str(self.error) if self.error else None,
+            'duration': self.boundaries[-1]['end'] if self.boundaries else 0,
+            'time_to_first_audio': self.time_to_first_audio,
+            'render_time': (self.finished_at - self.started_at) if self.finished_at else None,
+            'filename': os.path.basename(self.path)
+        }
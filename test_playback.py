@@ -1,36 +1,33 @@
 import pygame
 import time
-from pydub import AudioSegment
 import os
-import pyttsx3
+import uuid
+from audio_encoder import synthesize_to_file
+from tts_backends import create_backend
 
 def generate_test_audio():
     """Generate a test audio file"""
-    engine = pyttsx3.init()
+    engine = create_backend('auto')
     
     # Create temp directory if it doesn't exist
     if not os.path.exists('temp_audio'):
         os.makedirs('temp_audio')
     
-    # Generate test audio
-    wav_path = 'temp_audio/test.wav'
-    mp3_path = 'temp_audio/test.mp3'
-    
-    # Generate WAV file
-    engine.save_to_file(
-        "This is a test of continuous playback with speed changes. "
-        "Let's see if we can change the speed without interrupting playback. "
-        "This text should be long enough to test the functionality.",
-        wav_path
-    )
-    engine.runAndWait()
+    # Unique path, so concurrent test runs don't overwrite each other
+    mp3_path = os.path.join('temp_audio', f'test_{uuid.uuid4().hex}.mp3')
     
-    # Convert to MP3
-    sound = AudioSegment.from_wav(wav_path)
-    sound.export(mp3_path, format="mp3")
-    
-    # Cleanup WAV file
-    os.remove(wav_path)
+    # Encode the speech straight to MP3
+    try:
+        synthesize_to_file(
+            engine,
+            "This is a test of continuous playback with speed changes. "
+            "Let's see if we can change the speed without interrupting playback. "
+            "This text should be long enough to test the functionality.",
+            mp3_path,
+            scratch_dir='temp_audio'
+        )
+    finally:
+        engine.close()
     
     return mp3_path
 
@@ -0,0 +1,59 @@
+import os
+
+from audio_cache import AudioCache
+
+
+def put(cache, tmp_path, key, size=100):
+    path = tmp_path / f'scratch_{key}'
+    path.write_bytes(b'x' * size)
+    return cache.put(key, str(path))
+
+
+def test_least_recently_used_is_evicted(tmp_path):
+    cache = AudioCache(str(tmp_path / 'cache'), max_bytes=250)
+    put(cache, tmp_path, 'a')
+    put(cache, tmp_path, 'b')
+    cache.get('a')
+    put(cache, tmp_path, 'c')
+    assert cache.get('b') is None
+    assert cache.get('a') and cache.get('c')
+
+
+def test_leased_and_pinned_entries_are_kept(tmp_path):
+    cache = AudioCache(str(tmp_path / 'cache'), max_bytes=150)
+    put(cache, tmp_path, 'a')
+    cache.lease('listener', ['a'], 60)
+    put(cache, tmp_path, 'b')
+    with cache.pinned('b'):
+        put(cache, tmp_path, 'c')
+    assert cache.get('a') and cache.get('b') and cache.get('c')
+    # Once released, the next put evicts down to the budget again
+    cache.release('listener', ['a'])
+    put(cache, tmp_path, 'd')
+    assert cache.get('a') is None
+    assert cache.get('b') is None
+
+
+def test_new_lease_replaces_the_holders_old_one(tmp_path):
+    cache = AudioCache(str(tmp_path / 'cache'), max_bytes=150)
+    put(cache, tmp_path, 'a')
+    cache.lease('listener', ['a'], 60)
+    put(cache, tmp_path, 'b')
+    cache.lease('listener', ['b'], 60)
+    put(cache, tmp_path, 'c')
+    assert cache.get('a') is None
+    assert cache.get('b')
+
+
+def test_instances_sharing_a_directory_see_each_others_files(tmp_path):
+    directory = str(tmp_path / 'cache')
+    first = AudioCache(directory, max_bytes=250)
+    second = AudioCache(directory, max_bytes=250)
+    put(first, tmp_path, 'a')
+    assert second.get('a')
+    put(second, tmp_path, 'b')
+    put(second, tmp_path, 'c')
+    # second evicted a, which it only knew about from disk
+    assert not os.path.exists(os.path.join(directory, 'a.wav'))
+    assert first.get('a') is None
+    assert 'c' in first
@@ -0,0 +1,41 @@
+import math
+import shutil
+import struct
+import subprocess
+
+import pytest
+
+from audio_encoder import ChunkedMp3Encoder, ParallelMp3Encoder
+
+needs_ffmpeg = pytest.mark.skipif(not shutil.which('ffmpeg'), reason="ffmpeg is not installed")
+
+
+def tone(seconds, frame_rate=16000):
+    return b''.join(struct.pack('<h', int(8000 * math.sin(i / 10))) for i in range(int(seconds * frame_rate)))
+
+
+def test_chunked_encoder_needs_an_output():
+    with pytest.raises(TypeError):
+        ChunkedMp3Encoder((1, 2, 16000))
+
+
+@needs_ffmpeg
+def test_spliced_chunks_decode_to_the_source_length(tmp_path):
+    pcm = tone(2.5)
+    encoder = ParallelMp3Encoder(str(tmp_path / 'out.mp3'), (1, 2, 16000), '32k', workers=2, chunk_seconds=1)
+    # Uneven writes, as synthesis hands them over
+    for start in range(0, len(pcm), 7000):
+        encoder.write(pcm[start:start + 7000])
+    path = encoder.close()
+    decoded = subprocess.run(['ffmpeg', '-v', 'error', '-i', path, '-f', 's16le', 'pipe:1'],
+                             capture_output=True, check=True).stdout
+    assert len(decoded) == len(pcm)
+    assert encoder.frame_count > 2
+
+
+@needs_ffmpeg
+def test_abort_leaves_nothing_behind(tmp_path):
+    encoder = ParallelMp3Encoder(str(tmp_path / 'out.mp3'), (1, 2, 16000), '32k', workers=1, chunk_seconds=1)
+    encoder.write(tone(1.5))
+    encoder.abort()
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,52 @@
+import os
+
+from werkzeug.http import parse_range_header
+
+from audio_http import _resolve_ranges, content_etag
+
+
+def resolve(header, size=1000):
+    return _resolve_ranges(parse_range_header(header), size)
+
+
+def test_closed_range():
+    assert resolve('bytes=0-99') == [(0, 99)]
+
+
+def test_open_range_runs_to_the_end():
+    assert resolve('bytes=500-') == [(500, 999)]
+
+
+def test_suffix_range_is_the_last_bytes():
+    assert resolve('bytes=-100') == [(900, 999)]
+    assert resolve('bytes=-5000') == [(0, 999)]
+
+
+def test_range_past_the_end_is_clamped():
+    assert resolve('bytes=900-5000') == [(900, 999)]
+
+
+def test_multiple_ranges_keep_their_order():
+    assert resolve('bytes=0-9,100-109') == [(0, 9), (100, 109)]
+
+
+def test_unsatisfiable_ranges():
+    assert resolve('bytes=1000-') is None
+    assert resolve('bytes=0-9', size=0) is None
+
+
+def test_content_addressed_files_are_tagged_by_name(tmp_path):
+    name = 'ab' * 32
+    path = tmp_path / f'{name}.wav'
+    path.write_bytes(b'audio')
+    assert content_etag(str(path)) == name
+
+
+def test_other_files_are_tagged_by_size_and_mtime(tmp_path):
+    path = tmp_path / 'index.m3u8'
+    path.write_bytes(b'#EXTM3U\n')
+    os.utime(path, ns=(1, 1000))
+    first = content_etag(str(path))
+    path.write_bytes(b'#EXTM3U\nseg_00000.mp3\n')
+    os.utime(path, ns=(1, 2000))
+    assert content_etag(str(path)) != first
@@ -0,0 +1,109 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import bulk_ingest
+from bulk_ingest import BulkIngest
+from extraction_cache import ExtractionCache
+from job_queue import QueueFullError
+
+
+class Page:
+    def __init__(self, url, text):
+        self.url = url
+        self.text = text
+        self.content = text.encode('utf-8')
+
+
+class Job:
+    def __init__(self, id):
+        self.id = id
+
+
+@pytest.fixture
+def site(tmp_path, monkeypatch):
+    """Fake fetch and extraction, recording how many fetches each host has in flight"""
+    site = {'fetches': [], 'in_flight': {}, 'peak': {}}
+    lock = threading.Lock()
+
+    def fetch(url, headers=None):
+        host = url.split('/')[2]
+        with lock:
+            site['fetches'].append(url)
+            site['in_flight'][host] = site['in_flight'].get(host, 0) + 1
+            site['peak'][host] = max(site['peak'].get(host, 0), site['in_flight'][host])
+        time.sleep(0.02)
+        with lock:
+            site['in_flight'][host] -= 1
+        if url.endswith('/missing'):
+            raise OSError("404 Not Found")
+        return Page(url, f'<p>{url}</p>' if not url.endswith('/empty') else '')
+
+    def extract_html(url, html):
+        return html, f'Title of {url}' if html else ''
+
+    parse_pool = ThreadPoolExecutor(2)
+    monkeypatch.setattr(bulk_ingest, 'fetch', fetch)
+    monkeypatch.setattr(bulk_ingest, 'extract_html', extract_html)
+    monkeypatch.setattr(bulk_ingest, 'get_parse_pool', lambda: parse_pool)
+    monkeypatch.setattr(bulk_ingest, 'get_extraction_cache', lambda: ExtractionCache(str(tmp_path)))
+    yield site
+    parse_pool.shutdown()
+
+
+def submitter():
+    submitted = []
+
+    def submit(text, title):
+        submitted.append(title)
+        return Job(f'job-{len(submitted)}')
+    return submit, submitted
+
+
+def test_every_url_is_queued_once_or_reported(site):
+    submit, submitted = submitter()
+    urls = ['http://a.test/1', 'http://a.test/1 ', 'http://a.test/missing', 'http://b.test/empty', '']
+    batch = BulkIngest(urls, submit)
+    asyncio.run(batch.run())
+    summary = batch.to_dict()
+    assert summary['complete'] and summary['counts'] == {'queued': 1, 'error': 2}
+    first, missing, empty = summary['results']
+    assert (first['status'], first['title'], first['job_id']) == ('queued', 'Title of http://a.test/1', 'job-1')
+    assert first['bytes'] and first['fetch_seconds'] is not None
+    assert missing['error'] == '404 Not Found'
+    assert empty['error'] == 'No article text found'
+    assert submitted == ['Title of http://a.test/1']
+
+
+def test_fetches_are_limited_per_domain(site):
+    submit, submitted = submitter()
+    urls = [f'http://a.test/{n}' for n in range(8)] + [f'http://b.test/{n}' for n in range(8)]
+    asyncio.run(BulkIngest(urls, submit, max_concurrency=16, max_per_domain=2).run())
+    assert len(submitted) == 16
+    assert sorted(site['peak']) == ['a.test', 'b.test'] and max(site['peak'].values()) <= 2
+
+
+def test_recent_extractions_skip_the_fetch(site):
+    submit, submitted = submitter()
+    asyncio.run(BulkIngest(['http://a.test/1'], submit).run())
+    asyncio.run(BulkIngest(['http://a.test/1'], submit).run())
+    assert site['fetches'] == ['http://a.test/1']
+    assert submitted == ['Title of http://a.test/1'] * 2
+
+
+def test_full_queue_is_waited_on_rather_than_dropped(site):
+    submit, submitted = submitter()
+    attempts = []
+
+    def busy_then_submit(text, title):
+        attempts.append(title)
+        if len(attempts) == 1:
+            raise QueueFullError("Too many conversions queued, try again later")
+        return submit(text, title)
+
+    batch = BulkIngest(['http://a.test/1'], busy_then_submit)
+    asyncio.run(batch.run())
+    assert len(attempts) == 2 and batch.to_dict()['counts'] == {'queued': 1}
@@ -0,0 +1,82 @@
+import zipfile
+
+from epub_index import EpubIndex
+
+CONTAINER = '''<?xml version="1.0"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles><rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/></rootfiles>
+</container>'''
+
+OPF = '''<?xml version="1.0"?>
+<package xmlns="http://www.idpf.org/2007/opf" version="3.0">
+  <metadata xmlns:dc="http://purl.org/dc/elements/1.1/"><dc:title>A Book</dc:title></metadata>
+  <manifest>
+    <item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>
+    <item id="ncx" href="toc.ncx" media-type="application/x-dtbncx+xml"/>
+    <item id="one" href="text/one.xhtml" media-type="application/xhtml+xml"/>
+    <item id="notes" href="text/notes.xhtml" media-type="application/xhtml+xml"/>
+    <item id="two" href="text/two%20b.xhtml" media-type="application/xhtml+xml"/>
+    <item id="cover" href="cover.jpg" media-type="image/jpeg"/>
+  </manifest>
+  <spine toc="ncx">
+    <itemref idref="nav"/>
+    <itemref idref="one"/>
+    <itemref idref="notes" linear="no"/>
+    <itemref idref="cover"/>
+    <itemref idref="two"/>
+  </spine>
+</package>'''
+
+NAV = '''<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops"><body>
+  <nav epub:type="toc"><ol>
+    <li><a href="text/one.xhtml">Chapter One</a></li>
+    <li><a href="text/one.xhtml#part">Part of One</a></li>
+  </ol></nav>
+</body></html>'''
+
+NCX = '''<ncx xmlns="http://www.daisy.org/z3986/2005/ncx/"><navMap>
+  <navPoint id="p1"><navLabel><text>First</text></navLabel><content src="text/one.xhtml"/></navPoint>
+  <navPoint id="p2"><navLabel><text>Second</text></navLabel><content src="text/two%20b.xhtml#start"/></navPoint>
+</navMap></ncx>'''
+
+
+def chapter(heading, body):
+    return f'<html><body><h1>{heading}</h1><p>{body}</p></body></html>'
+
+
+def make_epub(path, opf=OPF, nav=NAV):
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.writestr('META-INF/container.xml', CONTAINER)
+        archive.writestr('OEBPS/content.opf', opf)
+        archive.writestr('OEBPS/nav.xhtml', nav)
+        archive.writestr('OEBPS/toc.ncx', NCX)
+        archive.writestr('OEBPS/text/one.xhtml', chapter('One', 'First words.'))
+        archive.writestr('OEBPS/text/notes.xhtml', chapter('Notes', 'Skipped.'))
+        archive.writestr('OEBPS/text/two b.xhtml', chapter('Two', 'Last words.'))
+        archive.writestr('OEBPS/cover.jpg', b'\xff\xd8')
+    return str(path)
+
+
+def test_spine_gives_the_readable_chapters_in_order(tmp_path):
+    index = EpubIndex(make_epub(tmp_path / 'book.epub'))
+    assert index.title == 'A Book'
+    # The nav document, non-linear items and images are left out
+    assert [(c['href'], c['title']) for c in index.chapters] == [
+        ('OEBPS/text/one.xhtml', 'Chapter One'),
+        ('OEBPS/text/two b.xhtml', 'Section 2'),
+    ]
+    assert all(seconds > 0 for seconds in index.estimate_seconds(150))
+
+
+def test_ncx_titles_are_used_without_a_nav_document(tmp_path):
+    opf = OPF.replace(' properties="nav"', '')
+    index = EpubIndex(make_epub(tmp_path / 'book.epub', opf=opf))
+    # Without the nav property the old nav document is just another spine item
+    assert [c['title'] for c in index.chapters] == ['Section 1', 'First', 'Second']
+
+
+def test_iterating_reads_each_chapter_as_paragraphs(tmp_path):
+    index = EpubIndex(make_epub(tmp_path / 'book.epub'))
+    chapters = [(number, count, ' '.join(text.split())) for number, count, text in index]
+    assert chapters == [(1, 2, 'One First words.'), (2, 2, 'Two Last words.')]
+    assert '\n\n' in index.read_chapter(0)
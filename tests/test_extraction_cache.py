@@ -0,0 +1,39 @@
+import time
+
+from extraction_cache import ExtractionCache, content_hash
+
+
+class Extractor:
+    def __init__(self, version_tag='article-1'):
+        self.version_tag = version_tag
+
+
+def test_fresh_entry_is_reused_only_by_the_same_extractor_version(tmp_path):
+    cache = ExtractionCache(str(tmp_path))
+    cache.put('http://a/', 'http://a/final', content_hash(b'<p>x</p>'), Extractor(), 'Text', 'Title')
+    assert cache.get('http://a/', Extractor()) == ('Text', 'Title')
+    assert cache.get('http://a/', Extractor('article-2')) is None
+    assert cache.get('http://b/', Extractor()) is None
+
+
+def test_expired_entry_is_reused_while_the_page_is_unchanged(tmp_path):
+    cache = ExtractionCache(str(tmp_path), ttl=0)
+    digest = content_hash(b'<p>x</p>')
+    cache.put('http://a/', 'http://a/', digest, Extractor(), 'Text', 'Title')
+    assert cache.get('http://a/', Extractor()) is None
+    assert cache.get_unchanged('http://a/', Extractor(), digest) == ('Text', 'Title')
+    assert cache.get_unchanged('http://a/', Extractor(), content_hash(b'<p>y</p>')) is None
+    stats = cache.get_stats()
+    assert (stats['hits'], stats['unchanged'], stats['misses']) == (0, 1, 1)
+
+
+def test_revalidation_restarts_the_ttl(tmp_path, monkeypatch):
+    cache = ExtractionCache(str(tmp_path), ttl=60)
+    digest = content_hash(b'<p>x</p>')
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now - 120)
+    cache.put('http://a/', 'http://a/', digest, Extractor(), 'Text', 'Title')
+    monkeypatch.setattr(time, 'time', lambda: now)
+    assert cache.get('http://a/', Extractor()) is None
+    assert cache.get_unchanged('http://a/', Extractor(), digest)
+    assert cache.get('http://a/', Extractor()) == ('Text', 'Title')
@@ -0,0 +1,41 @@
+import pytest
+
+import extractors
+from extractors import Extractor, find_extractor
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(extractors, 'EXTRACTORS', {})
+    exact = Extractor('exact', None)
+    site = Extractor('site', None)
+    blog = Extractor('blog', None)
+    extractors.register(exact, 'www.example.org')
+    extractors.register(site, '*.example.org')
+    extractors.register(blog, '*.blog.example.org')
+    return exact, site, blog
+
+
+def test_exact_hostname_wins(registry):
+    exact, _, _ = registry
+    assert find_extractor('https://www.example.org/a') is exact
+
+
+def test_closest_wildcard_wins(registry):
+    _, site, blog = registry
+    assert find_extractor('https://news.example.org/a') is site
+    assert find_extractor('https://a.blog.example.org/a') is blog
+
+
+def test_wildcard_does_not_match_the_bare_domain(registry):
+    assert find_extractor('https://example.org/a') is extractors.GENERIC
+
+
+def test_hostnames_are_case_insensitive(registry):
+    exact, _, _ = registry
+    assert find_extractor('https://WWW.Example.ORG/a') is exact
+
+
+def test_unknown_host_gets_the_generic_extractor(registry):
+    assert find_extractor('https://other.net/a') is extractors.GENERIC
+    assert find_extractor('not a url') is extractors.GENERIC
@@ -0,0 +1,83 @@
+import math
+import os
+import shutil
+import struct
+
+import pytest
+
+from hls import MASTER_NAME, HlsLadder, HlsSegmenter, is_complete, timestamp_tag
+
+needs_ffmpeg = pytest.mark.skipif(not shutil.which('ffmpeg'), reason="ffmpeg is not installed")
+
+
+def tone(seconds, frame_rate=16000):
+    return b''.join(struct.pack('<h', int(8000 * math.sin(i / 10))) for i in range(int(seconds * frame_rate)))
+
+
+def playlist_entries(path):
+    with open(path) as playlist:
+        lines = playlist.read().splitlines()
+    return [(float(line[8:-1]), name) for line, name in zip(lines, lines[1:]) if line.startswith('#EXTINF:')], lines
+
+
+def test_timestamp_tag_is_on_the_90khz_clock():
+    tag = timestamp_tag(2.5)
+    assert tag.startswith(b'ID3\x04') and b'com.apple.streaming.transportStreamTimestamp\0' in tag
+    assert struct.unpack('>Q', tag[-8:])[0] == 225000
+    # The header's size counts everything after it
+    assert tag[6:10] == bytes([0, 0, 0, len(tag) - 10])
+
+
+@needs_ffmpeg
+def test_segments_are_listed_as_they_land_and_the_playlist_is_ended_on_close(tmp_path):
+    directory = str(tmp_path / 'render')
+    segmenter = HlsSegmenter(directory, (1, 2, 16000), '32k', workers=2, segment_seconds=1)
+    assert not is_complete(directory)
+    segmenter.write(tone(2.5))
+    path = segmenter.close()
+    entries, lines = playlist_entries(path)
+    assert lines[-1] == '#EXT-X-ENDLIST' and is_complete(directory)
+    assert [name for seconds, name in entries] == ['seg_00000.mp3', 'seg_00001.mp3', 'seg_00002.mp3']
+    assert all(os.path.exists(os.path.join(directory, name)) for seconds, name in entries)
+    assert all(seconds <= int(lines[2].split(':')[1]) for seconds, name in entries)
+    # Each segment starts where the ones before it leave off
+    start = 0.0
+    for seconds, name in entries:
+        with open(os.path.join(directory, name), 'rb') as segment:
+            assert segment.read(len(timestamp_tag(start))) == timestamp_tag(start)
+        start += seconds
+    assert start == pytest.approx(2.5, abs=0.2)
+
+
+def test_segmenter_needs_a_directory_of_its_own(tmp_path):
+    with pytest.raises(FileExistsError):
+        HlsSegmenter(str(tmp_path), (1, 2, 16000), '32k', workers=1)
+
+
+@needs_ffmpeg
+def test_ladder_renditions_line_up_behind_a_master_playlist(tmp_path):
+    directory = str(tmp_path / 'render')
+    ladder = HlsLadder(directory, (1, 2, 16000), ['48k', '24k'], workers=2, segment_seconds=1)
+    ladder.write(tone(2.5))
+    assert not is_complete(directory, ['24k', '48k'])
+    assert ladder.close() == os.path.join(directory, MASTER_NAME)
+    assert is_complete(directory, ['24k', '48k'])
+    with open(ladder.playlist_path) as master:
+        lines = master.read().splitlines()
+    # Lowest bitrate first, which players start on
+    assert [line for line in lines if not line.startswith('#')] == ['24k/index.m3u8', '48k/index.m3u8']
+    low, high = (playlist_entries(os.path.join(directory, bitrate, 'index.m3u8'))[0] for bitrate in ('24k', '48k'))
+    assert low == high and len(low) == 3
+
+
+@needs_ffmpeg
+def test_aborted_ladder_leaves_nothing_behind(tmp_path):
+    ladder = HlsLadder(str(tmp_path / 'render'), (1, 2, 16000), ['24k', '48k'], workers=1, segment_seconds=1)
+    ladder.write(tone(1.5))
+    ladder.abort()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_ladder_needs_a_bitrate(tmp_path):
+    with pytest.raises(ValueError):
+        HlsLadder(str(tmp_path / 'render'), (1, 2, 16000), [])
@@ -0,0 +1,88 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from http_fetch import ContentRejected, Fetcher
+
+PAGES = {
+    # path: (content type, body, etag)
+    '/article': ('text/html; charset=utf-8', '<p>Café</p>'.encode('utf-8'), '"v1"'),
+    '/latin': ('text/html', b'<meta charset="iso-8859-1"><p>Caf\xe9</p>', None),
+    '/image': ('image/png', b'\x89PNG' + b'\0' * 100, None),
+    '/long': ('text/html', b'<p>' + b'x' * 5000, None),
+}
+
+
+class Handler(BaseHTTPRequestHandler):
+    hits = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.hits.append((self.path, self.headers.get('If-None-Match')))
+        content_type, body, etag = PAGES[self.path]
+        if etag and self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        if self.path == '/image':
+            self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    Handler.hits = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def fetcher(tmp_path):
+    fetcher = Fetcher(str(tmp_path))
+    yield fetcher
+    fetcher.close()
+
+
+def test_page_with_an_etag_is_revalidated_from_the_cache(server, fetcher):
+    first = fetcher.get(server + '/article')
+    second = fetcher.get(server + '/article')
+    assert (first.text, first.from_cache) == ('<p>Café</p>', False)
+    assert (second.text, second.content, second.from_cache) == (first.text, first.content, True)
+    assert Handler.hits == [('/article', None), ('/article', '"v1"')]
+    stats = fetcher.get_stats()
+    assert (stats['requests'], stats['not_modified'], stats['errors']) == (2, 1, 0)
+
+
+def test_meta_charset_is_used_when_the_header_has_none(server, fetcher):
+    page = fetcher.get(server + '/latin')
+    assert page.encoding == 'iso8859-1'
+    assert page.text.endswith('<p>Café</p>')
+    # Nothing to revalidate against, so it is not cached
+    assert fetcher.get(server + '/latin').from_cache is False
+
+
+def test_unwanted_type_is_rejected(server, fetcher):
+    with pytest.raises(ContentRejected):
+        fetcher.get(server + '/image')
+    assert fetcher.get_stats()['rejected'] == 1
+
+
+def test_oversized_body_without_a_length_is_cut_off(server, tmp_path):
+    fetcher = Fetcher(str(tmp_path), max_bytes=1000)
+    with pytest.raises(ContentRejected):
+        fetcher.get(server + '/long')
+    fetcher.max_bytes = 10000
+    assert len(fetcher.get(server + '/long').content) == 5003
+    assert fetcher.get_stats()['rejected'] == 1
+    fetcher.close()
@@ -0,0 +1,76 @@
+import threading
+import time
+
+import pytest
+
+from job_queue import JobQueue, QueueFullError
+
+
+def wait(job, states=('done', 'error'), timeout=5):
+    deadline = time.time() + timeout
+    while job.state not in states:
+        assert time.time() < deadline, f"job still {job.state}"
+        time.sleep(0.01)
+    return job
+
+
+@pytest.fixture
+def queue():
+    queue = JobQueue(workers=1)
+    yield queue
+    queue.executor.shutdown(wait=False)
+
+
+def test_identical_submissions_share_the_job_in_flight(queue):
+    release = threading.Event()
+    job, created = queue.submit_once('key', 'test', lambda job: release.wait(5) and 'result')
+    same, joined = queue.submit_once('key', 'test', lambda job: 'other')
+    release.set()
+    assert created and not joined
+    assert same is job
+    assert wait(job).result == 'result'
+    assert job.coalesced == 1
+    assert queue.get_stats()['coalesced'] == 1
+
+
+def test_finished_job_is_not_reused(queue):
+    first, _ = queue.submit_once('key', 'test', lambda job: 1)
+    wait(first)
+    second, created = queue.submit_once('key', 'test', lambda job: 2)
+    assert created and second is not first
+    assert wait(second).result == 2
+
+
+def test_failed_job_is_not_reused(queue):
+    def fail(job):
+        raise ValueError("broken")
+
+    first, _ = queue.submit_once('key', 'test', fail)
+    assert wait(first).error == 'broken'
+    second, created = queue.submit_once('key', 'test', lambda job: 'ok')
+    assert created
+    assert wait(second).result == 'ok'
+
+
+def test_no_key_always_queues_a_new_job(queue):
+    release = threading.Event()
+    first, _ = queue.submit_once(None, 'test', lambda job: release.wait(5))
+    second, created = queue.submit_once(None, 'test', lambda job: None)
+    release.set()
+    assert created and second is not first
+    wait(first)
+    wait(second)
+
+
+def test_full_queue_rejects_new_jobs(queue):
+    release = threading.Event()
+    running = queue.submit('test', lambda job: release.wait(5))
+    wait(running, states=('extracting',))
+    queued = queue.submit('test', lambda job: None, max_queued=1)
+    try:
+        with pytest.raises(QueueFullError):
+            queue.submit('test', lambda job: None, max_queued=1)
+    finally:
+        release.set()
+    wait(running)
+    wait(queued)
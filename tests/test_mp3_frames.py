@@ -0,0 +1,73 @@
+import struct
+
+import pytest
+
+from mp3_frames import (ENCODER_DELAY, FrameHeader, build_info_frame, crc16, info_frame_size, is_info_frame,
+                        split_frames)
+
+
+def frame(header):
+    return header.to_bytes() + bytes(header.size - 4)
+
+
+def test_header_round_trips_through_bytes():
+    header = FrameHeader.for_stream(22050, 1, bitrate_index=8)
+    parsed = FrameHeader.parse(header.to_bytes())
+    assert (parsed.version, parsed.bitrate_index, parsed.sample_rate_index, parsed.channel_mode) == (2, 8, 0, 3)
+    assert parsed.sample_rate == 22050
+    assert parsed.bitrate == 64000
+
+
+def test_frame_sizes():
+    # 128 kbps at 44.1 kHz is the classic 417 byte frame; MPEG-2 frames hold half the samples
+    assert FrameHeader.for_stream(44100, 2, bitrate_index=9).size == 417
+    header = FrameHeader.for_stream(22050, 1, bitrate_index=8)
+    assert header.samples == 576
+    assert header.size == 576 // 8 * 64000 // 22050
+
+
+def test_invalid_headers_are_rejected():
+    assert FrameHeader.parse(b'\x00\x00\x00\x00') is None
+    assert FrameHeader.parse(b'\xff\xfb') is None
+    # Free format bitrate
+    assert FrameHeader.parse(b'\xff\xfb\x00\x00') is None
+
+
+def test_unsupported_sample_rate():
+    with pytest.raises(ValueError):
+        FrameHeader.for_stream(44000, 1)
+
+
+def test_split_frames_skips_id3_and_info_tag():
+    header = FrameHeader.for_stream(22050, 1, bitrate_index=8)
+    info = build_info_frame(22050, 1, 3, 3 * header.size, 3 * 576 - ENCODER_DELAY - 100, 64000)
+    id3 = b'ID3\x04\x00\x00\x00\x00\x00\x05' + bytes(5)
+    data = id3 + info + frame(header) * 3 + b'\xff\xfb'
+    frames = split_frames(data)
+    start = len(id3) + len(info)
+    assert frames == [(start + i * header.size, header.size) for i in range(3)]
+
+
+def test_info_frame_fields():
+    frame_count, audio_bytes, pcm_samples = 100, 100 * 144, 100 * 576 - ENCODER_DELAY - 300
+    info = build_info_frame(22050, 1, frame_count, audio_bytes, pcm_samples, 64000)
+    header = FrameHeader.parse(info)
+    assert len(info) == header.size == info_frame_size(22050, 1)
+    assert is_info_frame(info, 0, header)
+    tag = 4 + header.side_info_size
+    assert struct.unpack_from('>4sIII', info, tag) == (b'Info', 0xF, frame_count, len(info) + audio_bytes)
+    lame = tag + 120
+    assert info[lame:lame + 9] == b'LAME3.100'
+    delays = int.from_bytes(info[lame + 21:lame + 24], 'big')
+    assert (delays >> 12, delays & 0xFFF) == (ENCODER_DELAY, 300)
+    assert struct.unpack_from('>H', info, lame + 34)[0] == crc16(info[:lame + 34])
+
+
+def test_info_frame_rejects_too_few_frames():
+    with pytest.raises(ValueError):
+        build_info_frame(22050, 1, 10, 1440, 10 * 576, 64000)
+
+
+def test_crc16_check_value():
+    # CRC-16/ARC of "123456789"
+    assert crc16(b'123456789') == 0xBB3D
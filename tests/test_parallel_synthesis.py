@@ -0,0 +1,39 @@
+from parallel_synthesis import iter_chunks
+
+
+def words(chunks):
+    return ' '.join(chunks).split()
+
+
+def test_chunks_stay_under_max_chars_and_keep_every_word():
+    text = 'This is a sentence of moderate length. ' * 200
+    chunks = list(iter_chunks([text], max_chars=300))
+    assert all(len(chunk) <= 300 for chunk in chunks)
+    assert words(chunks) == text.split()
+
+
+def test_lead_chunk_is_capped_and_later_chunks_use_max_chars():
+    text = 'Hello there, listener. ' * 200
+    chunks = list(iter_chunks([text], max_chars=1000, lead_chars=100))
+    assert len(chunks[0]) <= 100
+    assert len(chunks[1]) > 900
+    assert words(chunks) == text.split()
+
+
+def test_long_first_sentence_only_shortens_the_lead_piece():
+    sentence = 'word ' * 1000
+    chunks = list(iter_chunks([sentence], max_chars=1000, lead_chars=200))
+    assert len(chunks[0]) <= 200
+    assert all(len(chunk) > 900 for chunk in chunks[1:-1])
+    assert words(chunks) == sentence.split()
+
+
+def test_paragraphs_are_not_glued_onto_a_full_chunk():
+    first = 'a' * 60 + '.'
+    second = 'b' * 60 + '.'
+    assert list(iter_chunks([first + '\n\n' + second], max_chars=100)) == [first, second]
+
+
+def test_pieces_are_chunked_as_one_text():
+    chunks = list(iter_chunks(['One. Two.', 'Three.'], max_chars=100))
+    assert chunks == ['One. Two. Three.']
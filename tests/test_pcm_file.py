@@ -0,0 +1,66 @@
+import struct
+import wave
+
+import numpy as np
+import pytest
+
+from pcm_file import open_pcm, read_wav_header
+
+
+def write_wav(path, samples, channels=1, frame_rate=8000):
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(frame_rate)
+        wav.writeframes(np.asarray(samples, dtype='<i2').tobytes())
+    return str(path)
+
+
+def chunk(chunk_id, data):
+    return chunk_id + struct.pack('<I', len(data)) + data + b'\0' * (len(data) & 1)
+
+
+def test_samples_are_mapped_from_the_file(tmp_path):
+    path = write_wav(tmp_path / 'a.wav', [1, -2, 3, -4, 5, -6], channels=2)
+    samples, channels, sample_rate = open_pcm(path)
+    assert (channels, sample_rate) == (2, 8000)
+    assert isinstance(samples, np.memmap) and samples.tolist() == [1, -2, 3, -4, 5, -6]
+
+
+def test_other_chunks_are_skipped_and_odd_ones_padded(tmp_path):
+    fmt = struct.pack('<HHIIHH', 1, 1, 16000, 32000, 2, 16)
+    body = b'WAVE' + chunk(b'LIST', b'odd') + chunk(b'fmt ', fmt) + chunk(b'data', struct.pack('<3h', 7, 8, 9))
+    path = tmp_path / 'a.wav'
+    path.write_bytes(b'RIFF' + struct.pack('<I', len(body)) + body)
+    assert read_wav_header(str(path)) == (1, 16000, 2, 56, 6)
+    assert open_pcm(str(path))[0].tolist() == [7, 8, 9]
+
+
+def test_streamed_file_is_read_to_its_last_whole_frame(tmp_path):
+    path = write_wav(tmp_path / 'a.wav', [1, 2, 3, 4], channels=2)
+    # A placeholder size, as a file still being written carries, and half a frame at the end
+    with open(path, 'r+b') as wav:
+        wav.seek(40)
+        wav.write(struct.pack('<I', 0xFFFFFFFF))
+        wav.seek(0, 2)
+        wav.write(struct.pack('<h', 5))
+    assert open_pcm(path)[0].tolist() == [1, 2, 3, 4]
+
+
+def test_empty_data_gives_no_samples(tmp_path):
+    samples, channels, sample_rate = open_pcm(write_wav(tmp_path / 'a.wav', []))
+    assert len(samples) == 0 and channels == 1
+
+
+def test_non_pcm_files_are_refused(tmp_path):
+    path = tmp_path / 'a.wav'
+    path.write_bytes(b'RIFF\0\0\0\0AVI ')
+    with pytest.raises(ValueError):
+        read_wav_header(str(path))
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(1)
+        wav.setframerate(8000)
+        wav.writeframes(b'\x80' * 10)
+    with pytest.raises(ValueError):
+        read_wav_header(str(path))
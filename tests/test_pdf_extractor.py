@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+from benchmarks import make_test_pdf
+from pdf_extractor import PdfExtractor, iter_pdf_pages, read_pdf_info
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    path = str(tmp_path / 'doc.pdf')
+    make_test_pdf(path, 6, sentences=2)
+    return path
+
+
+def first_lines(pages):
+    return [(number, count, text.splitlines()[0]) for number, count, text in pages]
+
+
+EXPECTED = [(number, 6, f'Page {number}, sentence 1 of the benchmark document.') for number in range(1, 7)]
+
+
+def test_pages_are_read_one_at_a_time(pdf_path):
+    assert read_pdf_info(pdf_path) == (None, 6)
+    assert first_lines(iter_pdf_pages(pdf_path)) == EXPECTED
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_extracted_pages_come_back_in_order_and_are_cached(tmp_path, pdf_path, workers):
+    extractor = PdfExtractor(str(tmp_path / 'text_cache'), workers)
+    try:
+        pages, title = extractor.open(pdf_path)
+        assert first_lines(pages) == EXPECTED
+        assert extractor.get_stats()['pages_extracted'] == 6
+        pages, title = extractor.open(pdf_path)
+        assert first_lines(pages) == EXPECTED
+        assert extractor.get_stats()['cache_hits'] == 1
+    finally:
+        extractor.close()
+
+
+class CountingPool:
+    """Pool wrapper recording how many pages have been handed to workers"""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.submitted = 0
+
+    def apply_async(self, fn, args):
+        self.submitted += 1
+        return self.pool.apply_async(fn, args)
+
+
+def test_workers_only_run_a_few_pages_ahead(tmp_path, pdf_path):
+    extractor = PdfExtractor(str(tmp_path / 'text_cache'), workers=2)
+    pool = CountingPool(extractor.get_pool())
+    extractor.get_pool = lambda: pool
+    try:
+        pages, _ = extractor.open(pdf_path)
+        next(pages)
+        assert pool.submitted == 4
+        next(pages)
+        assert pool.submitted == 5
+        pages.close()
+    finally:
+        extractor.close()
+
+
+def test_replay_opens_the_cache_lazily_and_survives_eviction(tmp_path, pdf_path):
+    extractor = PdfExtractor(str(tmp_path / 'text_cache'), workers=1)
+    pages, _ = extractor.open(pdf_path)
+    list(pages)
+    pages, _ = extractor.open(pdf_path)
+    # Evicted after open() but before the first page was read
+    for name in os.listdir(extractor.cache.directory):
+        if name.endswith('.jsonl'):
+            os.remove(os.path.join(extractor.cache.directory, name))
+    assert first_lines(pages) == EXPECTED
@@ -0,0 +1,55 @@
+import threading
+import time
+
+from session_store import SessionStore
+
+
+def test_changes_are_merged_into_the_state(tmp_path):
+    store = SessionStore(str(tmp_path / 'sessions.db'))
+    assert store.get('listener') == {}
+    store.update('listener', title='A', speed=1.0)
+    assert store.update('listener', speed=2.0) == {'title': 'A', 'speed': 2.0}
+    assert store.get('listener') == {'title': 'A', 'speed': 2.0}
+    assert store.count() == 1
+
+
+def test_other_connections_see_the_same_sessions(tmp_path):
+    path = str(tmp_path / 'sessions.db')
+    # As another worker process would
+    first, second = SessionStore(path), SessionStore(path)
+    first.update('listener', title='A')
+    assert second.get('listener') == {'title': 'A'}
+    second.update('listener', position=12.5)
+    assert first.get('listener') == {'title': 'A', 'position': 12.5}
+
+
+def test_expect_only_writes_when_the_state_still_matches(tmp_path):
+    store = SessionStore(str(tmp_path / 'sessions.db'))
+    store.update('listener', job_id='new')
+    assert store.update('listener', expect={'job_id': 'old'}, title='Stale') is None
+    assert store.update('listener', expect={'job_id': 'new'}, title='Fresh') == {'job_id': 'new', 'title': 'Fresh'}
+
+
+def test_idle_sessions_expire(tmp_path):
+    store = SessionStore(str(tmp_path / 'sessions.db'), ttl=0.2)
+    store.update('listener', title='A')
+    time.sleep(0.3)
+    assert store.get('listener') == {}
+    assert store.count() == 0
+    # An expired session starts over rather than picking its old state back up
+    assert store.update('listener', speed=2.0) == {'speed': 2.0}
+
+
+def test_concurrent_updates_are_not_lost(tmp_path):
+    store = SessionStore(str(tmp_path / 'sessions.db'))
+
+    def update(field):
+        for number in range(50):
+            store.update('listener', **{field: number})
+
+    threads = [threading.Thread(target=update, args=(f'field_{index}',)) for index in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert store.get('listener') == {f'field_{index}': 49 for index in range(4)}
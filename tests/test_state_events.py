@@ -0,0 +1,44 @@
+import json
+import threading
+
+from state_events import StateEvents
+
+
+def test_listener_gets_the_state_then_each_change():
+    events = StateEvents(heartbeat=5, min_interval=0)
+    state = {'position': 0}
+    stream = events.iter_events('listener', lambda sid: dict(state))
+    assert next(stream).startswith('retry:')
+    assert json.loads(next(stream)[6:]) == {'position': 0}
+
+    def change():
+        state['position'] = 3
+        events.notify(['someone else', 'listener'])
+
+    threading.Timer(0.05, change).start()
+    assert json.loads(next(stream)[6:]) == {'position': 3}
+    assert events.get_stats()['events'] == 2
+    stream.close()
+    assert events.get_stats() == {'listeners': 0, 'sessions': 0, 'events': 2, 'heartbeats': 0}
+
+
+def test_idle_listener_gets_heartbeats_and_unchanged_state_is_not_resent():
+    events = StateEvents(heartbeat=0.01, min_interval=0)
+    stream = events.iter_events('listener', lambda sid: {'position': 0})
+    next(stream), next(stream)
+    assert next(stream) == ': heartbeat\n\n'
+    assert next(stream) == ': heartbeat\n\n'
+    assert events.get_stats()['heartbeats'] == 2
+    stream.close()
+
+
+def test_listeners_of_one_session_share_its_entry():
+    events = StateEvents(heartbeat=5, min_interval=0)
+    first = events.iter_events('listener', lambda sid: {})
+    second = events.iter_events('listener', lambda sid: {})
+    next(first), next(second)
+    assert (events.get_stats()['listeners'], events.get_stats()['sessions']) == (2, 1)
+    first.close()
+    assert (events.get_stats()['listeners'], events.get_stats()['sessions']) == (1, 1)
+    second.close()
+    assert events.get_stats()['sessions'] == 0
@@ -0,0 +1,58 @@
+import struct
+import threading
+import time
+
+from streaming import WAV_HEADER_SIZE, AudioStream, streaming_wav_header
+
+PARAMS = (1, 2, 8000)
+
+
+def test_header_describes_pcm_of_unknown_length():
+    header = streaming_wav_header(1, 2, 8000)
+    assert len(header) == WAV_HEADER_SIZE
+    assert header[:4] == b'RIFF' and header[8:16] == b'WAVEfmt '
+    assert struct.unpack('<HHIIHH', header[20:36]) == (1, 1, 8000, 16000, 2, 16)
+    assert header[36:40] == b'data'
+
+
+def test_readers_get_audio_as_it_is_written(tmp_path):
+    stream = AudioStream('s', str(tmp_path / 'audio.wav'))
+    received = []
+
+    def read():
+        for block in stream.iter_wav(block_size=1000, timeout=5):
+            received.append(block)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    stream.write(PARAMS, b'\1\0' * 800)
+    # The first chunk arrives while the render is still going
+    deadline = time.time() + 5
+    while sum(map(len, received)) < WAV_HEADER_SIZE + 1600:
+        assert time.time() < deadline
+        time.sleep(0.01)
+    stream.write(PARAMS, b'\2\0' * 400)
+    stream.close()
+    reader.join(5)
+    data = b''.join(received)
+    assert data[:WAV_HEADER_SIZE] == streaming_wav_header(*PARAMS)
+    assert data[WAV_HEADER_SIZE:] == b'\1\0' * 800 + b'\2\0' * 400
+
+
+def test_boundaries_follow_chunks_not_blocks(tmp_path):
+    stream = AudioStream('s', str(tmp_path / 'audio.wav'))
+    stream.write(PARAMS, b'\0\0' * 800)
+    stream.write(PARAMS, b'\0\0' * 800, new_chunk=False)
+    stream.write(PARAMS, b'\0\0' * 400)
+    stream.close()
+    assert [(chunk['start'], chunk['end']) for chunk in stream.boundaries] == [(0, 0.2), (0.2, 0.25)]
+    state = stream.get_state()
+    assert state['complete'] and state['duration'] == 0.25 and state['error'] is None
+    assert state['time_to_first_audio'] is not None
+
+
+def test_a_failed_render_ends_its_readers(tmp_path):
+    stream = AudioStream('s', str(tmp_path / 'audio.wav'))
+    stream.close(RuntimeError('engine died'))
+    assert list(stream.iter_wav(timeout=5)) == []
+    assert stream.get_state()['error'] == 'engine died'
@@ -0,0 +1,111 @@
+import os
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture
+def tts(tmp_path, monkeypatch):
+    # The app and its temp_audio directory are made in the working directory
+    monkeypatch.chdir(tmp_path)
+    import text_to_speech
+    tts = text_to_speech.TextToSpeech(workers=1)
+    yield tts
+    tts.jobs.executor.shutdown(wait=False)
+    tts.cleanup()
+
+
+def wait(job, timeout=5):
+    deadline = time.time() + timeout
+    while job.state not in ('done', 'error'):
+        assert time.time() < deadline, f"job still {job.state}"
+        time.sleep(0.01)
+    return job
+
+
+def test_earlier_job_does_not_overwrite_a_newer_document(tts):
+    release = threading.Event()
+
+    def convert(job, extract, source, type_, upload_path=None):
+        title = extract(source)
+        if title == 'A':
+            release.wait(5)
+        tts._publish(job, title=title, audio_path=f'/audio/{title}.wav')
+        return title
+
+    tts.convert = convert
+    slow = tts.submit_conversion('listener', 'url', lambda source: source, 'A', 'Web Article')
+    fast = wait(tts.submit_conversion('listener', 'url', lambda source: source, 'B', 'Web Article'))
+    assert tts.sessions.get('listener')['title'] == 'B'
+    release.set()
+    wait(slow)
+    state = tts.sessions.get('listener')
+    assert (state['title'], state['audio_path'], state['job_id']) == ('B', '/audio/B.wav', fast.id)
+    assert 'listener' not in slow.followers
+
+
+def test_identical_request_catches_up_on_the_shared_job(tts):
+    release = threading.Event()
+
+    def convert(job, extract, source, type_, upload_path=None):
+        tts._publish(job, title=extract(source))
+        release.wait(5)
+        return source
+
+    tts.convert = convert
+    first = tts.submit_conversion('one', 'url', lambda source: source, 'A', 'Web Article')
+    while not first.shared_state:
+        time.sleep(0.01)
+    second = tts.submit_conversion('two', 'url', lambda source: source, 'A', 'Web Article')
+    release.set()
+    wait(first)
+    assert second is first
+    assert tts.sessions.get('two')['title'] == 'A'
+
+
+class FakePool:
+    """Renders each piece as a second of silence"""
+
+    def render(self, pieces, scratch_dir=None, lead_chars=None):
+        for piece in pieces:
+            yield len(piece), (1, 2, 8000), b'\0\0' * 8000
+
+
+def test_finished_render_hands_the_session_over_to_the_cached_file(tts):
+    tts.workers = 2
+    tts.get_synthesis_pool = FakePool
+    job = wait(tts.submit_conversion('listener', 'url', lambda source: (source, 'Title'), 'Some text.', 'Web Article'))
+    assert job.state == 'done', job.error
+    state = tts.sessions.get('listener')
+    assert state['audio_path'].startswith('/audio/cache/') and state['stream_id'] is None
+    # Still playable once this process has forgotten the stream
+    tts.streams.clear()
+    assert tts.resolve_audio_file(state['audio_path']) == tts.audio_cache.get(tts.cache_key('Some text.'))
+
+
+class FakeBackend:
+    """Speaks every character as a millisecond of silence, streamed a word at a time"""
+
+    name = 'fake'
+
+    def stream(self, text, scratch_dir=None):
+        for word in text.split(' '):
+            yield (1, 2, 8000), b'\0\0' * 8 * (len(word) + 1)
+
+    def close(self):
+        pass
+
+
+def test_one_worker_renders_in_process_with_the_configured_backend(tts):
+    tts.backend = FakeBackend()
+    tts.lead_chars = 20
+    text = 'A first sentence that is long enough. And then a second one.'
+    job = wait(tts.submit_conversion('listener', 'url', lambda source: (source, 'Title'), text, 'Web Article'))
+    assert job.state == 'done', job.error
+    assert tts.synthesis_pool is None
+    path = tts.resolve_audio_file(tts.sessions.get('listener')['audio_path'])
+    assert os.path.getsize(path) == 44 + 2 * 8 * (len(text) + 1)
+    # One boundary per chunk, however many blocks it streamed in
+    stream, = tts.streams.values()
+    assert [round(chunk['end'], 3) for chunk in stream.boundaries] == [0.017, 0.061]
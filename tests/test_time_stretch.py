@@ -0,0 +1,70 @@
+import wave
+
+import numpy as np
+import pytest
+
+from time_stretch import TimeStretcher, stretch_wav, time_stretch
+
+SAMPLE_RATE = 16000
+
+
+def sine(seconds, frequency=440.0):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (8000 * np.sin(2 * np.pi * frequency * t)).astype(np.int16)
+
+
+def peak_frequency(samples):
+    spectrum = np.abs(np.fft.rfft(samples.astype(np.float32)))
+    return np.argmax(spectrum) * SAMPLE_RATE / len(samples)
+
+
+def write_wav(path, samples, channels=1):
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(samples.tobytes())
+
+
+@pytest.mark.parametrize('rate', [0.5, 1.5, 2.0, 4.0])
+def test_length_scales_and_pitch_is_kept(rate):
+    samples = sine(2.0)
+    stretched = time_stretch(samples, rate, SAMPLE_RATE)
+    assert len(stretched) == round(len(samples) / rate)
+    assert abs(peak_frequency(stretched) - 440) < 5
+
+
+def test_normal_speed_is_an_unchanged_copy():
+    samples = sine(0.5)
+    stretched = time_stretch(samples, 1.0, SAMPLE_RATE)
+    assert stretched is not samples and np.array_equal(stretched, samples)
+
+
+def test_rates_outside_the_range_are_rejected():
+    with pytest.raises(ValueError):
+        TimeStretcher(0.25)
+    with pytest.raises(ValueError):
+        TimeStretcher(8.0)
+
+
+def test_feeding_in_pieces_gives_the_same_output():
+    samples = sine(2.0, 300)
+    stretcher = TimeStretcher(1.5, SAMPLE_RATE)
+    pieces = [stretcher.process(samples[start:start + 3001]) for start in range(0, len(samples), 3001)]
+    pieces.append(stretcher.flush())
+    assert np.array_equal(np.concatenate(pieces), time_stretch(samples, 1.5, SAMPLE_RATE))
+
+
+def test_stretch_wav_writes_a_shorter_copy(tmp_path):
+    samples = sine(3.0)
+    write_wav(tmp_path / 'in.wav', samples)
+    stretch_wav(str(tmp_path / 'in.wav'), str(tmp_path / 'out.wav'), 2.0, block_seconds=1)
+    with wave.open(str(tmp_path / 'out.wav'), 'rb') as out:
+        assert (out.getnchannels(), out.getsampwidth(), out.getframerate()) == (1, 2, SAMPLE_RATE)
+        assert out.getnframes() == len(samples) // 2
+
+
+def test_stretch_wav_rejects_stereo(tmp_path):
+    write_wav(tmp_path / 'in.wav', sine(0.5).repeat(2), channels=2)
+    with pytest.raises(ValueError):
+        stretch_wav(str(tmp_path / 'in.wav'), str(tmp_path / 'out.wav'), 2.0)
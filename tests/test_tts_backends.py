@@ -0,0 +1,86 @@
+import ctypes.util
+
+import pytest
+
+import tts_backends
+from tts_backends import BackendUnavailable, EspeakBackend, create_backend
+
+# Speaks the worker protocol, answering each text with two bytes of PCM per character, a word per block
+FAKE_WORKER = '''
+import struct, sys
+out, requests = sys.stdout.buffer, sys.stdin.buffer
+out.write(struct.pack('<I', {sample_rate}))
+out.flush()
+if not {sample_rate}:
+    sys.exit(1)
+while True:
+    header = requests.read(4)
+    if len(header) < 4:
+        break
+    text = requests.read(struct.unpack('<I', header)[0]).decode('utf-8')
+    for word in text.split():
+        out.write(struct.pack('<I', 2 * len(word)) + b'\\1\\0' * len(word))
+    out.write(struct.pack('<I', 0))
+    out.flush()
+'''
+
+
+@pytest.fixture
+def fake_worker(tmp_path, monkeypatch):
+    def install(sample_rate=22050):
+        path = tmp_path / 'worker.py'
+        path.write_text(FAKE_WORKER.format(sample_rate=sample_rate))
+        monkeypatch.setattr(tts_backends, 'ESPEAK_WORKER', str(path))
+    return install
+
+
+def test_espeak_streams_blocks_from_one_long_lived_worker(fake_worker):
+    fake_worker()
+    backend = EspeakBackend()
+    try:
+        pid = backend.process.pid
+        assert list(backend.stream('two words')) == [((1, 2, 22050), b'\1\0' * 3), ((1, 2, 22050), b'\1\0' * 5)]
+        assert backend.synthesize('and three more') == ((1, 2, 22050), b'\1\0' * 12)
+        assert backend.process.pid == pid
+    finally:
+        backend.close()
+    assert backend.process.poll() == 0
+
+
+def test_abandoned_stream_restarts_the_worker(fake_worker):
+    fake_worker()
+    backend = EspeakBackend()
+    try:
+        stream = backend.stream('one two three')
+        next(stream)
+        stream.close()
+        # The rest of that reply must not be read as the next one
+        assert backend.synthesize('four') == ((1, 2, 22050), b'\1\0' * 4)
+    finally:
+        backend.close()
+
+
+def test_worker_without_an_engine_is_unavailable(fake_worker):
+    fake_worker(sample_rate=0)
+    with pytest.raises(BackendUnavailable):
+        EspeakBackend()
+
+
+@pytest.mark.skipif(ctypes.util.find_library('espeak-ng') is not None, reason="libespeak-ng is installed")
+def test_real_worker_reports_a_missing_library():
+    with pytest.raises(BackendUnavailable):
+        EspeakBackend()
+
+
+def test_auto_falls_back_when_espeak_is_unavailable(fake_worker, monkeypatch):
+    class Fallback:
+        def __init__(self, rate, volume, voice_id):
+            self.rate = rate
+
+    fake_worker(sample_rate=0)
+    monkeypatch.setitem(tts_backends.BACKENDS, 'pyttsx3', Fallback)
+    assert create_backend('auto', rate=120).rate == 120
+    with pytest.raises(BackendUnavailable):
+        create_backend('espeak')
+    with pytest.raises(ValueError):
+        create_backend('festival')
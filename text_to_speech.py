@@ -1,30 +1,86 @@
-import pyttsx3
-import PyPDF2
-import ebooklib
-from ebooklib import epub
-from bs4 import BeautifulSoup
-import requests
+from http_fetch import get_fetcher
 import os
-import json
-from flask import Flask, request, render_template_string, jsonify, session, send_file, redirect, url_for
+import uuid
+import shutil
+import asyncio
+from flask import Flask, Response, request, render_template_string, jsonify, session, redirect
+from werkzeug.security import safe_join
 from threading import Thread, Lock
 import time
-from audio_player import AudioPlayer
+from functools import partial
+from parallel_synthesis import ChunkWriter, SynthesisPool, render_serially
+from streaming import AudioStream
+from audio_cache import DEFAULT_MAX_BYTES, AudioCache, file_digest
+from job_queue import JobQueue, QueueFullError
+from session_store import SessionStore
+from state_events import StateEvents
+from time_stretch import MIN_RATE, MAX_RATE, stretch_wav
+from audio_http import send_audio
+from audio_encoder import DEFAULT_BITRATE, ParallelMp3Encoder
+from hls import HlsLadder, MASTER_NAME, is_complete, last_written
+from pcm_file import read_wav_header
+from pdf_extractor import PdfExtractor
+from extractors import extract_article
+from extraction_cache import get_extraction_cache
+from bulk_ingest import BulkIngest
+from epub_index import EpubIndex
+from tts_backends import create_backend
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-here'
 
 class TextToSpeech:
-    def __init__(self):
-        self.engine = None
-        self.current_text = ""
-        self.current_title = ""
-        self.current_type = ""
-        self.current_audio_path = None
-        self.temp_dir = os.path.join(os.getcwd(), 'temp_audio')
+    def __init__(self, workers=None, cache_bytes=None, job_workers=2, session_ttl=3600, backend=None, temp_dir=None):
+        # Speech engine: 'espeak', 'pyttsx3' or 'auto' to use espeak-ng when it is installed
+        self.backend_name = backend or os.environ.get('TTS_BACKEND', 'auto')
+        self.backend = None
+        self.rate = 150  # Default speed
+        self.volume = 0.9
+        self.voice_id = None
+        # Number of synthesis worker processes; 1 renders in-process
+        self.workers = workers or os.cpu_count() or 1
+        self.synthesis_pool = None
+        self.pool_lock = Lock()
+        # Size of the first streamed chunk, kept small so playback starts quickly
+        self.lead_chars = 200
+        # MP3 exports: bitrate, and whether to encode one alongside every render so it is ready when synthesis ends
+        self.mp3_bitrate = DEFAULT_BITRATE
+        self.encode_while_rendering = False
+        # Also write renders as HLS segments behind a growing playlist, for progressive playback and cheap seeks,
+        # at each of these bitrates; hls.LADDER lets players on slow connections drop to a lower one
+        self.hls_output = False
+        self.hls_bitrates = [DEFAULT_BITRATE]
+        self.streams = {}
+        # Bulk URL ingestion batches by id
+        self.batches = {}
+        # Guards each job's followers and the state published to them
+        self.followers_lock = Lock()
+        # Conversions run off the request thread on a bounded pool
+        self.jobs = JobQueue(job_workers)
+        # Player state pushed to open /events streams as it changes
+        self.events = StateEvents()
+        self.jobs.on_change = self._job_changed
+        # Renders, caches and session state all live under here
+        self.temp_dir = temp_dir or os.path.join(os.getcwd(), 'temp_audio')
         
         if not os.path.exists(self.temp_dir):
             os.makedirs(self.temp_dir)
+        # Segmented copies of cached renders, one directory per cache key
+        self.hls_dir = os.path.join(self.temp_dir, 'hls')
+        # Rendered audio keyed by text and voice settings, so repeat documents skip synthesis;
+        # TTS_CACHE_BYTES sizes it per deployment, since one long book can run to gigabytes
+        cache_bytes = cache_bytes or int(os.environ.get('TTS_CACHE_BYTES', DEFAULT_MAX_BYTES))
+        self.audio_cache = AudioCache(os.path.join(self.temp_dir, 'cache'), cache_bytes)
+        self.session_ttl = session_ttl
+        # sid -> (cache keys leased for its player, when the lease was taken)
+        self.session_leases = {}
+        # Player state per listener, shared between worker processes
+        state_dir = os.path.join(self.temp_dir, 'state')
+        if not os.path.exists(state_dir):
+            os.makedirs(state_dir)
+        self.sessions = SessionStore(os.path.join(state_dir, 'sessions.db'), session_ttl)
+        # Extracted PDF text keyed by the upload's hash, so re-uploads skip extraction
+        self.pdf_extractor = PdfExtractor(os.path.join(self.temp_dir, 'text_cache'), self.workers)
         try:
             self.init_engine()
         except Exception as e:
@@ -32,58 +88,524 @@ class TextToSpeech:
 
     def init_engine(self):
         try:
-            if self.engine:
-                try:
-                    self.engine.stop()
-                except:
-                    pass
-            self.engine = pyttsx3.init()
-            self.setup_voice()
+            if self.backend:
+                self.backend.close()
+            self.backend = create_backend(self.backend_name, self.rate, self.volume, self.voice_id)
+            self.voice_id = self.backend.voice_id
         except Exception as e:
             print(f"Error initializing engine: {str(e)}")
 
-    def setup_voice(self):
+    @property
+    def voice(self):
+        """Backend and voice together, since both decide how rendered audio sounds"""
+        return f'{self.backend.name}:{self.voice_id}' if self.backend else self.voice_id
+
+    def get_synthesis_pool(self):
+        """Start the synthesis worker pool on first use"""
+        with self.pool_lock:
+            if self.synthesis_pool is None:
+                self.synthesis_pool = SynthesisPool(self.workers, self.rate, self.volume, self.voice_id,
+                                                    backend=self.backend.name if self.backend else self.backend_name)
+            return self.synthesis_pool
+
+    def _render(self, pieces):
+        """Render text pieces lead chunk first, on the worker pool or, with one worker, in this process"""
+        if self.workers > 1:
+            return self.get_synthesis_pool().render(pieces, self.temp_dir, self.lead_chars)
+        # No process to spawn, and the configured backend is used as it is
+        if self.backend is None:
+            raise ValueError("No speech engine is available")
+        return render_serially(self.backend, pieces, self.temp_dir, self.lead_chars)
+
+    def cache_key(self, text):
+        """Cache key for text rendered with the current voice settings"""
+        return AudioCache.make_key(text, self.voice, self.rate, self.volume, 'wav')
+
+    def file_cache_key(self, path):
+        """Cache key for a document file rendered with the current voice settings"""
+        return AudioCache.derive_key(file_digest(path), self.voice, self.rate, self.volume, 'wav')
+
+    def audio_url(self, path):
+        """URL under /audio for a file inside the temp directory"""
+        return '/audio/' + os.path.relpath(path, self.temp_dir).replace(os.sep, '/')
+
+    def generate_audio_file(self, text, title, type_, sid):
+        """Generate audio file for a session, returning whether it succeeded"""
         try:
-            self.engine.setProperty('rate', 150)  # Default speed
-            self.engine.setProperty('volume', 0.9)
-            voices = self.engine.getProperty('voices')
-            if voices:
-                self.engine.setProperty('voice', voices[0].id)
-        except Exception as e:
-            print(f"Error setting up voice: {str(e)}")
-
-    def generate_audio_file(self, text, title, type_):
-        """Generate audio file and return its duration"""
-        try:
-            # Generate unique filename
-            timestamp = int(time.time())
-            wav_path = os.path.join(self.temp_dir, f'audio_{timestamp}.wav')
-            
-            # Generate WAV file
-            self.engine.save_to_file(text, wav_path)
-            self.engine.runAndWait()
+            key = self.cache_key(text)
+            cached_path = self.audio_cache.get(key)
+            if not cached_path:
+                # Generate unique filename
+                wav_path = os.path.join(self.temp_dir, f'audio_{uuid.uuid4().hex}.wav')
+                
+                # Generate WAV file, chunked across the worker pool when there is more than one worker
+                if self.workers > 1:
+                    self.get_synthesis_pool().synthesize(text, wav_path, self.temp_dir)
+                else:
+                    writer = ChunkWriter(wav_path)
+                    try:
+                        for characters, params, frames in render_serially(self.backend, [text], self.temp_dir):
+                            writer.write(params, frames, new_chunk=characters > 0)
+                    finally:
+                        writer.close()
+                cached_path = self.audio_cache.put(key, wav_path)
             
             # Store current audio info
-            self.current_audio_path = f'/audio/audio_{timestamp}.wav'
-            self.current_text = text
-            self.current_title = title
-            self.current_type = type_
-            
+            self.sessions.update(
+                sid,
+                title=title,
+                type=type_,
+                audio_path=self.audio_url(cached_path),
+                base_audio_path=None,
+                speed=1.0,
+                stream_id=None,
+                hls_path=None,
+                stretched_hls_path=None,
+                job_id=None,
+                chapters=[]
+            )
+            self.events.notify([sid])
             return True
         except Exception as e:
             print(f"Error generating audio: {str(e)}")
             return False
 
-    def get_state(self):
-        """Get the current player state"""
+    def start_stream(self, key):
+        """Find the audio for a cache key, returning (stream, audio path).
+
+        The stream is None when the audio is already cached; otherwise the
+        caller renders into it with render_stream.
+        """
+        cached_path = self.audio_cache.get(key)
+        if cached_path:
+            return None, self.audio_url(cached_path)
+
+        self._prune_streams()
+        self._prune_hls()
+        stream_id = uuid.uuid4().hex
+        stream = AudioStream(stream_id, os.path.join(self.temp_dir, f'audio_{stream_id}.wav'))
+        stream.cache_key = key
+        self.streams[stream_id] = stream
+        return stream, f'/stream/{stream_id}'
+
+    def _prune_streams(self, max_age=3600):
+        """Forget streams that finished long enough ago that nobody is still reading them"""
+        cutoff = time.time() - max_age
+        for stream_id, stream in list(self.streams.items()):
+            if stream.finished_at and stream.finished_at < cutoff:
+                del self.streams[stream_id]
+
+    def render_stream(self, stream, pieces, job=None, size=None):
+        """Render text pieces into a stream, lead chunk first, then file it in the cache.
+
+        When the total size of the text is known, job progress follows the
+        characters rendered.
+        """
+        error = None
+        rendered = 0
+        encoder = None
+        segmenter = None
+        try:
+            for characters, params, frames in self._render(pieces):
+                # A backend streaming in-process hands over a chunk in several blocks
+                stream.write(params, frames, new_chunk=characters > 0)
+                if self.encode_while_rendering:
+                    if encoder is None:
+                        encoder = self._mp3_encoder(params)
+                    encoder.write(frames)
+                if self.hls_output:
+                    if segmenter is None:
+                        segmenter = self._hls_segmenter(stream.cache_key, params, job)
+                    segmenter.write(frames)
+                rendered += characters
+                if job and size:
+                    job.set_progress(10 + 85 * rendered / size)
+                elif job:
+                    # No total to measure progress against, but listeners still see the stream grow
+                    self._job_changed(job)
+            if stream.params is None:
+                raise ValueError("No text to synthesize")
+            if job:
+                job.set_stage('encoding')
+            # Readers open the file under the stream's lock, so moving it there is safe
+            with stream.condition:
+                stream.path = self.audio_cache.put(stream.cache_key, stream.path)
+            if encoder:
+                self.audio_cache.put(self.mp3_key(stream.cache_key), encoder.close(), 'mp3')
+            if segmenter:
+                segmenter.close()
+        except Exception as e:
+            error = e
+            if encoder:
+                encoder.abort()
+            if segmenter:
+                segmenter.abort()
+            raise
+        finally:
+            stream.close(error)
+
+    def mp3_key(self, key):
+        """Cache key of the MP3 export of a cached render"""
+        return AudioCache.derive_key(key, 'mp3', self.mp3_bitrate)
+
+    def _mp3_encoder(self, params):
+        """Parallel MP3 encoder writing to a scratch file for the cache"""
+        return ParallelMp3Encoder(os.path.join(self.temp_dir, f'export_{uuid.uuid4().hex}.mp3'), params,
+                                  self.mp3_bitrate, self.workers)
+
+    def export_mp3(self, job, wav_path, key):
+        """Export job: encode a cached render to MP3 in parallel chunks and file it under key, returning its URL"""
+        cached_path = self.audio_cache.get(key)
+        if cached_path:
+            return self.audio_url(cached_path)
+        job.set_stage('encoding', 0)
+        channels, sample_rate, sample_width, _, _ = read_wav_header(wav_path)
+        with self.audio_cache.pinned(os.path.splitext(os.path.basename(wav_path))[0]):
+            mp3_path = self._encode_wav(job, wav_path, self._mp3_encoder((channels, sample_width, sample_rate)))
+        return self.audio_url(self.audio_cache.put(key, mp3_path, 'mp3'))
+
+    def _encode_wav(self, job, wav_path, encoder):
+        """Feed a WAV file's PCM through an encoder, reporting any job's progress, and return what close() gives"""
+        _, _, _, data_offset, data_size = read_wav_header(wav_path)
+        try:
+            with open(wav_path, 'rb') as wav_file:
+                wav_file.seek(data_offset)
+                remaining = data_size
+                while remaining > 0:
+                    frames = wav_file.read(min(1024 * 1024, remaining))
+                    if not frames:
+                        break
+                    encoder.write(frames)
+                    remaining -= len(frames)
+                    if job:
+                        job.set_progress(95 * (data_size - remaining) / data_size)
+            return encoder.close()
+        except BaseException:
+            encoder.abort()
+            raise
+
+    def hls_path(self, key, render_id):
+        """URL of the HLS master playlist of one segmentation of a cache key"""
+        return f'/hls/{key}/{render_id}/{MASTER_NAME}'
+
+    def _finished_hls(self, key):
+        """Id of a finished segmentation of a cache key, or None"""
+        directory = os.path.join(self.hls_dir, key)
+        try:
+            render_ids = sorted(os.listdir(directory))
+        except OSError:
+            return None
+        for render_id in render_ids:
+            if is_complete(os.path.join(directory, render_id), self.hls_bitrates):
+                return render_id
+        return None
+
+    def _hls_segmenter(self, key, params, job=None):
+        """Segmenter for every rendition of a render, publishing its playlist to the job's followers once it exists.
+
+        Each segmentation gets a directory of its own under the key's, so
+        two renders of the same text at once, in this process or another,
+        never write or delete each other's files. Players keep the URL they
+        were given for as long as they play, which is why a finished
+        segmentation stays where it was written rather than being moved.
+        """
+        render_id = uuid.uuid4().hex
+        segmenter = HlsLadder(os.path.join(self.hls_dir, key, render_id), params, self.hls_bitrates, self.workers)
+        if job:
+            self._publish(job, hls_path=self.hls_path(key, render_id))
+        return segmenter
+
+    def segment_cached(self, job, key, wav_path):
+        """Write HLS segments for a cached render that doesn't have them yet, returning the master playlist's URL"""
+        render_id = self._finished_hls(key)
+        if render_id:
+            if job:
+                self._publish(job, hls_path=self.hls_path(key, render_id))
+            return self.hls_path(key, render_id)
+        channels, sample_rate, sample_width, _, _ = read_wav_header(wav_path)
+        with self.audio_cache.pinned(key):
+            segmenter = self._hls_segmenter(key, (channels, sample_width, sample_rate), job)
+            self._encode_wav(job, wav_path, segmenter)
+        return self.hls_path(key, os.path.basename(segmenter.directory))
+
+    def _prune_hls(self, max_age=3600):
+        """Delete segments whose render has left the cache, abandoned partial ones, and old duplicates"""
+        if not os.path.exists(self.hls_dir):
+            return
+        cutoff = time.time() - max_age
+        for key in os.listdir(self.hls_dir):
+            directory = os.path.join(self.hls_dir, key)
+            cached = key in self.audio_cache
+            # Renders of the same text that ran at once each leave a finished copy; one is enough
+            keep = self._finished_hls(key) if cached else None
+            try:
+                for render_id in os.listdir(directory):
+                    render_dir = os.path.join(directory, render_id)
+                    if render_id == keep:
+                        continue
+                    # A render in progress isn't cached yet, but its playlists are fresh
+                    if (not cached and is_complete(render_dir, self.hls_bitrates)) or last_written(render_dir) < cutoff:
+                        shutil.rmtree(render_dir)
+                # Only goes once every segmentation of the key has
+                os.rmdir(directory)
+            except OSError:
+                pass
+
+    def submit_export(self, sid):
+        """Queue an MP3 export of the session's audio at normal speed"""
+        state = self.sessions.get(sid)
+        wav_path = self.resolve_audio_file(state.get('base_audio_path') or state.get('audio_path'))
+        if not wav_path or not os.path.exists(wav_path):
+            raise ValueError("Audio is not ready yet")
+        # Keyed like the MP3 a render encodes alongside itself, so both name the same cache entry
+        key = self.mp3_key(os.path.splitext(os.path.basename(wav_path))[0])
+        job, _ = self.jobs.submit_once(key, 'export', self.export_mp3, wav_path, key)
+        return job
+
+    def _track_pages(self, pages, job):
+        """Pass page text through to synthesis, reporting job progress by page"""
+        for number, page_count, text in pages:
+            job.set_progress(10 + 85 * (number - 1) / page_count)
+            yield text
+
+    def convert(self, job, extract, source, type_, upload_path=None):
+        """Conversion job: extract text from source, then synthesize it into a stream.
+
+        extract returns (text, title), where text is either a string or, for
+        documents read page by page, an iterable of (page number, page count,
+        text) that is consumed while synthesis runs. An iterable with a
+        chapters list has it shown in the player.
+        """
+        try:
+            text, title = extract(source)
+            if isinstance(text, str):
+                key = self.cache_key(text)
+                pieces, size = [text], len(text)
+            else:
+                # The full text isn't known until synthesis has read it, so key on the file
+                key = self.file_cache_key(upload_path or source)
+                pieces, size = self._track_pages(text, job), None
+            job.title = title
+            job.set_stage('synthesizing', 10)
+            stream, audio_path = self.start_stream(key)
+            self._publish(
+                job,
+                title=title,
+                type=type_,
+                audio_path=audio_path,
+                stream_id=stream.stream_id if stream else None,
+                chapters=getattr(text, 'chapters', [])
+            )
+            if stream:
+                self.render_stream(stream, pieces, job, size)
+                audio_path = self.audio_url(stream.path)
+                # The stream's URL only works in this process, and only until it is pruned
+                self._publish(job, audio_path=audio_path, stream_id=None)
+            elif self.hls_output:
+                job.set_stage('encoding', 0)
+                self.segment_cached(job, key, self.resolve_audio_file(audio_path))
+            return audio_path
+        finally:
+            # Uploaded files are only needed until their text has been read
+            if upload_path and os.path.exists(upload_path):
+                os.remove(upload_path)
+
+    def extract_from_url(self, url):
+        """Get an article's text and title from a webpage, using the extractor for its site"""
+        text, title = extract_article(url)
+        return text, title or 'Web Article'
+
+    def extract_from_epub(self, epub_path):
+        """Index an EPUB's chapters, whose text is extracted as synthesis reaches them, and get its title"""
+        book = EpubIndex(epub_path)
+        if not book.chapters:
+            raise ValueError("EPUB has no readable chapters")
+        start = 0
+        for chapter, seconds in zip(book.chapters, book.estimate_seconds(self.rate)):
+            chapter['estimated_start'] = start
+            chapter['estimated_seconds'] = seconds
+            start += seconds
+        return book, book.title or 'EPUB Document'
+
+    def extract_from_pdf(self, pdf_path):
+        """Get a PDF's pages as a generator that extracts them as synthesis consumes them, and its title"""
+        pages, title = self.pdf_extractor.open(pdf_path)
+        return pages, title or 'PDF Document'
+
+    def render_article(self, job, text, title):
+        """Bulk job: synthesize already extracted text into the cache"""
+        job.title = title
+        job.set_stage('synthesizing', 10)
+        stream, audio_path = self.start_stream(self.cache_key(text))
+        if stream:
+            self.render_stream(stream, [text], job, len(text))
+            audio_path = self.audio_url(stream.path)
+        return audio_path
+
+    def submit_article(self, text, title):
+        """Queue synthesis of an article's text without attaching it to a player"""
+        # Bulk work only fills half the queue, so uploads from the player still get in
+        return self.jobs.submit('bulk', self.render_article, text, title, max_queued=self.jobs.max_queued // 2)
+
+    def start_bulk(self, urls):
+        """Ingest a list of article URLs in the background, returning the batch"""
+        self._prune_batches()
+        batch = BulkIngest(urls, self.submit_article)
+        if not batch.results:
+            raise ValueError("No URLs provided")
+        self.batches[batch.id] = batch
+        Thread(target=asyncio.run, args=(batch.run(),), daemon=True).start()
+        return batch
+
+    def _prune_batches(self, max_age=3600):
+        """Forget batches that finished more than max_age seconds ago"""
+        cutoff = time.time() - max_age
+        for batch_id, batch in list(self.batches.items()):
+            if batch.finished_at and batch.finished_at < cutoff:
+                del self.batches[batch_id]
+
+    def _publish(self, job, **changes):
+        """Update the player state of every session following a conversion.
+
+        A session that has since started another document no longer
+        follows this one, so a slower earlier job can't overwrite it.
+        """
+        with self.followers_lock:
+            job.shared_state.update(changes)
+            for sid in list(job.followers):
+                # Checked in the same transaction as the write, since the session may have moved on in another process
+                if self.sessions.update(sid, expect={'job_id': job.id}, **changes) is None:
+                    job.followers.discard(sid)
+            self.events.notify(job.followers)
+
+    def _job_changed(self, job):
+        """Tell the sessions following a job that its progress changed"""
+        with self.followers_lock:
+            self.events.notify(job.followers)
+
+    def conversion_key(self, kind, source, upload_path=None):
+        """Key for a conversion's source and voice settings, shared by identical requests"""
+        origin = file_digest(upload_path) if upload_path else source
+        return AudioCache.derive_key(origin, kind, self.voice, self.rate, self.volume)
+
+    def submit_conversion(self, sid, kind, extract, source, type_, upload_path=None, coalesce=True):
+        """Queue a conversion job and make it the one the session's player follows.
+
+        A request identical to a conversion still in flight attaches to that
+        job instead of fetching and synthesizing the same document again.
+        """
+        # Clear the previous document and leave its job first; a cached conversion can finish before submit returns
+        self.sessions.update(sid, title='', type=type_, audio_path=None, base_audio_path=None, speed=1.0,
+                             stream_id=None, hls_path=None, stretched_hls_path=None, job_id=None, chapters=[])
+        key = self.conversion_key(kind, source, upload_path) if coalesce else None
+        job, created = self.jobs.submit_once(key, kind, self.convert, extract, source, type_, upload_path)
+        if not created and upload_path:
+            os.remove(upload_path)
+        with self.followers_lock:
+            job.followers.add(sid)
+            # Catch up on whatever the job has already published
+            self.sessions.update(sid, job_id=job.id, **job.shared_state)
+        self.events.notify([sid])
+        return job
+
+    def resolve_audio_file(self, audio_path):
+        """Path on disk of a finished render, or None while it is still streaming"""
+        if audio_path and audio_path.startswith('/stream/'):
+            stream = self.streams.get(audio_path[len('/stream/'):])
+            if not stream or not stream.complete or stream.error:
+                return None
+            return stream.path
+        if audio_path and audio_path.startswith('/audio/'):
+            return os.path.join(self.temp_dir, audio_path[len('/audio/'):])
+        return None
+
+    def set_speed(self, sid, speed, position=None):
+        """Switch a session to a time-stretched copy of its audio, keeping its place.
+
+        Copies are stretched from the 1x render and cached per speed, so a
+        speed change never re-runs synthesis. With HLS output on, the copy
+        is segmented too, so players keep adapting their bitrate.
+        """
+        state = self.sessions.get(sid)
+        base_path = self.resolve_audio_file(state.get('base_audio_path') or state.get('audio_path'))
+        if not base_path or not os.path.exists(base_path):
+            raise ValueError("Audio is not ready yet")
+
+        old_speed = state.get('speed', 1.0)
+        speed = max(MIN_RATE, min(MAX_RATE, speed))
+        if speed == 1.0:
+            stretched_path = base_path
+        else:
+            base_key = os.path.splitext(os.path.basename(base_path))[0]
+            key = AudioCache.derive_key(base_key, 'stretch', speed)
+            stretched_path = self.audio_cache.get(key)
+            if not stretched_path:
+                temp_path = os.path.join(self.temp_dir, f'stretch_{uuid.uuid4().hex}.wav')
+                with self.audio_cache.pinned(base_key):
+                    stretch_wav(base_path, temp_path, speed)
+                stretched_path = self.audio_cache.put(key, temp_path)
+
+        changes = {
+            'base_audio_path': self.audio_url(base_path),
+            'audio_path': self.audio_url(stretched_path),
+            'stretched_hls_path': None,
+            'speed': speed
+        }
+        if self.hls_output and speed != 1.0:
+            changes['stretched_hls_path'] = self.segment_cached(None, key, stretched_path)
+        if position is not None:
+            changes['position'] = float(position) * old_speed / speed
+        state = self.sessions.update(sid, **changes)
+        self.events.notify([sid])
+        return state
+
+    def _lease_audio(self, sid, state):
+        """Keep the cached files a session's player uses from being evicted while the session lasts"""
+        keys = set()
+        for audio_path in (state.get('base_audio_path'), state.get('audio_path')):
+            path = self.resolve_audio_file(audio_path)
+            if path and os.path.dirname(path) == self.audio_cache.directory:
+                keys.add(os.path.splitext(os.path.basename(path))[0])
+        now = time.time()
+        leased = self.session_leases.get(sid)
+        # State is read on every poll and event, so only renew when the files changed or a quarter of the lease is gone
+        if leased and leased[0] == keys and leased[1] > now - self.session_ttl / 4:
+            return
+        self.audio_cache.lease(sid, keys, self.session_ttl)
+        self.session_leases[sid] = (keys, now)
+        for other, (_, leased_at) in list(self.session_leases.items()):
+            if leased_at < now - self.session_ttl:
+                del self.session_leases[other]
+
+    def get_state(self, sid):
+        """Get a session's player state"""
+        state = self.sessions.get(sid)
+        self._lease_audio(sid, state)
+        # Streams and jobs live in the process that runs them
+        stream = self.streams.get(state.get('stream_id'))
+        job = self.jobs.get(state['job_id']) if state.get('job_id') else None
         return {
-            'current_title': self.current_title,
-            'current_type': self.current_type,
-            'current_audio_path': self.current_audio_path
+            'current_title': state.get('title', ''),
+            'current_type': state.get('type', ''),
+            'current_audio_path': state.get('audio_path'),
+            # The 1x render's segments come from its conversion, a stretched copy's from set_speed
+            'hls_path': state.get('hls_path') if state.get('speed', 1.0) == 1.0 else state.get('stretched_hls_path'),
+            'speed': state.get('speed', 1.0),
+            'position': state.get('position'),
+            'chunks': stream.boundaries if stream else [],
+            'chapters': state.get('chapters', []),
+            'stream': stream.get_state() if stream else None,
+            'job': job.to_dict() if job else None
         }
 
     def cleanup(self):
         """Clean up temporary files"""
+        if self.synthesis_pool:
+            self.synthesis_pool.close()
+            self.synthesis_pool = None
+        if self.backend:
+            self.backend.close()
+        self.pdf_extractor.close()
         try:
             if os.path.exists(self.temp_dir):
                 for file in os.listdir(self.temp_dir):
@@ -97,6 +619,12 @@ class TextToSpeech:
 # Create a global TTS instance
 tts = TextToSpeech()
 
+def get_session_id():
+    """Session id for the current listener, issued on first visit"""
+    if 'sid' not in session:
+        session['sid'] = uuid.uuid4().hex
+    return session['sid']
+
 @app.route('/')
 def home():
     return render_template_string("""
@@ -295,6 +823,7 @@ def player():
         <title>Audio Player</title>
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
         <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600&display=swap" rel="stylesheet">
+        <script src="https://cdn.jsdelivr.net/npm/hls.js@1"></script>
         <style>
             * {
                 margin: 0;
@@ -357,6 +886,29 @@ def player():
                 margin: 1rem 0;
             }
 
+            .status {
+                text-align: center;
+                color: rgba(255, 255, 255, 0.6);
+                min-height: 1.5rem;
+            }
+
+            .chapters {
+                list-style: none;
+                margin-top: 1rem;
+            }
+
+            .chapters li {
+                display: flex;
+                justify-content: space-between;
+                padding: 0.5rem 0;
+                border-bottom: 1px solid rgba(255, 255, 255, 0.1);
+                color: rgba(255, 255, 255, 0.8);
+            }
+
+            .chapters li span:last-child {
+                color: rgba(255, 255, 255, 0.5);
+            }
+
             .home-button {
                 position: fixed;
                 top: 2rem;
@@ -389,6 +941,7 @@ def player():
 
         <div class="container">
             <h1 id="title">Loading...</h1>
+            <p id="status" class="status"></p>
             
             <div class="player-section">
                 <audio id="audioPlayer" controls>
@@ -403,12 +956,45 @@ def player():
                     <button onclick="setSpeed(3.0)" class="speed-btn">3x</button>
                     <button onclick="setSpeed(4.0)" class="speed-btn">4x</button>
                 </div>
+
+                <ol id="chapters" class="chapters"></ol>
             </div>
         </div>
 
         <script>
             const audioPlayer = document.getElementById('audioPlayer');
             const title = document.getElementById('title');
+            const status = document.getElementById('status');
+            const chapterList = document.getElementById('chapters');
+            let shownChapters = '';
+            let loadedPath = null;
+            let hls = null;
+            const hlsSupported = (window.Hls && Hls.isSupported()) || audioPlayer.canPlayType('application/vnd.apple.mpegurl') !== '';
+
+            function loadAudio(path, segmented) {
+                if (path === loadedPath) return;
+                const position = audioPlayer.currentTime;
+                const playing = !audioPlayer.paused;
+                loadedPath = path;
+                if (hls) {
+                    hls.destroy();
+                    hls = null;
+                }
+                if (segmented && window.Hls && Hls.isSupported()) {
+                    hls = new Hls();
+                    hls.loadSource(path);
+                    hls.attachMedia(audioPlayer);
+                } else {
+                    audioPlayer.src = path;
+                }
+                // Keep the listener's place when the stream hands over to the cached file or to segments
+                if (position) {
+                    audioPlayer.addEventListener('loadedmetadata', () => {
+                        audioPlayer.currentTime = position;
+                        if (playing) audioPlayer.play();
+                    }, {once: true});
+                }
+            }
 
             function setSpeed(speed) {
                 audioPlayer.playbackRate = speed;
@@ -421,22 +1007,64 @@ def player():
                 });
             }
 
+            function formatJob(job) {
+                if (!job || job.state === 'done') return '';
+                if (job.state === 'error') return 'Conversion failed: ' + job.error;
+                let text = job.state.charAt(0).toUpperCase() + job.state.slice(1) + '... ' + Math.round(job.progress) + '%';
+                if (job.eta !== null) {
+                    text += ' (about ' + Math.ceil(job.eta) + 's left)';
+                }
+                return text;
+            }
+
+            function formatDuration(seconds) {
+                const minutes = Math.round(seconds / 60);
+                if (minutes < 60) return '~' + Math.max(minutes, 1) + ' min';
+                return '~' + Math.floor(minutes / 60) + 'h ' + (minutes % 60) + 'm';
+            }
+
+            function showChapters(chapters) {
+                const key = JSON.stringify(chapters.map(chapter => chapter.title));
+                if (key === shownChapters) return;
+                shownChapters = key;
+                chapterList.innerHTML = '';
+                chapters.forEach(chapter => {
+                    const item = document.createElement('li');
+                    const name = document.createElement('span');
+                    const length = document.createElement('span');
+                    name.textContent = chapter.title;
+                    length.textContent = formatDuration(chapter.estimated_seconds);
+                    item.appendChild(name);
+                    item.appendChild(length);
+                    chapterList.appendChild(item);
+                });
+            }
+
+            function showState(data) {
+                title.textContent = data.current_title || (data.job && data.job.title) || 'Not Playing';
+                status.textContent = formatJob(data.job);
+                showChapters(data.chapters || []);
+                if (data.hls_path && hlsSupported) {
+                    loadAudio(data.hls_path, true);
+                } else if (data.current_audio_path) {
+                    loadAudio(data.current_audio_path, false);
+                }
+            }
+
             function updatePlayerState() {
                 fetch('/player_state')
                     .then(response => response.json())
-                    .then(data => {
-                        title.textContent = data.current_title || 'Not Playing';
-                        if (data.current_audio_path && !audioPlayer.src.includes(data.current_audio_path)) {
-                            audioPlayer.src = data.current_audio_path;
-                        }
-                    });
+                    .then(showState);
             }
 
-            // Initial state update
-            updatePlayerState();
-            
-            // Update player state periodically
-            setInterval(updatePlayerState, 1000);
+            if (window.EventSource) {
+                // The server pushes the state on connect and whenever it changes, and the browser reconnects on its own
+                const events = new EventSource('/events');
+                events.onmessage = event => showState(JSON.parse(event.data));
+            } else {
+                updatePlayerState();
+                setInterval(updatePlayerState, 1000);
+            }
         </script>
     </body>
     </html>
@@ -454,19 +1082,19 @@ def handle_pdf():
     if not file.filename.endswith('.pdf'):
         return jsonify({'status': 'error', 'message': 'Invalid file type'})
 
-    temp_path = os.path.join(os.getcwd(), 'temp.pdf')
+    # Unique path, since the upload outlives this request until the job extracts it
+    temp_path = os.path.join(tts.temp_dir, f'upload_{uuid.uuid4().hex}.pdf')
     file.save(temp_path)
 
     try:
-        text, title = tts.extract_from_pdf(temp_path)
-        if tts.generate_audio_file(text, title, 'PDF'):
-            return jsonify({'status': 'success'})
-        return jsonify({'status': 'error', 'message': 'Failed to generate audio'})
+        job = tts.submit_conversion(get_session_id(), 'pdf', tts.extract_from_pdf, temp_path, 'PDF', temp_path)
+        return jsonify({'status': 'success', 'job_id': job.id})
+    except QueueFullError as e:
+        os.remove(temp_path)
+        return jsonify({'status': 'error', 'message': str(e)}), 503
     except Exception as e:
+        os.remove(temp_path)
         return jsonify({'status': 'error', 'message': str(e)})
-    finally:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
 
 @app.route('/epub', methods=['POST'])
 def handle_epub():
@@ -480,19 +1108,19 @@ def handle_epub():
     if not file.filename.endswith('.epub'):
         return jsonify({'status': 'error', 'message': 'Invalid file type'})
 
-    temp_path = os.path.join(os.getcwd(), 'temp.epub')
+    # Unique path, since the upload outlives this request until the job extracts it
+    temp_path = os.path.join(tts.temp_dir, f'upload_{uuid.uuid4().hex}.epub')
     file.save(temp_path)
 
     try:
-        text, title = tts.extract_from_epub(temp_path)
-        if tts.generate_audio_file(text, title, 'EPUB'):
-            return jsonify({'status': 'success'})
-        return jsonify({'status': 'error', 'message': 'Failed to generate audio'})
+        job = tts.submit_conversion(get_session_id(), 'epub', tts.extract_from_epub, temp_path, 'EPUB', temp_path)
+        return jsonify({'status': 'success', 'job_id': job.id})
+    except QueueFullError as e:
+        os.remove(temp_path)
+        return jsonify({'status': 'error', 'message': str(e)}), 503
     except Exception as e:
+        os.remove(temp_path)
         return jsonify({'status': 'error', 'message': str(e)})
-    finally:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
 
 @app.route('/url', methods=['POST'])
 def handle_url():
@@ -501,23 +1129,70 @@ def handle_url():
         return jsonify({'status': 'error', 'message': 'No URL provided'})
 
     try:
-        text, title = tts.extract_from_url(data['url'])
-        if tts.generate_audio_file(text, title, 'Web Article'):
-            return jsonify({'status': 'success'})
-        return jsonify({'status': 'error', 'message': 'Failed to generate audio'})
+        job = tts.submit_conversion(get_session_id(), 'url', tts.extract_from_url, data['url'], 'Web Article')
+        return jsonify({'status': 'success', 'job_id': job.id})
+    except QueueFullError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 503
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)})
+
+@app.route('/bulk', methods=['POST'])
+def handle_bulk():
+    """Ingest a list of article URLs concurrently, queuing each for synthesis"""
+    data = request.get_json()
+    if not data or not isinstance(data.get('urls'), list):
+        return jsonify({'status': 'error', 'message': 'No URL list provided'})
+
+    try:
+        batch = tts.start_bulk(data['urls'])
+        return jsonify({'status': 'success', 'batch_id': batch.id, 'urls': len(batch.results)})
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)})
+
+@app.route('/bulk/<batch_id>')
+def bulk_status(batch_id):
+    """Per-URL status and throughput of a bulk ingestion batch"""
+    batch = tts.batches.get(batch_id)
+    if not batch:
+        return jsonify({'status': 'error', 'message': 'Unknown batch'}), 404
+    return jsonify(batch.to_dict())
+
+@app.route('/export', methods=['POST'])
+def export():
+    """Start an MP3 export of the current audio; the job's result is the MP3's URL"""
+    try:
+        job = tts.submit_export(get_session_id())
+        return jsonify({'status': 'success', 'job_id': job.id})
+    except QueueFullError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 503
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)})
 
 @app.route('/player_state')
 def player_state():
-    return jsonify(tts.get_state())
+    return jsonify(tts.get_state(get_session_id()))
+
+@app.route('/events')
+def events():
+    """Push the player state as Server-Sent Events whenever it changes, instead of being polled"""
+    sid = get_session_id()
+    return Response(tts.events.iter_events(sid, tts.get_state), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-store', 'X-Accel-Buffering': 'no'})
+
+@app.route('/event_stats')
+def event_stats():
+    """Open event streams and how many events and heartbeats they have carried"""
+    return jsonify(tts.events.get_stats())
 
 @app.route('/set_speed', methods=['POST'])
 def set_speed():
     data = request.get_json()
     if data and 'speed' in data:
-        tts.set_speed(int(data['speed']))
-    return jsonify(tts.get_state())
+        try:
+            tts.set_speed(get_session_id(), float(data['speed']), data.get('position'))
+        except ValueError as e:
+            return jsonify({'status': 'error', 'message': str(e)})
+    return jsonify(tts.get_state(get_session_id()))
 
 @app.route('/seek', methods=['POST'])
 def seek():
@@ -525,13 +1200,35 @@ def seek():
     data = request.get_json()
     if data and 'position' in data:
         tts.seek(float(data['position']))
-    return jsonify(tts.get_state())
+    return jsonify(tts.get_state(get_session_id()))
 
 @app.route('/toggle_playback', methods=['POST'])
 def toggle_playback():
     """Handle play/pause toggle"""
     tts.toggle_playback()
-    return jsonify(tts.get_state())
+    return jsonify(tts.get_state(get_session_id()))
+
+def extract_url2(url, debug=False):
+    """Extract an article for /url2 with the extractor registered for its site.
+
+    With debug on, the extracted text is saved under temp_audio/debug along
+    with the path its audio is cached at. The audio itself is the normal
+    render, so capturing costs no extra synthesis.
+    """
+    text, title = extract_article(url)
+    if debug:
+        debug_dir = os.path.join(tts.temp_dir, 'debug')
+        if not os.path.exists(debug_dir):
+            os.makedirs(debug_dir)
+        debug_text_path = os.path.join(debug_dir, f'extracted_{int(time.time())}.txt')
+        with open(debug_text_path, 'w', encoding='utf-8') as f:
+            f.write(f"URL: {url}\n\n")
+            f.write(f"Title: {title}\n\n")
+            f.write(f"Audio: {os.path.join(tts.audio_cache.directory, tts.cache_key(text) + '.wav')}\n\n")
+            f.write("Content:\n\n")
+            f.write(text)
+        print(f"Saved extracted text to: {debug_text_path}")
+    return text, title
 
 @app.route('/url2', methods=['POST'])
 def handle_url2():
@@ -540,69 +1237,15 @@ def handle_url2():
         return jsonify({'status': 'error', 'message': 'No URL provided'})
 
     try:
-        if 'mises.org' in data['url']:
-            # Use the specialized mises.org extractor
-            response = requests.get(data['url'])
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Extract title
-            title = ""
-            title_element = soup.find('h1')
-            if title_element:
-                title = title_element.get_text().strip()
-            
-            # Extract article content
-            article_content = ""
-            content_wrapper = soup.find('div', class_=lambda x: x and 'prose' in x and 'max-w-none' in x)
-            
-            if content_wrapper:
-                # Look for the inner div that contains the actual content
-                inner_div = content_wrapper.find('div')
-                if inner_div:
-                    # Get all paragraphs from the inner div
-                    paragraphs = inner_div.find_all('p')
-                    # Filter out empty paragraphs and those that only contain links
-                    valid_paragraphs = []
-                    for p in paragraphs:
-                        text = p.get_text().strip()
-                        # Only include paragraphs that have more than just a link
-                        if text and not (len(p.find_all('a')) == 1 and len(text) == len(p.find('a').get_text().strip())):
-                            valid_paragraphs.append(text)
-                    
-                    article_content = ' '.join(valid_paragraphs)
-            
-            if not article_content and not title:
-                raise ValueError("Could not extract article content from the webpage")
-            
-            text = article_content
-
-            # Save extracted text to file for debugging
-            debug_text_path = os.path.join(os.getcwd(), 'debug_extracted_text.txt')
-            with open(debug_text_path, 'w', encoding='utf-8') as f:
-                f.write(f"URL: {data['url']}\n\n")
-                f.write(f"Title: {title}\n\n")
-                f.write("Content:\n\n")
-                f.write(text)
-            print(f"Saved extracted text to: {debug_text_path}")
-
-        else:
-            # Use the default extractor for other URLs
-            text, title = tts.extract_from_url(data['url'])
-            
-        # Generate audio file with timestamp for debugging
-        timestamp = int(time.time())
-        debug_wav_path = os.path.join(os.getcwd(), f'debug_audio_{timestamp}.wav')
-        
-        # Generate WAV file directly
-        tts.engine.save_to_file(text, debug_wav_path)
-        tts.engine.runAndWait()
-        print(f"Saved debug audio file to: {debug_wav_path}")
-            
-        if tts.generate_audio_file(text, title, 'Web Article'):
-            return jsonify({'status': 'success'})
-        return jsonify({'status': 'error', 'message': 'Failed to generate audio'})
+        # Debug capture is opt-in: {"url": ..., "debug": true}
+        debug = bool(data.get('debug'))
+        extract = partial(extract_url2, debug=debug)
+        # A debug request runs on its own, so its capture isn't lost to a shared job
+        job = tts.submit_conversion(get_session_id(), 'url2', extract, data['url'], 'Web Article', coalesce=not debug)
+        return jsonify({'status': 'success', 'job_id': job.id})
+    except QueueFullError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 503
     except Exception as e:
-        print(f"Error in handle_url2: {str(e)}")
         return jsonify({'status': 'error', 'message': str(e)})
 
 @app.route('/test_audio', methods=['GET'])
@@ -610,7 +1253,7 @@ def test_audio():
     """Test route to verify audio functionality"""
     try:
         test_text = "This is a test of the audio system. Testing sample rate handling and playback functionality."
-        if tts.generate_audio_file(test_text, "Audio Test", "Test"):
+        if tts.generate_audio_file(test_text, "Audio Test", "Test", get_session_id()):
             return jsonify({
                 'status': 'success',
                 'message': 'Audio file generated successfully',
@@ -627,10 +1270,66 @@ def test_audio():
             'message': str(e)
         })
 
+@app.route('/jobs')
+def job_stats():
+    """Queue depth and per-stage latency, for sizing the worker pool"""
+    return jsonify(tts.jobs.get_stats())
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = tts.jobs.get(job_id)
+    if not job:
+        return jsonify({'status': 'error', 'message': 'Unknown job'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/cache_stats')
+def cache_stats():
+    return jsonify(tts.audio_cache.get_stats())
+
+@app.route('/pdf_stats')
+def pdf_stats():
+    """PDF extraction throughput and text cache hit rate"""
+    return jsonify(tts.pdf_extractor.get_stats())
+
+@app.route('/fetch_stats')
+def fetch_stats():
+    """Article fetch counters, including how often a cached copy was revalidated"""
+    return jsonify(get_fetcher().get_stats())
+
+@app.route('/extraction_stats')
+def extraction_stats():
+    """Article extraction cache counters: fresh hits, unchanged refetches and parses"""
+    return jsonify(get_extraction_cache().get_stats())
+
+@app.route('/stream/<stream_id>')
+def serve_stream(stream_id):
+    """Serve audio that is still being synthesized as a chunked WAV response"""
+    stream = tts.streams.get(stream_id)
+    if not stream:
+        return jsonify({'status': 'error', 'message': 'Unknown stream'}), 404
+    if stream.complete and not stream.error:
+        return redirect(tts.audio_url(stream.path))
+    return Response(stream.iter_wav(), mimetype='audio/wav', headers={'Cache-Control': 'no-store'})
+
 @app.route('/audio/<path:filename>')
 def serve_audio(filename):
     """Serve audio files"""
-    return send_file(os.path.join(tts.temp_dir, filename))
+    path = safe_join(tts.temp_dir, filename)
+    if not path or not os.path.isfile(path):
+        return jsonify({'status': 'error', 'message': 'Audio not found'}), 404
+    # Cached renders are content-addressed, so they never change under the same URL
+    immutable = os.path.dirname(path) == tts.audio_cache.directory
+    return send_audio(path, immutable)
+
+@app.route('/hls/<key>/<path:filename>')
+def serve_hls(key, filename):
+    """Serve the HLS playlists of a render's segmentations and the segments of each rendition"""
+    path = safe_join(tts.hls_dir, key, filename)
+    # Names starting with a dot are files still being written
+    if not path or os.path.basename(path).startswith('.') or not os.path.isfile(path):
+        return jsonify({'status': 'error', 'message': 'Segment not found'}), 404
+    # Segments never change once written, while the playlists grow until the render ends
+    return send_audio(path, immutable=not path.endswith('.m3u8'))
 
 if __name__ == '__main__':
     app.run(debug=True) 
\ No newline at end of file
@@ -3,7 +3,7 @@ import PyPDF2
 import ebooklib
 from ebooklib import epub
 from bs4 import BeautifulSoup
-import requests
+from extractors import extract_article
 import os
 import json
 from flask import Flask, request, render_template_string, jsonify, session, send_file, redirect, url_for
@@ -70,43 +70,7 @@ class TextToSpeech:
 
     def extract_from_url_fee(self, url):
         """Extract article title, subtitle, and main content from a Fee.org webpage"""
-        # Add headers to mimic a regular browser
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        }
-        
-        response = requests.get(url, headers=headers)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Extract title (H1)
-        title = ""
-        title_element = soup.find('h1')
-        if title_element:
-            title = title_element.get_text().strip()
-        
-        # Extract subtitle (H2)
-        subtitle = ""
-        subtitle_element = soup.find('h2')
-        if subtitle_element:
-            subtitle = subtitle_element.get_text().strip()
-        
-        # Extract article content
-        article_content = ""
-        content_wrapper = soup.find('div', {'class': 'article-content-wrapper'})
-        if content_wrapper:
-            paragraphs = content_wrapper.find_all('p')
-            article_content = ' '.join(p.get_text().strip() for p in paragraphs if p.get_text().strip())
-        
-        if not article_content and not title:
-            raise ValueError("Could not extract article content from the webpage")
-        
-        # Combine the parts with appropriate spacing
-        full_text = f"{title}\n\n{subtitle}\n\n{article_content}"
-        return full_text, title
+        return extract_article(url)
 
     # ... (rest of the TextToSpeech class methods) ...
 
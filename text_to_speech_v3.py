@@ -1,10 +1,12 @@
-import pyttsx3
 import PyPDF2
 import ebooklib
 from ebooklib import epub
 from bs4 import BeautifulSoup
-import requests
+from extractors import extract_article
+from audio_encoder import synthesize_to_file
+from tts_backends import create_backend
 import os
+import uuid
 import json
 from flask import Flask, request, render_template_string, jsonify, session, send_file, redirect, url_for
 from threading import Thread, Lock
@@ -25,7 +27,7 @@ app.secret_key = 'your-secret-key-here'
 class TextToSpeech:
     def __init__(self):
         self.speed = 150
-        self.engine = None
+        self.backend = None
         self.is_playing = False
         self.current_text = ""
         self.current_title = ""
@@ -48,93 +50,31 @@ class TextToSpeech:
 
     def init_engine(self):
         try:
-            if self.engine:
-                try:
-                    self.engine.stop()
-                except:
-                    pass
-            self.engine = pyttsx3.init()
-            self.setup_voice()
+            if self.backend:
+                self.backend.close()
+            self.backend = create_backend('auto', self.speed, 0.9)
         except Exception as e:
             print(f"Error initializing engine: {str(e)}")
 
-    def setup_voice(self):
-        try:
-            self.engine.setProperty('rate', self.speed)
-            self.engine.setProperty('volume', 0.9)
-            voices = self.engine.getProperty('voices')
-            if voices:
-                self.engine.setProperty('voice', voices[0].id)
-        except Exception as e:
-            print(f"Error setting up voice: {str(e)}")
-
     def extract_from_url(self, url):
         """Extract article content from a webpage"""
-        response = requests.get(url)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Try to find article title
-        title = ""
-        title_candidates = [
-            soup.find('h1', {'class': ['article-title', 'entry-title', 'post-title']}),
-            soup.find('meta', {'property': 'og:title'}),
-            soup.find('title'),
-            soup.find('h1')
-        ]
-        for candidate in title_candidates:
-            if candidate:
-                title = candidate.get('content', candidate.text)
-                break
-        
-        # Try to find article content
-        article_content = ""
-        content_candidates = [
-            soup.find('article'),
-            soup.find('div', {'class': ['article-content', 'entry-content', 'post-content']}),
-            soup.find('main'),
-        ]
-        
-        for candidate in content_candidates:
-            if candidate:
-                # Remove unwanted elements
-                for unwanted in candidate.find_all(['script', 'style', 'nav', 'header', 'footer', 'aside', 'form']):
-                    unwanted.decompose()
-                
-                # Get paragraphs
-                paragraphs = candidate.find_all('p')
-                article_content = ' '.join(p.get_text().strip() for p in paragraphs if p.get_text().strip())
-                break
-        
-        if not article_content and not title:
-            raise ValueError("Could not extract article content from the webpage")
-            
-        return article_content, title
+        return extract_article(url)
 
     def generate_audio_file(self, text, title, type_):
         """Generate audio file and return its duration"""
         try:
             # Generate unique filename
-            timestamp = int(time.time())
-            mp3_path = os.path.join(self.temp_dir, f'audio_{timestamp}.mp3')
-            
-            # Save as WAV first
-            wav_path = mp3_path.replace('.mp3', '.wav')
-            self.engine.save_to_file(text, wav_path)
-            self.engine.runAndWait()
-
-            # Convert to MP3
-            sound = AudioSegment.from_wav(wav_path)
-            sound.export(mp3_path, format="mp3")
+            mp3_path = os.path.join(self.temp_dir, f'audio_{uuid.uuid4().hex}.mp3')
 
-            # Cleanup WAV file
-            os.remove(wav_path)
+            # Speech is encoded to MP3 as it is rendered, without a WAV in between
+            duration = synthesize_to_file(self.backend, text, mp3_path, scratch_dir=self.temp_dir)
             
             # Store current audio info
             self.current_audio_path = mp3_path
             self.current_text = text
             self.current_title = title
             self.current_type = type_
-            self.duration = len(sound) / 1000  # Convert to seconds
+            self.duration = duration
             
             return True
         except Exception as e:
@@ -183,9 +123,9 @@ class TextToSpeech:
             pygame.mixer.music.load(self.current_audio_path)
             pygame.mixer.music.play(start=self.current_position)
             
-            # Get the total length of the audio
-            sound = AudioSegment.from_mp3(self.current_audio_path)
-            total_length = len(sound) / 1000.0  # Convert to seconds
+            # Length was measured when the audio was generated; decoding the
+            # whole MP3 again here just to get it is wasted work
+            total_length = self.duration
             
             # Monitor playback progress
             while pygame.mixer.music.get_busy() and self.is_playing and not self.should_stop:
@@ -294,6 +234,9 @@ class TextToSpeech:
             if self.current_text:
                 # Save current audio path
                 old_path = self.current_audio_path
+
+                # Restart the engine at the new rate
+                self.init_engine()
                 
                 # Generate new audio
                 if self.generate_audio_file(self.current_text, self.current_title, self.current_type):
@@ -1,3 +1,5 @@
+from time_stretch import stretch_wav
+
 class TextToSpeech:
     def __init__(self):
         self.speed = 100  # Start at 1x speed (100)
@@ -13,6 +15,10 @@ class TextToSpeech:
         self.should_stop = False
         self.temp_dir = os.path.join(os.getcwd(), 'temp_audio')
         self.current_audio_path = None
+        # Audio rendered at 1x; speed changes stretch this instead of re-synthesizing
+        self.base_audio_path = None
+        # The copy of it currently stretched to, if any
+        self.stretched_audio_path = None
         self.playback_thread = None
         
         if not os.path.exists(self.temp_dir):
@@ -56,30 +62,33 @@ class TextToSpeech:
             current_pos = self.current_position
             was_playing = self.is_playing
             
-            # Update engine speed
-            self.engine.setProperty('rate', speed)
-            
-            # Regenerate audio at new speed
-            if self.current_text:
-                # Save current audio path
+            if self.current_audio_path:
+                # Speed the current audio plays at
+                playing_speed = old_speed
+                # Anything but the 1x render or our stretch of it is a newly generated document, rendered at 1x
+                if self.current_audio_path not in (self.base_audio_path, self.stretched_audio_path):
+                    self.base_audio_path = self.current_audio_path
+                    self.stretched_audio_path = None
+                    playing_speed = 100
                 old_path = self.current_audio_path
                 
-                # Generate new audio
-                if self.generate_audio_file(self.current_text, self.current_title, self.current_type):
-                    # Remove old audio file
-                    if old_path and os.path.exists(old_path):
-                        os.remove(old_path)
-                    
-                    # Resume from previous position if was playing
-                    if was_playing:
-                        self.seek(current_pos)
-                        self.play()
+                # Time-stretch the 1x render (100 = 1x) instead of regenerating it
+                if speed == 100:
+                    self.current_audio_path = self.base_audio_path
                 else:
-                    # If generation failed, restore old speed
-                    self.speed = old_speed
-                    self.engine.setProperty('rate', old_speed)
+                    root, ext = os.path.splitext(self.base_audio_path)
+                    stretched_path = f"{root}_x{speed / 100:g}{ext}"
+                    if not os.path.exists(stretched_path):
+                        stretch_wav(self.base_audio_path, stretched_path, speed / 100)
+                    self.stretched_audio_path = stretched_path
+                    self.current_audio_path = stretched_path
+                
+                # Keep the same point in the text, paused or not: positions scale with the speed ratio
+                self.current_position = current_pos * playing_speed / speed
+                if old_path != self.current_audio_path and was_playing:
+                    self.seek(self.current_position)
+                    self.play()
                     
         except Exception as e:
             print(f"Error setting speed: {str(e)}")
             self.speed = old_speed
-            self.engine.setProperty('rate', old_speed) 
\ No newline at end of file
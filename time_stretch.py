@@ -0,0 +1,151 @@
+import wave
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+MIN_RATE = 0.5
+MAX_RATE = 4.0
+
+
+class TimeStretcher:
+    """Pitch-preserving tempo change for mono int16 PCM using WSOLA.
+
+    Input can be fed in pieces with process(); call flush() once at the end
+    to get the remaining output. The output is then exactly the input's
+    length divided by the rate, rounded.
+    """
+
+    def __init__(self, rate, sample_rate=22050, frame_ms=40, tolerance_ms=10, search_step=4):
+        if not MIN_RATE <= rate <= MAX_RATE:
+            raise ValueError(f"Rate must be between {MIN_RATE} and {MAX_RATE}")
+        self.rate = rate
+        # Frame length is even so the synthesis hop is exactly half a frame
+        self.frame = int(sample_rate * frame_ms / 1000) // 2 * 2
+        self.hop = self.frame // 2
+        self.tolerance = int(sample_rate * tolerance_ms / 1000)
+        # Candidate offsets are first scored on every search_step-th sample, then refined
+        self.step = search_step
+        # Periodic Hann windows sum to exactly one at 50% overlap
+        self.window = np.hanning(self.frame + 1)[:-1].astype(np.float32)
+
+        self.buffer = np.zeros(0, dtype=np.float32)
+        # Position of the previously chosen frame, relative to the buffer start
+        self.previous = None
+        # Nominal analysis position of the next frame, relative to the buffer start
+        self.nominal = 0.0
+        self.tail = np.zeros(self.hop, dtype=np.float32)
+        # Samples taken in and given out, so flush() can end on the exact length
+        self.consumed = 0
+        self.produced = 0
+
+    def _best_offset(self, template, start, stop):
+        """Position in [start, stop] whose frame best continues template"""
+        region = self.buffer[start:stop + self.frame]
+        # Coarse search on a decimated signal; every window is scored in one matrix product
+        windows = sliding_window_view(region[::self.step], len(template[::self.step]))
+        coarse = int(np.argmax(windows @ template[::self.step])) * self.step
+
+        # Refine around the coarse peak at full resolution
+        low = max(0, coarse - self.step)
+        high = min(stop - start, coarse + self.step)
+        windows = sliding_window_view(region[low:high + self.frame], self.frame)
+        return start + low + int(np.argmax(windows @ template))
+
+    def _next_frames(self, final=False):
+        """Yield output hops for every frame that fits in the buffer"""
+        frame, hop, tolerance = self.frame, self.hop, self.tolerance
+        while True:
+            nominal = int(round(self.nominal))
+            if self.previous is None:
+                if len(self.buffer) < frame and not final:
+                    return
+                position = 0
+            else:
+                start = max(0, nominal - tolerance)
+                stop = nominal + tolerance
+                continuation = self.previous + hop
+                if stop + frame > len(self.buffer) or continuation + frame > len(self.buffer):
+                    return
+                # The natural continuation of the last frame is the template to match
+                template = self.buffer[continuation:continuation + frame]
+                position = self._best_offset(template, start, stop)
+
+            chunk = self.buffer[position:position + frame]
+            if len(chunk) < frame:
+                chunk = np.pad(chunk, (0, frame - len(chunk)))
+            chunk = chunk * self.window
+            yield self.tail + chunk[:hop]
+            self.tail = chunk[hop:]
+            self.previous = position
+            self.nominal += hop * self.rate
+
+            if final and self.nominal >= len(self.buffer):
+                return
+
+    def _trim(self):
+        """Drop input that no future frame can reach"""
+        keep_from = min(self.previous, int(self.nominal) - self.tolerance)
+        if keep_from > 0:
+            self.buffer = self.buffer[keep_from:]
+            self.previous -= keep_from
+            self.nominal -= keep_from
+
+    def process(self, samples):
+        """Feed int16 samples, returning whatever stretched int16 output is ready"""
+        self.buffer = np.concatenate([self.buffer, samples.astype(np.float32)])
+        self.consumed += len(samples)
+        output = list(self._next_frames())
+        if self.previous is not None:
+            self._trim()
+        output = self._to_int16(output)
+        self.produced += len(output)
+        return output
+
+    def flush(self):
+        """Return the output for the remaining buffered input"""
+        # Pad so the final frames have something to search over
+        self.buffer = np.concatenate([
+            self.buffer, np.zeros(self.frame + 2 * self.tolerance, dtype=np.float32)
+        ])
+        output = list(self._next_frames(final=True))
+        output.append(self.tail)
+        self.tail = np.zeros(self.hop, dtype=np.float32)
+        # The padding runs the last frames past the end of the input; cut what they add
+        remaining = max(0, round(self.consumed / self.rate) - self.produced)
+        output = self._to_int16(output)[:remaining]
+        output = np.pad(output, (0, remaining - len(output)))
+        self.produced += len(output)
+        return output
+
+    @staticmethod
+    def _to_int16(output):
+        if not output:
+            return np.zeros(0, dtype=np.int16)
+        return np.clip(np.concatenate(output), -32768, 32767).astype(np.int16)
+
+
+def time_stretch(samples, rate, sample_rate=22050):
+    """Change the tempo of mono int16 PCM by rate without changing its pitch"""
+    if rate == 1.0:
+        return samples.copy()
+    stretcher = TimeStretcher(rate, sample_rate)
+    return np.concatenate([stretcher.process(samples), stretcher.flush()])
+
+
+def stretch_wav(source_path, output_path, rate, block_seconds=10):
+    """Write a time-stretched copy of a mono 16-bit WAV, a block at a time"""
+    with wave.open(source_path, 'rb') as source:
+        if source.getnchannels() != 1 or source.getsampwidth() != 2:
+            raise ValueError("Only mono 16-bit audio can be time-stretched")
+        sample_rate = source.getframerate()
+        stretcher = TimeStretcher(rate, sample_rate)
+        with wave.open(output_path, 'wb') as output:
+            output.setnchannels(1)
+            output.setsampwidth(2)
+            output.setframerate(sample_rate)
+            while True:
+                frames = source.readframes(sample_rate * block_seconds)
+                if not frames:
+                    break
+                output.writeframes(stretcher.process(np.frombuffer(frames, dtype=np.int16)).tobytes())
+            output.writeframes(stretcher.flush().tobytes())
@@ -0,0 +1,166 @@
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import uuid
+import wave
+from threading import Lock
+
+import pyttsx3
+
+ESPEAK_WORKER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'espeak_worker.py')
+DEFAULT_ESPEAK_VOICE = 'en'
+
+
+class BackendUnavailable(Exception):
+    """Raised when a speech engine can't be started on this machine"""
+
+
+class Pyttsx3Backend:
+    """pyttsx3's platform driver, rendering each text through a scratch WAV file"""
+
+    name = 'pyttsx3'
+
+    def __init__(self, rate=150, volume=0.9, voice_id=None):
+        try:
+            self.engine = pyttsx3.init()
+            self.engine.setProperty('rate', rate)
+            self.engine.setProperty('volume', volume)
+            if voice_id is None:
+                voices = self.engine.getProperty('voices')
+                if voices:
+                    voice_id = voices[0].id
+            if voice_id:
+                self.engine.setProperty('voice', voice_id)
+        except Exception as e:
+            raise BackendUnavailable(f"pyttsx3 failed to start: {str(e)}")
+        self.voice_id = voice_id
+        # The driver loop isn't reentrant
+        self.lock = Lock()
+
+    def synthesize(self, text, scratch_dir=None):
+        """Render text, returning ((channels, sample width, frame rate), frames)"""
+        wav_path = os.path.join(scratch_dir or tempfile.gettempdir(), f'tts_{uuid.uuid4().hex}.wav')
+        try:
+            with self.lock:
+                self.engine.save_to_file(text, wav_path)
+                self.engine.runAndWait()
+            with wave.open(wav_path, 'rb') as wav:
+                params = (wav.getnchannels(), wav.getsampwidth(), wav.getframerate())
+                return params, wav.readframes(wav.getnframes())
+        finally:
+            if os.path.exists(wav_path):
+                os.remove(wav_path)
+
+    def stream(self, text, scratch_dir=None):
+        """Yield (params, frames) for text; the driver only hands audio over once the whole text is rendered"""
+        yield self.synthesize(text, scratch_dir)
+
+    def close(self):
+        try:
+            self.engine.stop()
+        except Exception:
+            pass
+
+
+class EspeakBackend:
+    """espeak-ng in a long-lived worker process fed text on stdin, streaming raw PCM back on stdout.
+
+    The engine and voice are loaded once per process rather than once per
+    document, and audio never goes through a file. See espeak_worker.py for
+    the wire format.
+    """
+
+    name = 'espeak'
+
+    def __init__(self, rate=150, volume=0.9, voice_id=None):
+        self.rate = rate
+        self.volume = volume
+        self.voice_id = voice_id or DEFAULT_ESPEAK_VOICE
+        self.lock = Lock()
+        self.process = None
+        self.params = None
+        self._start()
+
+    def _start(self):
+        """Start the worker and read the sample rate it reports"""
+        self.process = subprocess.Popen(
+            [sys.executable, ESPEAK_WORKER, str(self.rate), str(self.volume), self.voice_id],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE
+        )
+        header = self._read(4)
+        sample_rate = struct.unpack('<I', header)[0] if header else 0
+        if not sample_rate:
+            self.process.wait()
+            raise BackendUnavailable("espeak-ng worker failed to start; is libespeak-ng installed?")
+        # Mono 16-bit samples
+        self.params = (1, 2, sample_rate)
+
+    def _read(self, size):
+        data = b''
+        while len(data) < size:
+            block = self.process.stdout.read(size - len(data))
+            if not block:
+                return None
+            data += block
+        return data
+
+    def stream(self, text, scratch_dir=None):
+        """Yield (params, frames) blocks for text as the engine produces them"""
+        with self.lock:
+            if self.process.poll() is not None:
+                self._start()
+            complete = False
+            try:
+                data = text.encode('utf-8')
+                self.process.stdin.write(struct.pack('<I', len(data)) + data)
+                self.process.stdin.flush()
+                while True:
+                    header = self._read(4)
+                    if header is None:
+                        raise RuntimeError("espeak-ng worker exited mid-utterance")
+                    size = struct.unpack('<I', header)[0]
+                    if size == 0:
+                        complete = True
+                        return
+                    block = self._read(size)
+                    if block is None:
+                        raise RuntimeError("espeak-ng worker exited mid-utterance")
+                    yield self.params, block
+            finally:
+                if not complete:
+                    # Unread audio would be taken as the next reply, so start over
+                    self.process.kill()
+                    self.process.wait()
+
+    def synthesize(self, text, scratch_dir=None):
+        """Render text, returning ((channels, sample width, frame rate), frames)"""
+        return self.params, b''.join(frames for _, frames in self.stream(text))
+
+    def close(self):
+        if self.process and self.process.poll() is None:
+            self.process.stdin.close()
+            self.process.wait()
+
+
+BACKENDS = {
+    'espeak': EspeakBackend,
+    'pyttsx3': Pyttsx3Backend,
+}
+
+
+def create_backend(name='auto', rate=150, volume=0.9, voice_id=None):
+    """Start a speech backend by name; 'auto' prefers espeak-ng and falls back to pyttsx3"""
+    names = list(BACKENDS) if name == 'auto' else [name]
+    error = None
+    for candidate in names:
+        if candidate not in BACKENDS:
+            raise ValueError(f"Unknown TTS backend {candidate}")
+        try:
+            return BACKENDS[candidate](rate, volume, voice_id)
+        except BackendUnavailable as e:
+            print(f"Error starting {candidate} backend: {str(e)}")
+            error = e
+    raise error
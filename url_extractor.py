@@ -1,10 +1,26 @@
-from bs4 import BeautifulSoup
-import requests
+from http_fetch import fetch
+from html_parsing import class_names, parse_html
+
+CONTENT_CLASSES = {'article-content', 'entry-content', 'post-content'}
+
+def parse_only(name, attrs):
+    """Whether to parse an element: only title candidates and content containers are read"""
+    if name in ('h1', 'title', 'article', 'main'):
+        return True
+    if name == 'meta':
+        return attrs.get('property') == 'og:title'
+    return name == 'div' and not CONTENT_CLASSES.isdisjoint(class_names(attrs))
 
 def extract_from_url(url):
     """Extract article content from a webpage"""
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, 'html.parser')
+    return extract_from_html(fetch(url).text)
+
+def extract_from_html(html):
+    """Extract article content from a fetched page's HTML"""
+    return extract_from_soup(parse_html(html, parse_only))
+
+def extract_from_soup(soup):
+    """Extract article content from a parsed page"""
     
     # Try to find article title
     title = ""
@@ -33,9 +49,9 @@ def extract_from_url(url):
             for unwanted in candidate.find_all(['script', 'style', 'nav', 'header', 'footer', 'aside', 'form']):
                 unwanted.decompose()
             
-            # Get paragraphs
-            paragraphs = candidate.find_all('p')
-            article_content = ' '.join(p.get_text().strip() for p in paragraphs if p.get_text().strip())
+            # Get paragraphs, reading each one's text once
+            texts = (p.get_text().strip() for p in candidate.find_all('p'))
+            article_content = ' '.join(text for text in texts if text)
             break
     
     if not article_content and not title: